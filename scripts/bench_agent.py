@@ -0,0 +1,377 @@
+"""
+Agent latency benchmark: the real cli.run_turn loop against a local stub LLM
+and the real MCP server over a fake HDFS backend. No network, no cluster.
+
+  python scripts/bench_agent.py [--scenarios scripts/bench_scenarios.json]
+                                [--out result.json] [--baseline old.json]
+
+- The stub is an OpenAI-compatible /v1/chat/completions endpoint that streams
+  the scenario's scripted responses (text or tool calls) with configurable
+  time-to-first-token and per-chunk delay. The response for a request is
+  picked by the number of assistant messages after the last user message,
+  so it stays aligned when the plan cache skips a planning step.
+- The MCP server is spawned over stdio with MCP_DOCKER_BIN pointing at
+  scripts/fake_hdfs_docker.py and a temporary namespace seeded per the
+  scenario file.
+- Each turn reports total latency split into LLM, tool and overhead
+  (everything else: context fitting, caches, message handling), LLM/tool
+  step counts, estimated prompt tokens and request body size, so growth of
+  the history is visible. Output is JSON; with --baseline the run is
+  compared per scenario and exits with status 1 on a regression.
+- A scripted tool call that fails (raises or returns ok=false) is reported
+  and the run exits with status 1: a scenario timing an error path is not
+  measuring what it claims.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import shlex
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+class StubLLM:
+    """Scripted, streaming OpenAI-compatible chat endpoint on 127.0.0.1."""
+
+    def __init__(self, ttft_ms: float, chunk_ms: float) -> None:
+        self.ttft_ms = ttft_ms
+        self.chunk_ms = chunk_ms
+        self.script: List[Dict[str, Any]] = []
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+                stub._respond(self, body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-llm", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self) -> "StubLLM":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    def set_script(self, responses: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.script = responses
+
+    def take_requests(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            out, self.requests = self.requests, []
+        return out
+
+    def _pick(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        step = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant")
+        with self._lock:
+            script = self.script
+        return script[step] if step < len(script) else {"content": "Done."}
+
+    def _respond(self, handler: BaseHTTPRequestHandler, body: bytes) -> None:
+        req = json.loads(body or b"{}")
+        messages = req.get("messages", [])
+        with self._lock:
+            self.requests.append({"bytes": len(body), "messages": len(messages)})
+        resp = self._pick(messages)
+
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        def send(delta: Optional[Dict[str, Any]], finish: Optional[str] = None, usage: Optional[Dict] = None) -> None:
+            chunk = {
+                "id": cid, "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": req.get("model", "stub"),
+                "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            handler.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            handler.wfile.flush()
+
+        time.sleep(resp.get("ttft_ms", self.ttft_ms) / 1000)
+        chunk_delay = resp.get("chunk_ms", self.chunk_ms) / 1000
+        completion_chars = 0
+
+        if resp.get("tool_calls"):
+            for i, call in enumerate(resp["tool_calls"]):
+                args = json.dumps(call.get("arguments", {}))
+                half = len(args) // 2
+                first = {"index": i, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                         "function": {"name": call["name"], "arguments": args[:half]}}
+                send({"role": "assistant", "tool_calls": [first]} if i == 0 else {"tool_calls": [first]})
+                time.sleep(chunk_delay)
+                send({"tool_calls": [{"index": i, "function": {"arguments": args[half:]}}]})
+                time.sleep(chunk_delay)
+                completion_chars += len(args) + len(call["name"])
+            finish = "tool_calls"
+        else:
+            text = resp.get("content", "Done.")
+            for j in range(0, len(text), 16):
+                send({"content": text[j:j + 16]})
+                time.sleep(chunk_delay)
+            completion_chars = len(text)
+            finish = "stop"
+
+        send({}, finish=finish)
+        prompt_tokens = len(body) // 4
+        completion_tokens = completion_chars // 4 + 1
+        send(None, usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens})
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
+
+
+def seed_namespace(root: Path, seed: Dict[str, Dict[str, int]]) -> int:
+    files = 0
+    for hdfs_dir, spec in seed.items():
+        d = root / hdfs_dir.lstrip("/")
+        d.mkdir(parents=True, exist_ok=True)
+        payload = b"x" * int(spec.get("size", 128))
+        for i in range(int(spec.get("files", 0))):
+            (d / f"part-{i:05d}.csv").write_bytes(payload)
+            files += 1
+    return files
+
+
+def pct(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return round(values[idx], 1)
+
+
+async def run_scenarios(a: argparse.Namespace, corpus: Dict[str, Any], stub: StubLLM) -> Dict[str, Any]:
+    # Imported after the environment is prepared: settings are read on first use.
+    from fastmcp import Client
+    from fastmcp.client.transports import PythonStdioTransport
+
+    from src.agent.cache import ToolResultCache
+    from src.agent.cli import run_turn
+    from src.agent.context import ContextManager, estimate_tokens
+    from src.agent.llm import make_client
+    from src.agent.mcp_client import mcp_tool_to_openai, tool_result_error
+    from src.agent.plan_cache import PlanCache
+    from src.agent.prompts import SYSTEM_PROMPT
+    from src.config import agent_settings
+
+    transport = PythonStdioTransport(
+        script_path=str(ROOT / "mcp_server_bootstrap.py"), env=dict(os.environ), cwd=str(ROOT),
+    )
+    llm_client = make_client()
+    results: List[Dict[str, Any]] = []
+    wanted = set(a.only or [])
+
+    try:
+        t0 = time.perf_counter()
+        async with Client(transport) as mcp:
+            tools = [mcp_tool_to_openai(t) for t in await mcp.list_tools()]
+            connect_ms = (time.perf_counter() - t0) * 1000
+
+            for sc in corpus["scenarios"]:
+                if wanted and sc["name"] not in wanted:
+                    continue
+                for rep in range(a.repeat):
+                    messages: List[Dict[str, Any]] = [{"role": "system", "content": SYSTEM_PROMPT}]
+                    context = ContextManager(
+                        budget_tokens=agent_settings.agent_context_token_budget,
+                        keep_turns=agent_settings.agent_context_keep_turns,
+                        reserved_tokens=estimate_tokens(tools),
+                    )
+                    cache = ToolResultCache(ttl_sec=agent_settings.agent_tool_cache_ttl_sec)
+                    plans = PlanCache(
+                        max_entries=agent_settings.agent_plan_cache_size,
+                        min_seen=agent_settings.agent_plan_cache_min_seen,
+                    ) if agent_settings.agent_plan_cache else None
+
+                    turns = []
+                    for turn in sc["turns"]:
+                        stub.set_script(turn.get("llm", []))
+                        stub.take_requests()
+                        sink = io.StringIO()
+                        with contextlib.redirect_stdout(sys.stderr if a.verbose else sink):
+                            stats = await run_turn(llm_client, mcp, tools, messages, turn["user"],
+                                                   context, cache, plans)
+                        reqs = stub.take_requests()
+                        last_user = max(i for i, m in enumerate(messages) if m.get("role") == "user")
+                        errors = [f"{m.get('name')}: {err}" for m in messages[last_user + 1:]
+                                  if m.get("role") == "tool"
+                                  and (err := tool_result_error(str(m.get("content") or ""))) is not None]
+                        turns.append({
+                            "user": turn["user"],
+                            "total_ms": round(stats.total_ms, 1),
+                            "llm_ms": round(stats.llm_ms, 1),
+                            "tool_ms": round(stats.tool_ms, 1),
+                            "overhead_ms": round(max(0.0, stats.total_ms - stats.llm_ms - stats.tool_ms), 1),
+                            "ttft_ms": round(stats.ttft_ms[0], 1) if stats.ttft_ms else None,
+                            "llm_calls": stats.llm_calls,
+                            "tool_calls": stats.tool_calls,
+                            "plan_replayed": stats.plan_replayed,
+                            "prompt_tokens_est": stats.prompt_tokens,
+                            "request_bytes": [r["bytes"] for r in reqs],
+                            "history_messages": len(messages),
+                            "tool_errors": errors,
+                        })
+                    results.append({"name": sc["name"], "repeat": rep, "turns": turns})
+    finally:
+        await llm_client.close()
+
+    return {"connect_ms": round(connect_ms, 1), "runs": results}
+
+
+def summarize(report: Dict[str, Any]) -> Dict[str, Any]:
+    per_scenario: Dict[str, Dict[str, Any]] = {}
+    all_totals: List[float] = []
+    for run in report["runs"]:
+        s = per_scenario.setdefault(run["name"], {"totals": [], "overheads": [], "llm": [], "tool": [],
+                                                  "llm_calls": 0, "tool_calls": 0, "last_request_bytes": 0})
+        for t in run["turns"]:
+            s["totals"].append(t["total_ms"])
+            s["overheads"].append(t["overhead_ms"])
+            s["llm"].append(t["llm_ms"])
+            s["tool"].append(t["tool_ms"])
+            all_totals.append(t["total_ms"])
+        s["llm_calls"] = sum(t["llm_calls"] for t in run["turns"])
+        s["tool_calls"] = sum(t["tool_calls"] for t in run["turns"])
+        s["last_request_bytes"] = max((b for t in run["turns"] for b in t["request_bytes"]), default=0)
+
+    out: Dict[str, Any] = {"turn_total_ms": {"p50": pct(all_totals, 50), "p95": pct(all_totals, 95)},
+                           "scenarios": {}}
+    for name, s in per_scenario.items():
+        out["scenarios"][name] = {
+            "turn_total_ms_median": round(statistics.median(s["totals"]), 1),
+            "turn_llm_ms_median": round(statistics.median(s["llm"]), 1),
+            "turn_tool_ms_median": round(statistics.median(s["tool"]), 1),
+            "turn_overhead_ms_median": round(statistics.median(s["overheads"]), 1),
+            "llm_calls": s["llm_calls"],
+            "tool_calls": s["tool_calls"],
+            "max_request_bytes": s["last_request_bytes"],
+        }
+    return out
+
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], threshold_pct: float) -> List[str]:
+    """Regressions: medians more than threshold_pct slower, or more LLM/tool steps or bigger prompts."""
+    problems = []
+    old = baseline.get("summary", {}).get("scenarios", {})
+    for name, cur in summary["scenarios"].items():
+        ref = old.get(name)
+        if ref is None:
+            continue
+        for key in ("turn_total_ms_median", "turn_overhead_ms_median"):
+            if ref[key] > 0 and cur[key] > ref[key] * (1 + threshold_pct / 100) and cur[key] - ref[key] > 5:
+                problems.append(f"{name}: {key} {ref[key]} -> {cur[key]}")
+        for key in ("llm_calls", "tool_calls", "max_request_bytes"):
+            if cur[key] > ref[key]:
+                problems.append(f"{name}: {key} {ref[key]} -> {cur[key]}")
+    return problems
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scenarios", default=str(ROOT / "scripts" / "bench_scenarios.json"))
+    ap.add_argument("--only", nargs="*", help="scenario names to run")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--llm-ttft-ms", type=float, default=None, help="override the corpus default")
+    ap.add_argument("--llm-chunk-ms", type=float, default=None, help="override the corpus default")
+    ap.add_argument("--hdfs-latency-ms", type=float, default=None, help="fake docker exec latency")
+    ap.add_argument("--plan-cache", action="store_true", help="enable the agent plan cache")
+    ap.add_argument("--tool-cache", action="store_true", help="enable the agent tool result cache")
+    ap.add_argument("--out", help="write the JSON report here instead of stdout")
+    ap.add_argument("--baseline", help="previous JSON report to compare with")
+    ap.add_argument("--threshold-pct", type=float, default=20.0)
+    ap.add_argument("--verbose", action="store_true", help="show the agent's console output on stderr")
+    a = ap.parse_args()
+
+    corpus = json.loads(Path(a.scenarios).read_text(encoding="utf-8"))
+    llm_cfg = corpus.get("llm", {})
+    ttft_ms = a.llm_ttft_ms if a.llm_ttft_ms is not None else llm_cfg.get("ttft_ms", 200)
+    chunk_ms = a.llm_chunk_ms if a.llm_chunk_ms is not None else llm_cfg.get("chunk_ms", 5)
+    hdfs_ms = a.hdfs_latency_ms if a.hdfs_latency_ms is not None else corpus.get("hdfs_latency_ms", 50)
+
+    stub = StubLLM(ttft_ms, chunk_ms).start()
+    with tempfile.TemporaryDirectory(prefix="bench-agent-") as tmp:
+        files = seed_namespace(Path(tmp) / "hdfs", corpus.get("seed", {}))
+        fake = shlex.join([Path(sys.executable).as_posix(), (ROOT / "scripts" / "fake_hdfs_docker.py").as_posix()])
+        os.environ.update({
+            "OPENROUTER_API_KEY": "sk-bench",
+            "OPENROUTER_MODEL": "bench/stub",
+            "OPENROUTER_BASE_URL": stub.base_url,
+            "MCP_DOCKER_BIN": fake,
+            "FAKE_HDFS_ROOT": str(Path(tmp) / "hdfs"),
+            "FAKE_HDFS_LATENCY_MS": str(hdfs_ms),
+            "MCP_AUDIT_LOG": str(Path(tmp) / "audit.jsonl"),
+            "MCP_MANIFEST_DIR": str(Path(tmp) / "manifests"),
+            "MCP_TRANSPORT": "stdio",
+            "AGENT_PLAN_CACHE": "true" if a.plan_cache else "false",
+            "AGENT_TOOL_CACHE_TTL_SEC": "30" if a.tool_cache else "0",
+        })
+        os.environ.pop("MCP_SERVER_URL", None)
+        try:
+            report = asyncio.run(run_scenarios(a, corpus, stub))
+        finally:
+            stub.stop()
+
+    report["config"] = {"llm_ttft_ms": ttft_ms, "llm_chunk_ms": chunk_ms, "hdfs_latency_ms": hdfs_ms,
+                        "seeded_files": files, "repeat": a.repeat,
+                        "plan_cache": a.plan_cache, "tool_cache": a.tool_cache}
+    report["summary"] = summarize(report)
+
+    regressions: List[str] = []
+    if a.baseline:
+        regressions = compare(report["summary"], json.loads(Path(a.baseline).read_text(encoding="utf-8")),
+                              a.threshold_pct)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if a.out:
+        Path(a.out).write_text(text, encoding="utf-8")
+        print(json.dumps(report["summary"], indent=2))
+    else:
+        print(text)
+    tool_errors = [f"{run['name']}: {err}" for run in report["runs"] for t in run["turns"]
+                   for err in t["tool_errors"]]
+    for r in regressions:
+        print(f"REGRESSION {r}", file=sys.stderr)
+    for e in dict.fromkeys(tool_errors):
+        print(f"TOOL ERROR {e}", file=sys.stderr)
+    return 1 if regressions or tool_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Sharded vs single recursive listing benchmark, on the fake HDFS backend.
+
+  python scripts/bench_list_sharded.py [--dirs 16 --subdirs 8 --files 100] [--repeat 3] [--json]
+
+Seeds a tree of dirs x subdirs x files under FAKE_HDFS_ROOT, then pages
+through it with run_listing (the code behind `list`), following
+continuation tokens, once as a single `ls -R` stream and once sharded
+(MCP_LIST_SHARD_DIRS / MCP_LIST_SHARD_PARALLELISM). Checks that both return
+the same items in the same order and reports the speedup.
+
+The backend charges --exec-latency-ms per exec (docker exec + JVM start) and
+--item-us per listed entry (NameNode listing work), so the numbers model
+where the time goes, not a particular cluster.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+TREE = "/bench/tree"
+
+
+def seed(fake_root: Path, dirs: int, subdirs: int, files: int) -> int:
+    base = fake_root / TREE.lstrip("/")
+    marker = base / f".seeded-{dirs}-{subdirs}-{files}"
+    if marker.exists():
+        return dirs * (1 + subdirs * (1 + files))
+    for i in range(dirs):
+        for j in range(subdirs):
+            d = base / f"d{i:03d}" / f"s{j:03d}"
+            d.mkdir(parents=True, exist_ok=True)
+            for k in range(files):
+                (d / f"f{k:05d}.dat").write_bytes(b"x" * (k % 7))
+    marker.touch()
+    return dirs * (1 + subdirs * (1 + files))
+
+
+def walk(sharded: bool, page: int) -> Tuple[float, List[str], int]:
+    """Full traversal through pages and continuation tokens: (seconds, paths, pages)."""
+    from src.mcp_hdfs.listing import run_listing
+
+    t0 = time.perf_counter()
+    paths: List[str] = []
+    pages = 0
+    res = run_listing(TREE, True, 0, page, sharded=sharded)
+    while True:
+        pages += 1
+        if not res.ok:
+            raise RuntimeError(f"listing failed: {res.stderr.strip()}")
+        paths.extend(it["path"] for it in res.items)
+        if not res.continuation:
+            break
+        res = run_listing(TREE, True, 0, page, continuation=res.continuation)
+    return time.perf_counter() - t0, paths, pages
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dirs", type=int, default=16)
+    ap.add_argument("--subdirs", type=int, default=8)
+    ap.add_argument("--files", type=int, default=100, help="files per subdir")
+    ap.add_argument("--page", type=int, default=5000, help="items per list call")
+    ap.add_argument("--exec-latency-ms", type=float, default=300)
+    ap.add_argument("--item-us", type=float, default=200)
+    ap.add_argument("--shard-dirs", type=int, default=None, help="MCP_LIST_SHARD_DIRS")
+    ap.add_argument("--parallelism", type=int, default=None, help="MCP_LIST_SHARD_PARALLELISM")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--fake-root", default=os.path.join(tempfile.gettempdir(), "mcp_hdfs_bench_list"))
+    ap.add_argument("--json", action="store_true", help="print one JSON document")
+    a = ap.parse_args()
+
+    fake_root = Path(a.fake_root)
+    os.environ.update({
+        "MCP_DOCKER_BIN": f"{sys.executable} {ROOT / 'scripts' / 'fake_hdfs_docker.py'}",
+        "FAKE_HDFS_ROOT": str(fake_root),
+        "FAKE_HDFS_LATENCY_MS": str(a.exec_latency_ms),
+        "FAKE_HDFS_LS_ITEM_US": str(a.item_us),
+        "MCP_STREAM_TIMEOUT_SEC": "3600",
+        "MCP_TIMEOUT_SEC": "600",
+    })
+    if a.shard_dirs:
+        os.environ["MCP_LIST_SHARD_DIRS"] = str(a.shard_dirs)
+    if a.parallelism:
+        os.environ["MCP_LIST_SHARD_PARALLELISM"] = str(a.parallelism)
+
+    from src.config import mcp_settings
+    from src.mcp_hdfs.transfer import shutdown_pool
+
+    entries = seed(fake_root, a.dirs, a.subdirs, a.files)
+    runs: Dict[str, List[float]] = {"single": [], "sharded": []}
+    pages: Dict[str, int] = {}
+    reference: List[str] = []
+    mismatch = None
+    try:
+        for _ in range(a.repeat):
+            for mode in ("single", "sharded"):
+                sec, paths, n_pages = walk(mode == "sharded", a.page)
+                runs[mode].append(sec)
+                pages[mode] = n_pages
+                if not reference:
+                    reference = paths
+                elif paths != reference and mismatch is None:
+                    first = next((i for i, (x, y) in enumerate(zip(paths, reference)) if x != y),
+                                 min(len(paths), len(reference)))
+                    mismatch = {"mode": mode, "index": first, "items": len(paths), "expected": len(reference)}
+    finally:
+        shutdown_pool()
+
+    single = statistics.median(runs["single"])
+    sharded = statistics.median(runs["sharded"])
+    report = {
+        "tree": {"path": TREE, "entries": entries, "listed": len(reference)},
+        "config": {
+            "shard_dirs": mcp_settings.mcp_list_shard_dirs,
+            "parallelism": mcp_settings.mcp_list_shard_parallelism,
+            "page": a.page,
+            "exec_latency_ms": a.exec_latency_ms,
+            "item_us": a.item_us,
+        },
+        "single_sec": round(single, 3),
+        "sharded_sec": round(sharded, 3),
+        "speedup": round(single / sharded, 2) if sharded else None,
+        "pages": pages,
+        "same_order": mismatch is None,
+        "mismatch": mismatch,
+    }
+    if a.json:
+        print(json.dumps(report, indent=2))
+    else:
+        c = report["config"]
+        print(f"tree {TREE}: {len(reference)} entries, {a.repeat} runs, page {a.page}, "
+              f"shard_dirs {c['shard_dirs']}, parallelism {c['parallelism']}")
+        print(f"  single  ls -R  median {single:8.2f} s")
+        print(f"  sharded        median {sharded:8.2f} s   speedup x{report['speedup']}")
+        print(f"  same items and order: {'yes' if mismatch is None else mismatch}")
+    return 0 if mismatch is None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
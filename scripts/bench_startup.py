@@ -0,0 +1,166 @@
+"""
+Cold-start benchmark for the MCP server and the agent.
+
+  python scripts/bench_startup.py [--runs 5] [--json] [--top 12]
+
+Measures, each in a fresh interpreter:
+  - import time of src.mcp_hdfs.server and src.agent.cli (`python -X importtime`),
+    with the heaviest packages by self time;
+  - time to first tool call: spawn the stdio server through fastmcp.Client,
+    list tools and call `balancer_status` (answers without touching HDFS).
+
+Exits with status 1 if a median exceeds its budget, so it can gate changes.
+Run from the repository root with the project's environment (.env) in place.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BUDGET_MS = {
+    "server_import": 1500.0,
+    "agent_import": 1500.0,
+    "first_tool_call": 4000.0,
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+FIRST_CALL_CHILD = """
+import asyncio, sys
+from fastmcp import Client
+
+async def main():
+    async with Client(sys.argv[1]) as c:
+        await c.list_tools()
+        await c.call_tool("balancer_status", {}, raise_on_error=False)
+        print("first-call-done", flush=True)
+
+asyncio.run(main())
+"""
+
+
+def _group(name: str) -> str:
+    parts = name.split(".")
+    return ".".join(parts[:3]) if parts[0] == "src" else parts[0]
+
+
+def import_profile(module: str) -> Tuple[float, Dict[str, float]]:
+    """Returns (total ms for `module`, self ms per package)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["?"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+
+    total_us = 0
+    by_pkg: Dict[str, float] = defaultdict(float)
+    for ln in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(ln)
+        if not m:
+            continue
+        self_us, cum_us, indent, name = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        by_pkg[_group(name)] += self_us / 1000
+        if name == module and len(indent) <= 1:
+            total_us = cum_us
+    return total_us / 1000, dict(by_pkg)
+
+
+def first_tool_call() -> float:
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", FIRST_CALL_CHILD, "mcp_server_bootstrap.py"],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    assert proc.stdout is not None
+    for ln in proc.stdout:
+        if ln.strip() == "first-call-done":
+            elapsed = (time.perf_counter() - t0) * 1000
+            proc.wait()
+            return elapsed
+    err = proc.stderr.read().strip().splitlines() if proc.stderr else []
+    proc.wait()
+    raise RuntimeError(f"first tool call failed: {err[-1] if err else proc.returncode}")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(samples), 1),
+        "min_ms": round(min(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=12, help="heaviest packages to show")
+    ap.add_argument("--json", action="store_true", help="print one JSON document")
+    for key, ms in BUDGET_MS.items():
+        ap.add_argument(f"--budget-{key.replace('_', '-')}", type=float, default=ms, dest=key,
+                        help=f"budget in ms (default {ms:.0f})")
+    a = ap.parse_args()
+
+    samples: Dict[str, List[float]] = {k: [] for k in BUDGET_MS}
+    heaviest: Dict[str, Dict[str, float]] = {}
+    errors: Dict[str, str] = {}
+
+    for _ in range(a.runs):
+        for key, module in (("server_import", "src.mcp_hdfs.server"), ("agent_import", "src.agent.cli")):
+            if key in errors:
+                continue
+            try:
+                total, by_pkg = import_profile(module)
+            except RuntimeError as e:
+                errors[key] = str(e)
+                continue
+            samples[key].append(total)
+            heaviest[key] = by_pkg
+        if "first_tool_call" not in errors:
+            try:
+                samples["first_tool_call"].append(first_tool_call())
+            except RuntimeError as e:
+                errors["first_tool_call"] = str(e)
+
+    report: Dict[str, Dict] = {}
+    over = []
+    for key, values in samples.items():
+        budget = getattr(a, key)
+        if not values:
+            report[key] = {"error": errors.get(key, "no samples"), "budget_ms": budget}
+            continue
+        report[key] = {**summarize(values), "budget_ms": budget, "runs": len(values)}
+        if report[key]["median_ms"] > budget:
+            over.append(key)
+        if key in heaviest:
+            top = sorted(heaviest[key].items(), key=lambda kv: kv[1], reverse=True)[:a.top]
+            report[key]["heaviest_self_ms"] = {k: round(v, 1) for k, v in top}
+
+    if a.json:
+        print(json.dumps({"results": report, "over_budget": over}, indent=2))
+    else:
+        for key, r in report.items():
+            if "error" in r:
+                print(f"{key:16} ERROR {r['error']}")
+                continue
+            flag = "OVER BUDGET" if key in over else "ok"
+            print(f"{key:16} median {r['median_ms']:8.1f} ms  (min {r['min_ms']:.1f}, max {r['max_ms']:.1f}, "
+                  f"budget {r['budget_ms']:.0f})  {flag}")
+            for pkg, ms in r.get("heaviest_self_ms", {}).items():
+                print(f"    {ms:8.1f} ms  {pkg}")
+    return 1 if over or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,424 @@
+"""
+Stand-in for `docker exec <namenode> ...` backed by a local directory, for
+benchmarks and demos without a cluster:
+
+  MCP_DOCKER_BIN="python scripts/fake_hdfs_docker.py"
+
+The HDFS namespace lives under FAKE_HDFS_ROOT; FAKE_HDFS_LATENCY_MS adds a
+fixed delay per exec (docker exec + JVM start of the real thing) and
+FAKE_HDFS_LS_ITEM_US a delay per `ls` entry (NameNode listing RPCs). Supports
+the `hdfs dfs` subcommands the server uses (ls, stat, mkdir, put, get,
+chmod, chown, checksum, count, du, cat, tail), `hdfs fsck` and
+`hdfs dfsadmin -report`, and WebHDFS OPEN through `curl`. Anything else
+that is not `hdfs` runs locally; `hdfs` inside a `bash -c` script calls
+back into this backend.
+
+fsck reports every file healthy (3 live replicas per 128 MB block) except
+those with "under", "missing" or "corrupt" in their name, plus a
+FAKE_HDFS_FSCK_BAD_PCT percent of the others picked by a hash of the path.
+dfsadmin -report shows FAKE_HDFS_DATANODES live datanodes of
+FAKE_HDFS_DATANODE_GB (default 100) holding 3 replicas of the namespace,
+skewed towards the later ones, plus FAKE_HDFS_DEAD_DATANODES dead ones.
+
+For several clusters (MCP_CLUSTERS), put `{container}` in FAKE_HDFS_ROOT:
+each container gets its own namespace, and a container whose directory does
+not exist fails like a stopped one.
+"""
+from __future__ import annotations
+
+import hashlib
+import itertools
+import math
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+import zlib
+from typing import List, Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+ROOT = os.environ.get("FAKE_HDFS_ROOT", os.path.join(os.getcwd(), ".fake_hdfs"))
+LS_ITEM_SEC = float(os.environ.get("FAKE_HDFS_LS_ITEM_US", "0")) / 1e6
+
+
+def local(p: str) -> str:
+    return os.path.join(ROOT, p.lstrip("/"))
+
+
+def fail(msg: str) -> int:
+    print(msg, file=sys.stderr)
+    return 1
+
+
+def ls_line(p: str) -> str:
+    st = os.stat(local(p))
+    is_dir = os.path.isdir(local(p))
+    perm = "drwxr-xr-x" if is_dir else "-rw-r--r--"
+    size = 0 if is_dir else st.st_size
+    stamp = time.strftime("%Y-%m-%d %H:%M", time.gmtime(st.st_mtime))
+    return f"{perm}   {'-' if is_dir else 3} hdfs supergroup {size:>10} {stamp} {p}"
+
+
+def walk(d: str, recursive: bool):
+    for name in sorted(os.listdir(local(d))):
+        child = d.rstrip("/") + "/" + name
+        yield child
+        if recursive and os.path.isdir(local(child)):
+            yield from walk(child, True)
+
+
+def tree_size(p: str) -> int:
+    if not os.path.isdir(local(p)):
+        return os.path.getsize(local(p))
+    return sum(os.path.getsize(local(c)) for c in walk(p, True) if not os.path.isdir(local(c)))
+
+
+def dfs(op: str, args: List[str]) -> int:
+    flags = [a for a in args if a.startswith("-") and len(a) == 2]
+    paths = [a for a in args if a not in flags]
+
+    if op == "ls":
+        rc = 0
+        for p in paths:
+            if not os.path.exists(local(p)):
+                rc = fail(f"ls: `{p}': No such file or directory")
+                continue
+            if os.path.isdir(local(p)):
+                children = list(walk(p, "-R" in flags))
+                if "-R" not in flags:
+                    print(f"Found {len(children)} items")
+                for c in children:
+                    if LS_ITEM_SEC:
+                        time.sleep(LS_ITEM_SEC)
+                    print(ls_line(c))
+            else:
+                print(ls_line(p))
+        return rc
+
+    if op == "stat":
+        fmt, targets = (paths[0], paths[1:]) if len(paths) > 1 else ("%y", paths)
+        rc = 0
+        for p in targets:
+            if not os.path.exists(local(p)):
+                rc = fail(f"stat: `{p}': No such file or directory")
+                continue
+            st = os.stat(local(p))
+            is_dir = os.path.isdir(local(p))
+            values = {
+                "%n": os.path.basename(p.rstrip("/")) or "/", "%b": str(0 if is_dir else st.st_size),
+                "%o": "134217728", "%r": "0" if is_dir else "3", "%u": "hdfs", "%g": "supergroup",
+                "%y": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(st.st_mtime)),
+                "%Y": str(int(st.st_mtime * 1000)),
+                "%F": "directory" if is_dir else "regular file", "%A": "rwxr-xr-x" if is_dir else "rw-r--r--",
+            }
+            out = fmt
+            for k, v in values.items():
+                out = out.replace(k, v)
+            print(out)
+        return rc
+
+    if op == "mkdir":
+        for p in paths:
+            if os.path.exists(local(p)) and "-p" not in flags:
+                return fail(f"mkdir: `{p}': File exists")
+            os.makedirs(local(p), exist_ok=True)
+        return 0
+
+    if op in ("chmod", "chown"):
+        missing = [p for p in paths[1:] if not os.path.exists(local(p))]
+        return fail(f"{op}: `{missing[0]}': No such file or directory") if missing else 0
+
+    if op in ("put", "get"):
+        *sources, dest = paths
+        rc = 0
+        for s in sources:
+            src = s if op == "put" else local(s)
+            dst = local(dest) if op == "put" else dest
+            target = os.path.join(dst, os.path.basename(s)) if os.path.isdir(dst) else dst
+            if os.path.exists(target) and "-f" not in flags:
+                rc = fail(f"{op}: `{target}': File exists")
+                continue
+            shutil.copyfile(src, target)
+        return rc
+
+    if op == "checksum":
+        for p in paths:
+            with open(local(p), "rb") as f:
+                digest = hashlib.md5(f.read()).hexdigest()
+            print(f"{p}\tMD5-of-0MD5-of-512CRC32C\t{digest}")
+        return 0
+
+    if op == "count":
+        rc = 0
+        for p in paths:
+            if not os.path.exists(local(p)):
+                rc = fail(f"count: `{p}': No such file or directory")
+                continue
+            if os.path.isdir(local(p)):
+                dirs, files, size = 1, 0, 0
+                for c in walk(p, True):
+                    if os.path.isdir(local(c)):
+                        dirs += 1
+                    else:
+                        files += 1
+                        size += os.path.getsize(local(c))
+            else:
+                dirs, files, size = 0, 1, os.path.getsize(local(p))
+            quota = "none inf none inf " if "-q" in flags else ""
+            print(f"{quota}{dirs} {files} {size} {p}")
+        return rc
+
+    if op == "du":
+        rc = 0
+        for p in paths:
+            if not os.path.exists(local(p)):
+                rc = fail(f"du: `{p}': No such file or directory")
+                continue
+            targets = [p] if "-s" in flags or not os.path.isdir(local(p)) else list(walk(p, False))
+            for t in targets:
+                size = tree_size(t)
+                print(f"{size}  {size * 3}  {t}")
+        return rc
+
+    if op in ("cat", "tail"):
+        out = sys.stdout.buffer
+        for p in paths:
+            if not os.path.isfile(local(p)):
+                kind = "Is a directory" if os.path.isdir(local(p)) else "No such file or directory"
+                return fail(f"{op}: `{p}': {kind}")
+            with open(local(p), "rb") as f:
+                if op == "tail":
+                    f.seek(max(0, os.path.getsize(local(p)) - 1024))
+                try:
+                    while chunk := f.read(65536):
+                        out.write(chunk)
+                    out.flush()
+                except BrokenPipeError:  # reader stopped early, like a real pipe
+                    os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+                    return 141
+        return 0
+
+    return fail(f"fake backend: unsupported dfs -{op}")
+
+
+BLOCK_SIZE = 134217728
+FSCK_FAULTS = ("under", "missing", "corrupt")
+
+
+def fsck_fault(p: str) -> Optional[str]:
+    name = os.path.basename(p)
+    for fault in FSCK_FAULTS:
+        if fault in name:
+            return fault
+    bad_pct = float(os.environ.get("FAKE_HDFS_FSCK_BAD_PCT", "0"))
+    h = zlib.crc32(p.encode())
+    if bad_pct and h % 10000 < bad_pct * 100:
+        return FSCK_FAULTS[h % 3]
+    return None
+
+
+def fsck(args: List[str]) -> int:
+    """`hdfs fsck <path> [-files] [-blocks]`, in the layout of Hadoop 3 NamenodeFsck."""
+    show_files, show_blocks = "-files" in args, "-blocks" in args
+    path = next((a for a in args if not a.startswith("-")), "/")
+    stamp = time.strftime("%a %b %d %H:%M:%S UTC %Y", time.gmtime())
+    print(f"Connecting to namenode via http://namenode:9870/fsck?ugi=hdfs&path={path}")
+    print(f"FSCK started by hdfs (auth:SIMPLE) from /127.0.0.1 for path {path} at {stamp}")
+    if not os.path.exists(local(path)):
+        print(f"Path '{path}' does not exist")
+        print(f"\n\nFsck on path '{path}' FAILED")
+        return 1
+
+    t0 = time.time()
+    entries = itertools.chain([path], walk(path, True) if os.path.isdir(local(path)) else [])
+    n_files = n_dirs = total = blocks = under = missing = corrupt = replicas = 0
+    blk = 1073741825
+    for p in entries:
+        if LS_ITEM_SEC:
+            time.sleep(LS_ITEM_SEC)
+        if os.path.isdir(local(p)):
+            n_dirs += 1
+            if show_files:
+                print(f"{p} <dir>")
+            continue
+        size = os.path.getsize(local(p))
+        n_blocks = math.ceil(size / BLOCK_SIZE)
+        n_files, total, blocks = n_files + 1, total + size, blocks + n_blocks
+        fault = fsck_fault(p) if n_blocks else None
+        live = {"under": 1, "missing": 0, "corrupt": 0}.get(fault, 3)
+        replicas += live * n_blocks
+        out, report = [], []
+        if show_files:
+            out.append(f"{p} {size} bytes, replicated: replication=3, {n_blocks} block(s): ")
+        for i in range(n_blocks):
+            name = f"BP-1-127.0.0.1-1:blk_{blk}_{blk - 1073740824}"
+            length = min(BLOCK_SIZE, size - i * BLOCK_SIZE)
+            blk += 1
+            if fault == "corrupt":
+                corrupt += 1
+                out.append(f"\n{p}: CORRUPT blockpool BP-1-127.0.0.1-1 block blk_{blk - 1}\n")
+            elif fault == "under":
+                under += 1
+                out.append(("" if show_files else f"\n{p}: ") + f" Under replicated {name}. Target Replicas is 3 "
+                           "but found 1 live replica(s), 0 decommissioned replica(s), "
+                           "0 decommissioning replica(s).\n")
+            report.append(f"{i}. {name} len={length} " + ("MISSING!" if fault == "missing" else f"Live_repl={live}"))
+        if fault == "missing":
+            missing += n_blocks
+            out.append(f" MISSING {n_blocks} blocks of total size {size} B\n" if show_files
+                       else f"\n{p}: MISSING {n_blocks} blocks of total size {size} B.")
+        if show_files:
+            if fault == "corrupt":
+                out.append(f" CORRUPT {n_blocks} blocks of total size {size} B\n")
+            elif fault is None:
+                out.append(" OK\n")
+            if show_blocks:
+                out.append("\n".join(report) + "\n\n")
+        sys.stdout.write("".join(out))
+
+    healthy = not (missing or corrupt)
+    status = "HEALTHY" if healthy else "CORRUPT"
+    pct = lambda n: f"{n} ({100.0 * n / blocks if blocks else 0:.1f} %)"  # noqa: E731
+    print(f"\nStatus: {status}")
+    print(" Number of data-nodes:\t3\n Number of racks:\t\t1")
+    print(f" Total dirs:\t\t\t{n_dirs}\n Total symlinks:\t\t0\n")
+    print("Replicated Blocks:")
+    print(f" Total size:\t{total} B\n Total files:\t{n_files}")
+    print(f" Total blocks (validated):\t{blocks} (avg. block size {total // blocks if blocks else 0} B)")
+    print(f" Minimally replicated blocks:\t{pct(blocks - missing - corrupt)}")
+    print(f" Over-replicated blocks:\t{pct(0)}\n Under-replicated blocks:\t{pct(under)}")
+    print(f" Mis-replicated blocks:\t\t{pct(0)}\n Default replication factor:\t3")
+    print(f" Average block replication:\t{replicas / blocks if blocks else 0:.1f}")
+    print(f" Missing blocks:\t\t{missing}\n Corrupt blocks:\t\t{corrupt}")
+    print(f" Missing replicas:\t\t{2 * under}\n Blocks queued for replication:\t0\n")
+    print("Erasure Coded Block Groups:")
+    print(" Total size:\t0 B\n Total files:\t0\n Total block groups (validated):\t0")
+    print(f"FSCK ended at {stamp} in {int((time.time() - t0) * 1000)} milliseconds\n\n")
+    print(f"The filesystem under path '{path}' is {status}")
+    return 0 if healthy else 1
+
+
+NODE_CAPACITY = int(float(os.environ.get("FAKE_HDFS_DATANODE_GB", "100")) * 1024 ** 3)
+
+
+def size_text(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if n < 1024 or unit == "TB":
+            return f"{n} B" if unit == "B" else f"{n:.2f} {unit}"
+        n /= 1024
+    return ""
+
+
+def dfsadmin_report() -> int:
+    """`hdfs dfsadmin -report`, in the layout of Hadoop 3 DFSAdmin."""
+    live = int(os.environ.get("FAKE_HDFS_DATANODES", "3"))
+    dead = int(os.environ.get("FAKE_HDFS_DEAD_DATANODES", "0"))
+    stored = 3 * (tree_size("/") if os.path.isdir(ROOT) else 0)
+    weights = [i + 1 for i in range(live)]
+    used = [stored * w // sum(weights) for w in weights]
+    stamp = time.strftime("%a %b %d %H:%M:%S UTC %Y", time.gmtime())
+
+    def totals(capacity: int, dfs_used: int) -> List[str]:
+        pct = 100.0 * dfs_used / capacity if capacity else 0.0
+        return [
+            f"Configured Capacity: {capacity} ({size_text(capacity)})",
+            f"DFS Used: {dfs_used} ({size_text(dfs_used)})",
+            "Non DFS Used: 0 (0 B)",
+            f"DFS Remaining: {capacity - dfs_used} ({size_text(capacity - dfs_used)})",
+            f"DFS Used%: {pct:.2f}%",
+            f"DFS Remaining%: {100 - pct:.2f}%",
+        ]
+
+    cap = NODE_CAPACITY * live
+    print(f"Configured Capacity: {cap} ({size_text(cap)})")
+    print(f"Present Capacity: {cap} ({size_text(cap)})")
+    print(f"DFS Remaining: {cap - sum(used)} ({size_text(cap - sum(used))})")
+    print(f"DFS Used: {sum(used)} ({size_text(sum(used))})")
+    print(f"DFS Used%: {100.0 * sum(used) / cap if cap else 0:.2f}%")
+    print("Replicated Blocks:")
+    for key in ("Under replicated blocks", "Blocks with corrupt replicas", "Missing blocks",
+                "Missing blocks (with replication factor 1)", "Pending deletion blocks"):
+        print(f"\t{key}: 0")
+    print("Erasure Coded Block Groups: \n\tLow redundancy block groups: 0\n\tMissing block groups: 0")
+    print("\n-------------------------------------------------")
+    for section, nodes in (("Live", range(live)), ("Dead", range(live, live + dead))):
+        print(f"{section} datanodes ({len(nodes)}):\n")
+        for i in nodes:
+            is_live = section == "Live"
+            print(f"Name: 172.18.0.{10 + i}:9866 (datanode{i + 1})")
+            print(f"Hostname: datanode{i + 1}")
+            print("Decommission Status : Normal")
+            print("\n".join(totals(NODE_CAPACITY if is_live else 0, used[i] if is_live else 0)))
+            print("Configured Cache Capacity: 0 (0 B)\nCache Used: 0 (0 B)\nCache Remaining: 0 (0 B)")
+            print("Cache Used%: 100.00%\nCache Remaining%: 0.00%")
+            print(f"Xceivers: {1 if is_live else 0}")
+            contact = stamp if is_live else time.strftime("%a %b %d %H:%M:%S UTC %Y", time.gmtime(time.time() - 3600))
+            print(f"Last contact: {contact}")
+            print(f"Last Block Report: {contact}")
+            print(f"Num of Blocks: {used[i] // NODE_CAPACITY if is_live else 0}\n\n")
+    return 0
+
+
+def webhdfs_open(url: str) -> int:
+    """`curl -f <webhdfs>/webhdfs/v1<path>?op=OPEN&offset=&length=`, served with a seek."""
+    parts = urlsplit(url)
+    query = parse_qs(parts.query)
+    p = unquote(parts.path[len("/webhdfs/v1"):])
+    offset = int(query.get("offset", ["0"])[0])
+    length = int(query["length"][0]) if "length" in query else None
+    status = ("400 Bad Request" if query.get("op") != ["OPEN"]
+              else "404 Not Found" if not os.path.isfile(local(p))
+              else "403 Forbidden" if offset > os.path.getsize(local(p)) else None)
+    if status:
+        fail(f"curl: (22) The requested URL returned error: {status}")
+        return 22
+    out = sys.stdout.buffer
+    with open(local(p), "rb") as f:
+        f.seek(offset)
+        try:
+            while length is None or length > 0:
+                chunk = f.read(65536 if length is None else min(65536, length))
+                if not chunk:
+                    break
+                out.write(chunk)
+                if length is not None:
+                    length -= len(chunk)
+            out.flush()
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), out.fileno())
+            return 23
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    global ROOT
+    if len(argv) < 3 or argv[0] != "exec":
+        return fail("usage: fake_hdfs_docker.py exec <container> <cmd...>")
+    if "{container}" in ROOT:
+        ROOT = ROOT.replace("{container}", argv[1])
+        if not os.path.isdir(ROOT):
+            return fail(f"Error response from daemon: No such container: {argv[1]}")
+    cmd = argv[2:]
+    delay = float(os.environ.get("FAKE_HDFS_LATENCY_MS", "0")) / 1000
+    if delay:
+        time.sleep(delay)
+    if cmd[:2] == ["bash", "-c"] and len(cmd) > 2:
+        shim = shlex.join([sys.executable, os.path.abspath(__file__), "exec", argv[1]])
+        return subprocess.call(["bash", "-c", f'hdfs() {{ {shim} hdfs "$@"; }}; {cmd[2]}'])
+    if cmd[0] == "curl" and "/webhdfs/v1/" in cmd[-1]:
+        return webhdfs_open(cmd[-1])
+    if cmd[0] != "hdfs":
+        return subprocess.call(cmd)
+    if len(cmd) >= 3 and cmd[1] == "dfs":
+        return dfs(cmd[2].lstrip("-"), cmd[3:])
+    if len(cmd) >= 2 and cmd[1] == "fsck":
+        return fsck(cmd[2:])
+    if cmd[1:3] == ["dfsadmin", "-report"]:
+        return dfsadmin_report()
+    return fail(f"fake backend: unsupported hdfs {cmd[1] if len(cmd) > 1 else ''}")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
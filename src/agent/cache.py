@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import posixpath
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.mcp_hdfs.constants import SAFE_TOOLS
+
+# Read-only tools whose result changes without any write through this agent
+# (job progress; datanode capacity, cached by the server with its own TTL) or
+# that have a local side effect (get writes a file).
+UNCACHED_TOOLS = {"balancer_status", "get", "rate_limits", "clusters", "locks", "cluster_report"}
+
+# Argument names that hold HDFS paths; used for keys and invalidation.
+PATH_ARGS = ("path", "paths", "hdfs_path", "hdfs_dir", "source", "destination")
+
+CACHE_MAX_ENTRIES = 256
+
+
+def _norm_path(p: str) -> str:
+    p = posixpath.normpath(p.strip()) if p.strip() else "/"
+    return "/" if p in (".", "//") else p
+
+
+def normalize_args(args: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for k, v in args.items():
+        if v is None:
+            continue
+        if k in PATH_ARGS and isinstance(v, str):
+            v = _norm_path(v)
+        elif k in PATH_ARGS and isinstance(v, (list, tuple)):
+            v = [_norm_path(x) if isinstance(x, str) else x for x in v]
+        out[k] = v
+    return out
+
+
+def arg_paths(args: Dict[str, Any]) -> List[str]:
+    paths: List[str] = []
+    for k in PATH_ARGS:
+        v = args.get(k)
+        if isinstance(v, str):
+            paths.append(_norm_path(v))
+        elif isinstance(v, (list, tuple)):
+            paths.extend(_norm_path(x) for x in v if isinstance(x, str))
+    return paths
+
+
+def paths_overlap(a: str, b: str) -> bool:
+    """True if one path is the other or an ancestor of it (component-wise)."""
+    if a == b or a == "/" or b == "/":
+        return True
+    return b.startswith(a.rstrip("/") + "/") or a.startswith(b.rstrip("/") + "/")
+
+
+def result_ok(text: str) -> bool:
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        return False
+    return isinstance(data, dict) and data.get("ok") is True
+
+
+@dataclass
+class _Entry:
+    text: str
+    paths: List[str]
+    expires: float
+
+
+class ToolResultCache:
+    """
+    Session-level read-through cache of SAFE_TOOLS results.
+
+    Keyed by tool name and normalized args, entries live for `ttl_sec`.
+    A risky (non read-only) call drops every entry whose paths overlap the
+    call's paths; a risky call without path args, or a cached entry without
+    any, clears conservatively. `ttl_sec <= 0` disables caching.
+    """
+
+    def __init__(self, ttl_sec: float, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def cacheable(tool: str) -> bool:
+        return tool in SAFE_TOOLS and tool not in UNCACHED_TOOLS
+
+    @staticmethod
+    def _key(tool: str, args: Dict[str, Any]) -> Tuple[str, str]:
+        return tool, json.dumps(normalize_args(args), sort_keys=True, ensure_ascii=False, default=str)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_sec > 0
+
+    def get(self, tool: str, args: Dict[str, Any]) -> Optional[str]:
+        if not self.enabled or not self.cacheable(tool):
+            return None
+        key = self._key(tool, args)
+        entry = self._entries.get(key)
+        if entry is None or entry.expires < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.text
+
+    def put(self, tool: str, args: Dict[str, Any], text: str) -> None:
+        if not self.enabled or not self.cacheable(tool) or not result_ok(text):
+            return
+        key = self._key(tool, args)
+        self._entries[key] = _Entry(text=text, paths=arg_paths(args), expires=time.monotonic() + self.ttl_sec)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, paths: Iterable[str]) -> int:
+        paths = [_norm_path(p) for p in paths]
+        stale = [
+            k for k, e in self._entries.items()
+            if not paths or not e.paths or any(paths_overlap(p, q) for p in paths for q in e.paths)
+        ]
+        for k in stale:
+            del self._entries[k]
+        self.invalidated += len(stale)
+        return len(stale)
+
+    def observe(self, tool: str, args: Dict[str, Any]) -> None:
+        """Call after any non read-only tool ran."""
+        if tool not in SAFE_TOOLS and self._entries:
+            self.invalidate(arg_paths(args))
+
+    def render(self) -> str:
+        total = self.hits + self.misses
+        rate = f"{100 * self.hits / total:.0f}%" if total else "n/a"
+        return (f"[cache] session: {self.hits} hits, {self.misses} misses ({rate}), "
+                f"{self.invalidated} invalidated, {len(self._entries)} entries")
@@ -3,16 +3,20 @@ from __future__ import annotations
 import asyncio
 import json
 import time
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 
 from fastmcp import Client
 from src.config import agent_settings
 
-from src.agent.llm import make_client, chat_completion
-from src.agent.mcp_client import mcp_result_to_text, mcp_server_entrypoint, mcp_tool_to_openai
+from src.agent.cache import ToolResultCache
+from src.agent.context import ContextManager, estimate_tokens
+from src.agent.llm import make_client, stream_chat_completion
+from src.agent.plan_cache import PlanCache
+from src.agent.mcp_client import mcp_result_to_text, mcp_server_entrypoint, mcp_tool_to_openai, tool_result_error
 from src.agent.prompts import SYSTEM_PROMPT
 from src.agent.reporting import ActionLog, render_actions_table
-from src.mcp_hdfs.constants import RISKY_TOOLS
+from src.mcp_hdfs.constants import RISKY_TOOLS, SAFE_TOOLS
 
 
 # def needs_user_confirmation(tool_name: str, args: dict) -> bool:
@@ -40,118 +44,318 @@ from src.mcp_hdfs.constants import RISKY_TOOLS
 #     return args
 
 
+def parse_tool_args(raw_args: Any) -> Dict[str, Any]:
+    raw_args = raw_args or "{}"
+    try:
+        args = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
+    except json.JSONDecodeError:
+        args = {}
+    return args if isinstance(args, dict) else {}
+
+
+async def run_tool_call(
+    mcp: Client, tc: Any, cache: Optional[ToolResultCache] = None
+) -> Tuple[Dict[str, Any], ActionLog]:
+    """Execute one tool call; returns the tool message and its action log entry."""
+    fn = tc.function.name
+    args = parse_tool_args(tc.function.arguments)
+
+    t0 = time.perf_counter()
+
+    cached = cache.get(fn, args) if cache is not None else None
+    if cached is not None:
+        print(f"[tool] {fn}({args}) -> ok (cached)")
+        return {
+            "role": "tool",
+            "tool_call_id": tc.id,
+            "name": fn,
+            "content": cached,
+        }, ActionLog(tool=fn, args=args, ok=True, cached=True)
+
+    try:
+        # # args = sanitize_tool_args(fn, args)
+        # if needs_user_confirmation(fn, args):
+        #     print("\n!!!  Risky action requested:")
+        #     print(f"   tool: {fn}")
+        #     print(f"   args: {args}")
+        #     ans = input("Approve? (y/n) > ").strip().lower()
+
+        #     if ans.lower() not in {"y", "yes"}:
+        #         tool_text = json.dumps({"ok": False, "error": "User denied confirmation"}, ensure_ascii=False)
+        #         action = ActionLog(tool=fn, args=args, ok=False, error="User denied confirmation")
+        #         print(f"[tool] {fn}({args}) -> denied by user")
+        #         return {"role": "tool", "tool_call_id": tc.id, "name": fn, "content": tool_text}, action
+
+        #     if isinstance(args, dict):
+        #         args["confirm"] = True
+
+        result = await mcp.call_tool(fn, args)
+        tool_text = mcp_result_to_text(result)
+        # Tools report their own failures as an ok=false payload, not as an exception.
+        error = tool_result_error(tool_text)
+        action = ActionLog(tool=fn, args=args, ok=error is None, error=error)
+        ok = error is None
+    except Exception as e:
+        tool_text = json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
+        action = ActionLog(tool=fn, args=args, ok=False, error=str(e))
+        ok = False
+
+    dt = (time.perf_counter() - t0) * 1000
+    print(f"[tool] {fn}({args}) -> {'ok' if ok else 'error'} in {dt:.1f} ms")
+
+    if cache is not None:
+        # Risky calls invalidate even on error: a failed put_tree may have written part of a tree.
+        if ok:
+            cache.put(fn, args, tool_text)
+        cache.observe(fn, args)
+
+    return {
+        "role": "tool",
+        "tool_call_id": tc.id,
+        "name": fn,
+        "content": tool_text,
+    }, action
+
+
+class ToolDispatcher:
+    """
+    Runs the tool calls of one assistant message.
+
+    Consecutive read-only calls (SAFE_TOOLS) run concurrently, capped by
+    AGENT_TOOL_CONCURRENCY. Any other tool is a barrier: it starts only after
+    everything before it finished, and nothing after it starts until it is
+    done. Tool messages and actions keep the original tool_call order.
+
+    `prestart` is fed from the LLM stream: safe calls that precede the first
+    barrier start executing while the model is still generating.
+    """
+
+    def __init__(self, mcp: Client, concurrency: int, cache: Optional[ToolResultCache] = None) -> None:
+        self.mcp = mcp
+        self.cache = cache
+        self.sem = asyncio.Semaphore(concurrency)
+        self.started: Dict[str, asyncio.Task] = {}
+        self._barrier = False
+
+    async def _run_safe(self, tc: Any) -> Tuple[Dict[str, Any], ActionLog]:
+        async with self.sem:
+            return await run_tool_call(self.mcp, tc, self.cache)
+
+    def prestart(self, tc: Any) -> None:
+        if self._barrier or tc.function.name not in SAFE_TOOLS or not tc.id:
+            self._barrier = True
+            return
+        self.started[tc.id] = asyncio.create_task(self._run_safe(tc))
+
+    def cancel_pending(self) -> None:
+        for task in self.started.values():
+            task.cancel()
+        self.started.clear()
+
+    async def execute(self, tool_calls: List[Any], actions: List[ActionLog]) -> List[Dict[str, Any]]:
+        results: List[Tuple[Dict[str, Any], ActionLog]] = []
+        group: List[Any] = []
+        for tc in tool_calls + [None]:
+            if tc is not None and tc.function.name in SAFE_TOOLS:
+                group.append(tc)
+                continue
+            if group:
+                results.extend(await asyncio.gather(
+                    *(self.started.pop(g.id, None) or self._run_safe(g) for g in group)
+                ))
+                group = []
+            if tc is not None:
+                results.append(await run_tool_call(self.mcp, tc, self.cache))
+
+        for _, action in results:
+            actions.append(action)
+        return [msg for msg, _ in results]
+
+
+async def _append_tool_step(
+    messages: List[Dict[str, Any]],
+    content: str,
+    tool_calls: List[Any],
+    dispatcher: ToolDispatcher,
+    actions: List[ActionLog],
+    stats: "TurnStats",
+) -> None:
+    messages.append({
+        "role": "assistant",
+        "content": content,
+        "tool_calls": [
+            {
+                "id": tc.id,
+                "type": "function",
+                "function": {"name": tc.function.name, "arguments": tc.function.arguments},
+            }
+            for tc in tool_calls
+        ],
+    })
+
+    t_tools = time.perf_counter()
+    tool_messages = await dispatcher.execute(tool_calls, actions)
+    stats.tool_ms += (time.perf_counter() - t_tools) * 1000
+    stats.tool_calls += len(tool_calls)
+    messages.extend(tool_messages)
+
+
+@dataclass
+class TurnStats:
+    llm_calls: int = 0
+    ttft_ms: List[float] = field(default_factory=list)
+    llm_ms: float = 0.0
+    tool_ms: float = 0.0
+    tool_calls: int = 0
+    total_ms: float = 0.0
+    prompt_tokens: int = 0
+    plan_replayed: bool = False
+
+    def render(self) -> str:
+        ttft = f"{self.ttft_ms[0]:.0f} ms" if self.ttft_ms else "n/a"
+        return (f"[turn] {self.total_ms:.0f} ms total | llm {self.llm_calls} call(s) {self.llm_ms:.0f} ms, "
+                f"first token {ttft}, prompt ~{self.prompt_tokens} tokens | "
+                f"tools {self.tool_calls} call(s) {self.tool_ms:.0f} ms")
+
+
+async def run_turn(
+    llm_client: Any,
+    mcp: Client,
+    tools: List[Dict[str, Any]],
+    messages: List[Dict[str, Any]],
+    user_text: str,
+    context: ContextManager,
+    cache: Optional[ToolResultCache] = None,
+    plans: Optional[PlanCache] = None,
+) -> TurnStats:
+    """
+    One user request: LLM <-> tools loop until a final answer (max 10 steps).
+    With a plan cache hit the first step is the cached plan instead of an LLM call.
+    """
+    stats = TurnStats()
+    t_turn = time.perf_counter()
+    actions: List[ActionLog] = []
+    messages.append({"role": "user", "content": user_text})
+
+    plan = plans.match(user_text) if plans is not None else None
+    answered = False
+
+    for step in range(10):
+        dispatcher = ToolDispatcher(mcp, agent_settings.agent_tool_concurrency, cache)
+        printed = False
+
+        if step == 0 and plan is not None:
+            stats.plan_replayed = True
+            print(f"[plan] replaying {len(plan.calls)} tool call(s) learned for '{plan.entry.template}' "
+                  f"(seen {plan.entry.seen}x)")
+            await _append_tool_step(messages, "", plan.calls, dispatcher, actions, stats)
+            continue
+
+        fitted = context.fit(messages)
+        stats.prompt_tokens = max(stats.prompt_tokens, fitted.tokens_after)
+        print(fitted.render(context.budget_tokens))
+
+        def on_text(chunk: str) -> None:
+            nonlocal printed
+            if not printed:
+                print("\nagent-hdfs> ", end="")
+                printed = True
+            print(chunk, end="", flush=True)
+
+        try:
+            res = await stream_chat_completion(
+                client=llm_client,
+                model=agent_settings.openrouter_model,
+                messages=messages,
+                tools=tools,
+                on_text=on_text,
+                on_tool_call=dispatcher.prestart,
+            )
+        except Exception:
+            dispatcher.cancel_pending()
+            raise
+        if printed:
+            print("\n")
+
+        stats.llm_calls += 1
+        stats.llm_ms += res.total_ms
+        if res.ttft_ms is not None:
+            stats.ttft_ms.append(res.ttft_ms)
+        prompt = f", prompt {res.usage['prompt_tokens']} tokens" if res.usage and res.usage.get("prompt_tokens") else ""
+        print(f"[llm] first token {res.ttft_ms or 0:.0f} ms, complete {res.total_ms:.0f} ms{prompt}")
+
+        tool_calls = res.tool_calls
+        if not tool_calls:
+            content = res.content or ""
+            if not printed:
+                print(f"\nagent-hdfs> {content}\n")
+            print(render_actions_table(actions))
+            messages.append({"role": "assistant", "content": content})
+            answered = True
+            break
+
+        await _append_tool_step(messages, res.content or "", tool_calls, dispatcher, actions, stats)
+    else:
+        print("\nagent-hdfs> Too many tool steps; stopping.\n")
+        print(render_actions_table(actions))
+
+    # A replay the model answered without extra tool calls is not new evidence for the plan.
+    if plans is not None and answered and (plan is None or len(actions) > len(plan.calls)):
+        plans.learn(user_text, actions)
+
+    stats.total_ms = (time.perf_counter() - t_turn) * 1000
+    print(stats.render())
+    if cache is not None and cache.enabled:
+        print(cache.render())
+    if plans is not None:
+        print(plans.render())
+    print()
+    return stats
+
+
 async def main() -> None:
     print("HDFS control & assist (MCP) - CLI")
     print("Type 'exit' to quit.\n")
 
-    llm_client = make_client()
+    t0 = time.perf_counter()
+    # The openai import and client setup overlap with the MCP server process start.
+    llm_ready = asyncio.create_task(asyncio.to_thread(make_client))
+    llm_client = None
     server_path = mcp_server_entrypoint()
 
-    async with Client(server_path) as mcp:
-        mcp_tools = await mcp.list_tools()
-        tools = [mcp_tool_to_openai(t) for t in mcp_tools]
-
-        messages: List[Dict[str, Any]] = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-        while True:
-            user_text = input("you> ").strip()
-            if not user_text:
-                continue
-            if user_text.lower() in {"exit", "quit"}:
-                break
-
-            actions: List[ActionLog] = []
-            messages.append({"role": "user", "content": user_text})
-
-            for _ in range(10):
-                resp = chat_completion(
-                    client=llm_client,
-                    model=agent_settings.openrouter_model,
-                    messages=messages,
-                    tools=tools,
-                )
-
-                msg = resp.choices[0].message
-                tool_calls = msg.tool_calls or []
-
-                if not tool_calls:
-                    content = msg.content or ""
-                    print(f"\nagent-hdfs> {content}\n")
-                    print(render_actions_table(actions))
-                    print()
-                    messages.append({"role": "assistant", "content": content})
+    try:
+        async with Client(server_path) as mcp:
+            mcp_tools = await mcp.list_tools()
+            tools = [mcp_tool_to_openai(t) for t in mcp_tools]
+            llm_client = await llm_ready
+            print(f"[startup] ready in {(time.perf_counter() - t0) * 1000:.0f} ms ({len(tools)} tools)\n")
+
+            messages: List[Dict[str, Any]] = [{"role": "system", "content": SYSTEM_PROMPT}]
+            context = ContextManager(
+                budget_tokens=agent_settings.agent_context_token_budget,
+                keep_turns=agent_settings.agent_context_keep_turns,
+                reserved_tokens=estimate_tokens(tools),
+            )
+            cache = ToolResultCache(ttl_sec=agent_settings.agent_tool_cache_ttl_sec)
+            plans = PlanCache(
+                max_entries=agent_settings.agent_plan_cache_size,
+                min_seen=agent_settings.agent_plan_cache_min_seen,
+                path=agent_settings.agent_plan_cache_file,
+            ) if agent_settings.agent_plan_cache else None
+
+            while True:
+                user_text = (await asyncio.to_thread(input, "you> ")).strip()
+                if not user_text:
+                    continue
+                if user_text.lower() in {"exit", "quit"}:
                     break
 
-                messages.append({
-                    "role": "assistant",
-                    "content": msg.content or "",
-                    "tool_calls": [
-                        {
-                            "id": tc.id,
-                            "type": "function",
-                            "function": {"name": tc.function.name, "arguments": tc.function.arguments},
-                        }
-                        for tc in tool_calls
-                    ],
-                })
-
-                for tc in tool_calls:
-                    fn = tc.function.name
-                    raw_args = tc.function.arguments or "{}"
-
-                    try:
-                        args = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
-                    except json.JSONDecodeError:
-                        args = {}
-                    
-                    t0 = time.perf_counter()
-
-                    try:
-                        # # args = sanitize_tool_args(fn, args)
-                        # if needs_user_confirmation(fn, args):
-                        #     print("\n!!!  Risky action requested:")
-                        #     print(f"   tool: {fn}")
-                        #     print(f"   args: {args}")
-                        #     ans = input("Approve? (y/n) > ").strip().lower()
-
-                        #     if ans.lower() not in {"y", "yes"}:
-                        #         tool_text = json.dumps({"ok": False, "error": "User denied confirmation"}, ensure_ascii=False)
-                        #         actions.append(ActionLog(tool=fn, args=args, ok=False, error="User denied confirmation"))
-                        #         print(f"[tool] {fn}({args}) -> denied by user")
-
-                        #         messages.append({
-                        #             "role": "tool",
-                        #             "tool_call_id": tc.id,
-                        #             "name": fn,
-                        #             "content": tool_text,
-                        #         })
-                        #         continue
-
-                        #     if isinstance(args, dict):
-                        #         args["confirm"] = True
-
-                        result = await mcp.call_tool(fn, args)
-                        tool_text = mcp_result_to_text(result)
-                        actions.append(ActionLog(tool=fn, args=args, ok=True))
-                        ok = True
-                    except Exception as e:
-                        tool_text = json.dumps({"ok": False, "error": str(e)}, ensure_ascii=False)
-                        actions.append(ActionLog(tool=fn, args=args, ok=False, error=str(e)))
-                        ok = False
-
-                    dt = (time.perf_counter() - t0) * 1000
-                    print(f"[tool] {fn}({args}) -> {'ok' if ok else 'error'} in {dt:.1f} ms")
-
-                    messages.append({
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "name": fn,
-                        "content": tool_text,
-                    })
-            else:
-                print("\nagent-hdfs> Too many tool steps; stopping.\n")
-                print(render_actions_table(actions))
-                print()
+                await run_turn(llm_client, mcp, tools, messages, user_text, context, cache, plans)
+    finally:
+        if llm_client is None and not llm_ready.cancelled() and llm_ready.done() and not llm_ready.exception():
+            llm_client = llm_ready.result()
+        if llm_client is not None:
+            await llm_client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Rough but stable: ~4 characters per token for JSON-ish English text.
+CHARS_PER_TOKEN = 4
+
+# Tool outputs shorter than this are never worth a digest.
+DIGEST_MIN_CHARS = 600
+# Items of a list kept by name in a digest.
+DIGEST_LIST_SAMPLE = 5
+# Smallest size a recent tool output is truncated to when over budget.
+TRUNCATE_MIN_CHARS = 2000
+# Lines of the running summary of dropped turns.
+SUMMARY_MAX_LINES = 30
+
+SUMMARY_HEADER = "Summary of earlier conversation (older turns were dropped to save context):"
+
+
+def estimate_tokens(obj: Any) -> int:
+    text = obj if isinstance(obj, str) else json.dumps(obj, ensure_ascii=False, default=str)
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _short(v: Any, limit: int = 80) -> Any:
+    if isinstance(v, str) and len(v) > limit:
+        return v[:limit] + "..."
+    return v
+
+
+def _summarize(v: Any, depth: int = 0) -> Any:
+    if isinstance(v, dict):
+        if depth >= 2:
+            return f"<object with {len(v)} keys>"
+        return {k: _summarize(x, depth + 1) for k, x in v.items()}
+    if isinstance(v, (list, tuple)):
+        sample = []
+        for x in v[:DIGEST_LIST_SAMPLE]:
+            if isinstance(x, dict):
+                x = x.get("path") or x.get("name") or x.get("id") or f"<object with {len(x)} keys>"
+            sample.append(_short(x, 120))
+        return {"count": len(v), "first": sample} if len(v) > DIGEST_LIST_SAMPLE else sample
+    return _short(v)
+
+
+def digest_tool_output(tool: str, text: str) -> str:
+    """
+    Compact stand-in for a large tool result: scalars are kept, lists become
+    their length plus the first few names. Marked with "compacted" so the
+    model knows to call the tool again if it needs the full payload.
+    """
+    try:
+        summary: Any = _summarize(json.loads(text))
+    except (json.JSONDecodeError, TypeError):
+        summary = _short(text, 400)
+    return json.dumps(
+        {"compacted": True, "tool": tool, "original_chars": len(text), "summary": summary},
+        ensure_ascii=False,
+    )
+
+
+def is_digest(text: Any) -> bool:
+    return isinstance(text, str) and text.startswith('{"compacted": true')
+
+
+@dataclass
+class CompactionStats:
+    tokens_before: int = 0
+    tokens_after: int = 0
+    messages: int = 0
+    digested: int = 0
+    truncated: int = 0
+    dropped_turns: int = 0
+
+    def render(self, budget: int) -> str:
+        line = f"[context] ~{self.tokens_after} tokens in {self.messages} messages (budget {budget})"
+        changes = []
+        if self.digested:
+            changes.append(f"{self.digested} outputs digested")
+        if self.dropped_turns:
+            changes.append(f"{self.dropped_turns} turns dropped")
+        if self.truncated:
+            changes.append(f"{self.truncated} outputs truncated")
+        if changes:
+            line += f", was ~{self.tokens_before}: " + ", ".join(changes)
+        return line
+
+
+class ContextManager:
+    """
+    Keeps the conversation sent to the LLM under a token budget.
+
+    Turns start at each user message. Applied in order until the prompt fits:
+      1. tool outputs of turns older than the last `keep_turns` become digests;
+      2. the oldest turns are dropped whole (assistant tool_calls and their
+         tool responses always go together) and folded into a short summary
+         message after the system prompt;
+      3. the largest tool outputs of the recent turns are truncated.
+    The list is edited in place so the CLI can keep appending to it.
+    """
+
+    def __init__(self, budget_tokens: int, keep_turns: int, reserved_tokens: int = 0) -> None:
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.reserved_tokens = reserved_tokens  # tool schemas etc. sent with every request
+
+    def size(self, messages: List[Dict[str, Any]]) -> int:
+        return self.reserved_tokens + estimate_tokens(messages)
+
+    @staticmethod
+    def _turn_starts(messages: List[Dict[str, Any]]) -> List[int]:
+        return [i for i, m in enumerate(messages) if m.get("role") == "user"]
+
+    @staticmethod
+    def _summary_index(messages: List[Dict[str, Any]]) -> Optional[int]:
+        for i, m in enumerate(messages[:2]):
+            if m.get("role") == "system" and str(m.get("content", "")).startswith(SUMMARY_HEADER):
+                return i
+        return None
+
+    def fit(self, messages: List[Dict[str, Any]]) -> CompactionStats:
+        stats = CompactionStats(tokens_before=self.size(messages))
+        if stats.tokens_before > self.budget_tokens:
+            self._digest_old(messages, stats)
+        if self.size(messages) > self.budget_tokens:
+            self._drop_old_turns(messages, stats)
+        if self.size(messages) > self.budget_tokens:
+            self._truncate_recent(messages, stats)
+        stats.tokens_after = self.size(messages)
+        stats.messages = len(messages)
+        return stats
+
+    def _old_boundary(self, messages: List[Dict[str, Any]]) -> int:
+        """Index of the first message of the recent (verbatim) turns."""
+        starts = self._turn_starts(messages)
+        if len(starts) <= self.keep_turns:
+            return starts[0] if starts else len(messages)
+        return starts[len(starts) - self.keep_turns] if self.keep_turns else len(messages)
+
+    def _digest_old(self, messages: List[Dict[str, Any]], stats: CompactionStats) -> None:
+        for m in messages[:self._old_boundary(messages)]:
+            content = m.get("content")
+            if m.get("role") != "tool" or not isinstance(content, str):
+                continue
+            if len(content) < DIGEST_MIN_CHARS or is_digest(content):
+                continue
+            m["content"] = digest_tool_output(m.get("name", ""), content)
+            stats.digested += 1
+
+    def _drop_old_turns(self, messages: List[Dict[str, Any]], stats: CompactionStats) -> None:
+        lines: List[str] = []
+        while self.size(messages) > self.budget_tokens:
+            starts = self._turn_starts(messages)
+            if len(starts) <= max(self.keep_turns, 1):
+                break
+            begin, end = starts[0], starts[1]
+            lines.append(self._summarize_turn(messages[begin:end]))
+            del messages[begin:end]
+            stats.dropped_turns += 1
+        if lines:
+            self._add_summary(messages, lines)
+
+    @staticmethod
+    def _summarize_turn(turn: List[Dict[str, Any]]) -> str:
+        user = _short(str(turn[0].get("content", "")), 120)
+        tools = []
+        answer = ""
+        for m in turn[1:]:
+            if m.get("role") == "tool":
+                content = str(m.get("content", ""))
+                failed = '"ok": false' in content or '"ok":false' in content
+                tools.append(f"{m.get('name', '?')}{' (error)' if failed else ''}")
+            elif m.get("role") == "assistant" and m.get("content"):
+                answer = str(m["content"])
+        line = f"- user: {user}"
+        if tools:
+            line += f" | tools: {', '.join(tools)}"
+        if answer:
+            line += f" | answer: {_short(answer, 160)}"
+        return line
+
+    def _add_summary(self, messages: List[Dict[str, Any]], lines: List[str]) -> None:
+        idx = self._summary_index(messages)
+        if idx is None:
+            idx = 1 if messages and messages[0].get("role") == "system" else 0
+            messages.insert(idx, {"role": "system", "content": SUMMARY_HEADER})
+        old = str(messages[idx]["content"]).split("\n")[1:]
+        kept = (old + lines)[-SUMMARY_MAX_LINES:]
+        messages[idx]["content"] = "\n".join([SUMMARY_HEADER] + kept)
+
+    def _truncate_recent(self, messages: List[Dict[str, Any]], stats: CompactionStats) -> None:
+        tool_msgs = sorted(
+            (m for m in messages if m.get("role") == "tool" and isinstance(m.get("content"), str)),
+            key=lambda m: len(m["content"]),
+            reverse=True,
+        )
+        for m in tool_msgs:
+            over_chars = (self.size(messages) - self.budget_tokens) * CHARS_PER_TOKEN
+            if over_chars <= 0:
+                break
+            content = m["content"]
+            keep = max(TRUNCATE_MIN_CHARS, len(content) - over_chars)
+            if keep >= len(content):
+                continue
+            m["content"] = content[:keep] + f"\n...[truncated {len(content) - keep} of {len(content)} chars]"
+            stats.truncated += 1
@@ -1,30 +1,118 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
-from openai import OpenAI
 from src.config import agent_settings
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-def make_client() -> OpenAI:
-    return OpenAI(api_key=agent_settings.openrouter_api_key,
-                  base_url="https://openrouter.ai/api/v1")
 
+@dataclass
+class FunctionCall:
+    name: str
+    arguments: str = ""
 
-def chat_completion(
-    client: OpenAI,
+
+@dataclass
+class ToolCall:
+    id: str
+    function: FunctionCall
+    index: int = 0
+
+
+@dataclass
+class CompletionResult:
+    content: str = ""
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    ttft_ms: Optional[float] = None
+    total_ms: float = 0.0
+    usage: Optional[Dict[str, Any]] = None
+
+
+def make_client() -> AsyncOpenAI:
+    # One client per CLI session: its HTTP connection pool is reused across turns.
+    # openai is imported here: the CLI builds the client off the event loop
+    # while the MCP server process starts.
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=agent_settings.openrouter_api_key,
+                       base_url=agent_settings.openrouter_base_url)
+
+
+async def stream_chat_completion(
+    client: AsyncOpenAI,
     model: str,
     messages: List[Dict[str, Any]],
     tools: List[Dict[str, Any]],
-) -> Any:
-    return client.chat.completions.create(
+    on_text: Optional[Callable[[str], None]] = None,
+    on_tool_call: Optional[Callable[[ToolCall], None]] = None,
+) -> CompletionResult:
+    """
+    Streamed chat completion.
+
+    Text deltas go to `on_text` as they arrive. Tool-call deltas are assembled
+    per index; a call is handed to `on_tool_call` as soon as it is complete,
+    i.e. when the next call starts or the stream ends, so the caller can start
+    executing it while the model is still generating.
+    """
+    t0 = time.perf_counter()
+    res = CompletionResult()
+    calls: Dict[int, ToolCall] = {}
+    current: Optional[int] = None
+
+    def finish(index: Optional[int]) -> None:
+        if index is not None and on_tool_call is not None:
+            on_tool_call(calls[index])
+
+    stream = await client.chat.completions.create(
         model=model,
         messages=messages,
         tools=tools,
         tool_choice="auto",
         temperature=0.2,
+        stream=True,
+        stream_options={"include_usage": True},
         extra_headers={
             "HTTP-Referer": "http://localhost",
             "X-Title": "hdfs-mcp-agent",
         },
     )
+
+    parts: List[str] = []
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+            res.usage = usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if res.ttft_ms is None and (delta.content or delta.tool_calls):
+            res.ttft_ms = (time.perf_counter() - t0) * 1000
+
+        if delta.content:
+            parts.append(delta.content)
+            if on_text is not None:
+                on_text(delta.content)
+
+        for d in delta.tool_calls or []:
+            idx = d.index if d.index is not None else (current or 0)
+            if idx != current:
+                finish(current)
+                current = idx
+            call = calls.setdefault(idx, ToolCall(id=d.id or "", function=FunctionCall(name=""), index=idx))
+            if d.id:
+                call.id = d.id
+            if d.function is not None:
+                if d.function.name:
+                    call.function.name += d.function.name
+                if d.function.arguments:
+                    call.function.arguments += d.function.arguments
+
+    finish(current)
+    res.content = "".join(parts)
+    res.tool_calls = [calls[i] for i in sorted(calls)]
+    res.total_ms = (time.perf_counter() - t0) * 1000
+    return res
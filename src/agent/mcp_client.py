@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from src.config import agent_settings
 
 
 def _tool_to_dict(tool: Any) -> Dict[str, Any]:
@@ -50,5 +52,36 @@ def mcp_result_to_text(result: Any) -> str:
         return str(result)
 
 
-def mcp_server_entrypoint() -> str:
-    return "mcp_server_bootstrap.py"
+def tool_result_error(tool_text: str) -> Optional[str]:
+    """
+    The error of a tool result whose payload reports ok=false (the server's
+    ToolError shape, possibly wrapped under "result"), else None.
+    """
+    try:
+        payload = json.loads(tool_text)
+    except ValueError:
+        return None
+    if isinstance(payload, dict) and isinstance(payload.get("result"), dict) and "ok" not in payload:
+        payload = payload["result"]
+    if not isinstance(payload, dict) or payload.get("ok") is not False:
+        return None
+    return str(payload.get("error") or "tool returned ok=false")
+
+
+def mcp_server_entrypoint() -> Any:
+    """
+    What fastmcp.Client connects to: the stdio bootstrap script (a private
+    server per CLI session) or, with MCP_SERVER_URL, a transport to a shared
+    server. The operator name is sent as X-MCP-User (the server's default
+    MCP_USER_HEADER) and ends up in the audit log.
+    """
+    url = agent_settings.mcp_server_url
+    if not url:
+        return "mcp_server_bootstrap.py"
+
+    from fastmcp.client.transports import SSETransport, StreamableHttpTransport
+
+    headers = {"X-MCP-User": agent_settings.agent_user}
+    if url.rstrip("/").endswith("/sse"):
+        return SSETransport(url, headers=headers)
+    return StreamableHttpTransport(url, headers=headers)
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.agent.llm import FunctionCall, ToolCall
+from src.agent.reporting import ActionLog
+from src.mcp_hdfs.constants import SAFE_TOOLS
+
+# Read-only, but with a local side effect: never replayed without the model.
+NOT_REPLAYABLE = {"get"}
+
+# Non-parameter string args longer than this are treated as derived from
+# earlier results (continuation tokens etc.), which makes a plan unusable.
+MAX_LITERAL_CHARS = 32
+
+_PARAM_RE = re.compile(
+    r"""(?P<str>"[^"]*"|'[^']*')"""
+    r"""|(?P<path>(?<![\w/])/[^\s,;'"`()]*)"""
+    r"""|(?P<num>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))"""
+)
+
+
+def _clean_path(p: str) -> str:
+    p = p.rstrip(".,:;!?")
+    return p.rstrip("/") or "/"
+
+
+def extract_template(text: str) -> Tuple[str, List[Any]]:
+    """
+    "Show quotas for /data/X and /data/Y" -> ("show quotas for <path> and <path>", ["/data/X", "/data/Y"]).
+    Paths, quoted strings and numbers become typed placeholders; the rest is
+    lowercased with punctuation and extra spaces removed.
+    """
+    params: List[Any] = []
+
+    def sub(m: re.Match) -> str:
+        kind = m.lastgroup
+        raw = m.group(kind)
+        if kind == "path":
+            params.append(_clean_path(raw))
+        elif kind == "str":
+            params.append(raw[1:-1])
+        else:
+            params.append(float(raw) if "." in raw else int(raw))
+        return f" <{kind}> "
+
+    body = _PARAM_RE.sub(sub, text.strip())
+    body = re.sub(r"[^\w<>\s]", " ", body.lower())
+    return " ".join(body.split()), params
+
+
+def _templated(value: Any, params: List[Any], used: set) -> Tuple[Any, bool]:
+    """Replace values that came from the request with {"$p": index}; False if not templatable."""
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            out[k], ok = _templated(v, params, used)
+            if not ok:
+                return None, False
+        return out, True
+    if isinstance(value, list):
+        out_list = []
+        for v in value:
+            t, ok = _templated(v, params, used)
+            if not ok:
+                return None, False
+            out_list.append(t)
+        return out_list, True
+    if isinstance(value, bool) or value is None:
+        return value, True
+    probe = _clean_path(value) if isinstance(value, str) and value.startswith("/") else value
+    for i, p in enumerate(params):
+        if type(p) is type(probe) and p == probe:
+            used.add(i)
+            return {"$p": i}, True
+    if isinstance(value, str) and (value.startswith("/") or len(value) > MAX_LITERAL_CHARS):
+        return None, False  # path or token the request does not mention: depends on earlier results
+    return value, True
+
+
+def _fill(value: Any, params: List[Any]) -> Any:
+    if isinstance(value, dict):
+        if set(value) == {"$p"}:
+            return params[value["$p"]]
+        return {k: _fill(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, params) for v in value]
+    return value
+
+
+@dataclass
+class PlanEntry:
+    template: str
+    kinds: List[str]
+    steps: List[Dict[str, Any]]   # [{"tool": ..., "args": templated args}]
+    seen: int = 1                 # times the model produced this exact plan
+    hits: int = 0
+
+
+@dataclass
+class PlanMatch:
+    entry: PlanEntry
+    calls: List[ToolCall] = field(default_factory=list)
+
+
+class PlanCache:
+    """
+    Request -> tool-call plan cache.
+
+    After a turn that ended in an answer, its tool calls are stored under the
+    request template if every call was read-only and succeeded (no exception
+    and an ok=true payload, see ActionLog.ok), every argument is either a
+    literal or a parameter of the request, and every request parameter was
+    used. A later request with the same template runs
+    the plan directly once the model has produced it `min_seen` times; the
+    model is then only asked to phrase the answer (it may still call more
+    tools). Least recently used templates are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int, min_seen: int, path: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.min_seen = min_seen
+        self.path = Path(path) if path else None
+        self._plans: "OrderedDict[str, PlanEntry]" = OrderedDict()
+        self.lookups = 0
+        self.hits = 0
+        self.learned = 0
+        self._load()
+
+    @staticmethod
+    def _kinds(params: List[Any]) -> List[str]:
+        return [type(p).__name__ for p in params]
+
+    def match(self, text: str) -> Optional[PlanMatch]:
+        self.lookups += 1
+        template, params = extract_template(text)
+        entry = self._plans.get(template)
+        if entry is None or entry.seen < self.min_seen or entry.kinds != self._kinds(params):
+            return None
+        self._plans.move_to_end(template)
+        entry.hits += 1
+        self.hits += 1
+        calls = [
+            ToolCall(
+                id=f"plan-{i}",
+                function=FunctionCall(name=step["tool"], arguments=json.dumps(_fill(step["args"], params))),
+                index=i,
+            )
+            for i, step in enumerate(entry.steps)
+        ]
+        return PlanMatch(entry=entry, calls=calls)
+
+    def learn(self, text: str, actions: List[ActionLog]) -> bool:
+        if not actions:
+            return False
+        if any(a.tool not in SAFE_TOOLS or a.tool in NOT_REPLAYABLE or not a.ok for a in actions):
+            return False
+        template, params = extract_template(text)
+        used: set = set()
+        steps = []
+        for a in actions:
+            args, ok = _templated(a.args, params, used)
+            if not ok:
+                return False
+            steps.append({"tool": a.tool, "args": args})
+        if len(used) != len(params):
+            return False
+
+        kinds = self._kinds(params)
+        entry = self._plans.get(template)
+        if entry is not None and entry.steps == steps and entry.kinds == kinds:
+            entry.seen += 1
+        else:
+            self._plans[template] = PlanEntry(template=template, kinds=kinds, steps=steps)
+            self.learned += 1
+        self._plans.move_to_end(template)
+        while len(self._plans) > self.max_entries:
+            self._plans.popitem(last=False)
+        self._save()
+        return True
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for row in data.get("plans", [])[-self.max_entries:]:
+                entry = PlanEntry(**row)
+                self._plans[entry.template] = entry
+        except (OSError, ValueError, TypeError):
+            self._plans.clear()  # unreadable cache: start empty
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"plans": [asdict(e) for e in self._plans.values()]}, ensure_ascii=False),
+                       encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def render(self) -> str:
+        rate = f"{100 * self.hits / self.lookups:.0f}%" if self.lookups else "n/a"
+        return (f"[plan] session: {self.hits}/{self.lookups} requests replayed ({rate}), "
+                f"{self.learned} plans learned, {len(self._plans)} cached")
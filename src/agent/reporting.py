@@ -8,8 +8,9 @@ from typing import Any, Dict, List, Optional
 class ActionLog:
     tool: str
     args: Dict[str, Any]
-    ok: bool
+    ok: bool                  # the call raised nothing and its payload did not report ok=false
     error: Optional[str] = None
+    cached: bool = False
 
 
 def render_actions_table(actions: List[ActionLog]) -> str:
@@ -19,6 +20,8 @@ def render_actions_table(actions: List[ActionLog]) -> str:
     lines = ["Actions:"]
     for i, a in enumerate(actions, start=1):
         status = "OK" if a.ok else "ERROR"
+        if a.cached:
+            status += " (cached)"
         line = f"{i}) {a.tool}({a.args})  {status}"
         if a.error:
             line += f" | {a.error}"
@@ -1,4 +1,22 @@
-from .mcp_settings import mcp_settings
-from .agent_settings import agent_settings
+from importlib import import_module
+
+# Settings are built on first access (PEP 562), so each process only reads
+# and validates what it uses: the MCP server never needs the OpenRouter key.
+# Import the instances from this package, not the submodules: importing
+# `src.config.mcp_settings` directly would shadow the lazy attribute.
+_LAZY = {
+    "mcp_settings": (".mcp_settings", "MCPSettings"),
+    "agent_settings": (".agent_settings", "AgentSettings"),
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, cls = _LAZY[name]
+    value = getattr(import_module(module, __name__), cls)()
+    globals()[name] = value
+    return value
+
 
 __all__ = ["mcp_settings", "agent_settings"]
@@ -1,7 +1,17 @@
+import getpass
+from typing import Optional
+
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+def _os_user() -> str:
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return "unknown"
+
+
 class AgentSettings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -11,6 +21,32 @@ class AgentSettings(BaseSettings):
 
     openrouter_api_key: str = Field(alias="OPENROUTER_API_KEY")
     openrouter_model: str = Field(alias="OPENROUTER_MODEL")
+    # Any OpenAI-compatible endpoint; benchmarks point it at a local stub
+    openrouter_base_url: str = Field(default="https://openrouter.ai/api/v1", alias="OPENROUTER_BASE_URL")
+
+    # Shared MCP server (e.g. http://mcp-host:8765/mcp); unset = spawn a private stdio server
+    mcp_server_url: Optional[str] = Field(default=None, alias="MCP_SERVER_URL")
+    # Operator name sent to a shared server for its audit log
+    agent_user: str = Field(default_factory=_os_user, alias="AGENT_USER")
+
+    # Max read-only (SAFE_TOOLS) calls from one assistant message run concurrently
+    agent_tool_concurrency: int = Field(default=4, ge=1, le=32, alias="AGENT_TOOL_CONCURRENCY")
+
+    # Estimated prompt tokens (history + tool schemas) sent per LLM call; older context is compacted beyond it
+    agent_context_token_budget: int = Field(default=24000, ge=2000, alias="AGENT_CONTEXT_TOKEN_BUDGET")
+    # Most recent user turns always kept verbatim (tool outputs included)
+    agent_context_keep_turns: int = Field(default=2, ge=1, alias="AGENT_CONTEXT_KEEP_TURNS")
+
+    # Read-only tool results are reused within a session for this long (0 disables)
+    agent_tool_cache_ttl_sec: float = Field(default=30.0, ge=0, le=3600, alias="AGENT_TOOL_CACHE_TTL_SEC")
+
+    # Replay learned read-only request -> tool-call plans without an LLM planning step
+    agent_plan_cache: bool = Field(default=True, alias="AGENT_PLAN_CACHE")
+    agent_plan_cache_size: int = Field(default=128, ge=1, le=10000, alias="AGENT_PLAN_CACHE_SIZE")
+    # Times the model must have produced the same plan for a request template before it is replayed
+    agent_plan_cache_min_seen: int = Field(default=2, ge=1, le=100, alias="AGENT_PLAN_CACHE_MIN_SEEN")
+    # Optional JSON file to keep learned plans across sessions
+    agent_plan_cache_file: Optional[str] = Field(default=None, alias="AGENT_PLAN_CACHE_FILE")
 
     @field_validator("openrouter_api_key")
     @classmethod
@@ -26,5 +62,3 @@ class AgentSettings(BaseSettings):
             raise ValueError("OPENROUTER_MODEL must look like 'provider/model'")
         return v
 
-
-agent_settings = AgentSettings()
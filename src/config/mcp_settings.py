@@ -1,3 +1,5 @@
+from typing import Dict, Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +13,15 @@ class MCPSettings(BaseSettings):
 
     # Docker / HDFS
     hdfs_namenode_container: str = Field(default="namenode", alias="HDFS_NAMENODE_CONTAINER")
+    # Command used instead of `docker` (split like a shell would), e.g. a fake backend for benchmarks
+    mcp_docker_bin: str = Field(default="docker", alias="MCP_DOCKER_BIN")
+
+    # Clusters: JSON {"name": "namenode container", ...}; empty = one cluster on HDFS_NAMENODE_CONTAINER
+    mcp_clusters: Dict[str, str] = Field(default_factory=dict, alias="MCP_CLUSTERS")
+    mcp_default_cluster: str = Field(default="default", alias="MCP_DEFAULT_CLUSTER")
+    # Consecutive docker exec failures before a cluster is "down", and how long calls to it then fail fast
+    mcp_cluster_down_after: int = Field(default=3, ge=1, le=100, alias="MCP_CLUSTER_DOWN_AFTER")
+    mcp_cluster_retry_sec: int = Field(default=30, ge=0, le=3600, alias="MCP_CLUSTER_RETRY_SEC")
 
     # Audit
     mcp_audit_log: str = Field(default="audit.log.jsonl", alias="MCP_AUDIT_LOG")
@@ -18,9 +29,64 @@ class MCPSettings(BaseSettings):
     # Execution controls
     mcp_timeout_sec: int = Field(default=20, ge=1, le=600, alias="MCP_TIMEOUT_SEC")
     mcp_retries: int = Field(default=2, ge=0, le=10, alias="MCP_RETRIES")
+    mcp_stream_timeout_sec: int = Field(default=120, ge=1, le=3600, alias="MCP_STREAM_TIMEOUT_SEC")
+
+    # Sharded recursive listing (list sharded=true): subtree roots per `ls -R` exec, execs in flight
+    mcp_list_shard_dirs: int = Field(default=8, ge=1, le=500, alias="MCP_LIST_SHARD_DIRS")
+    mcp_list_shard_parallelism: int = Field(default=4, ge=1, le=32, alias="MCP_LIST_SHARD_PARALLELISM")
+
+    # Spilled listings (list spill=true): directory of the spill files (default: system temp dir),
+    # idle time before a spill is deleted, time limit of the background `ls` that fills it
+    mcp_list_spill_dir: str = Field(default="", alias="MCP_LIST_SPILL_DIR")
+    mcp_list_spill_ttl_sec: int = Field(default=600, ge=10, le=86400, alias="MCP_LIST_SPILL_TTL_SEC")
+    mcp_list_spill_timeout_sec: int = Field(default=3600, ge=1, le=86400, alias="MCP_LIST_SPILL_TIMEOUT_SEC")
+
+    # Bulk transfers (put_tree)
+    mcp_transfer_parallelism: int = Field(default=4, ge=1, le=32, alias="MCP_TRANSFER_PARALLELISM")
+    mcp_transfer_batch_files: int = Field(default=200, ge=1, le=5000, alias="MCP_TRANSFER_BATCH_FILES")
+    mcp_transfer_timeout_sec: int = Field(default=600, ge=1, le=86400, alias="MCP_TRANSFER_TIMEOUT_SEC")
+    mcp_manifest_dir: str = Field(default=".mcp_manifests", alias="MCP_MANIFEST_DIR")
+
+    # Serving: stdio (one server per agent) or a shared long-running http/sse server
+    mcp_transport: Literal["stdio", "http", "sse"] = Field(default="stdio", alias="MCP_TRANSPORT")
+    mcp_host: str = Field(default="127.0.0.1", alias="MCP_HOST")
+    mcp_port: int = Field(default=8765, ge=1, le=65535, alias="MCP_PORT")
+    # Request header carrying the client identity written to AuditRecord.user
+    mcp_user_header: str = Field(default="X-MCP-User", alias="MCP_USER_HEADER")
+    # Pool for docker exec fan-out per cluster (all clients together)
+    mcp_worker_threads: int = Field(default=16, ge=1, le=256, alias="MCP_WORKER_THREADS")
+    # On shutdown: how long running tool calls may finish before the server exits
+    mcp_drain_timeout_sec: int = Field(default=30, ge=0, le=3600, alias="MCP_DRAIN_TIMEOUT_SEC")
+
+    # Admission control: token buckets per client and cost class (0 = unlimited).
+    # "expensive" = recursive calls, put_tree, sync, balancer_trigger
+    mcp_rate_limit: bool = Field(default=True, alias="MCP_RATE_LIMIT")
+    mcp_rate_standard_per_min: float = Field(default=600, ge=0, alias="MCP_RATE_STANDARD_PER_MIN")
+    mcp_rate_standard_burst: int = Field(default=30, ge=1, alias="MCP_RATE_STANDARD_BURST")
+    mcp_rate_expensive_per_min: float = Field(default=6, ge=0, alias="MCP_RATE_EXPENSIVE_PER_MIN")
+    mcp_rate_expensive_burst: int = Field(default=3, ge=1, alias="MCP_RATE_EXPENSIVE_BURST")
+
+    # head/tail/cat: hard cap on bytes returned by one call
+    mcp_read_max_bytes: int = Field(default=1048576, ge=1024, le=16777216, alias="MCP_READ_MAX_BYTES")
+    # tail/cat past the first bytes: WebHDFS endpoint as seen from inside the namenode container and
+    # the user it reads as; empty URL = no seeking reads (tail is limited to `hdfs dfs -tail`)
+    mcp_webhdfs_url: str = Field(default="http://localhost:9870", alias="MCP_WEBHDFS_URL")
+    mcp_webhdfs_user: str = Field(default="root", alias="MCP_WEBHDFS_USER")
+
+    # fsck_report: default time budget; the fsck is stopped and a partial report returned after it
+    mcp_fsck_time_budget_sec: int = Field(default=300, ge=1, le=3600, alias="MCP_FSCK_TIME_BUDGET_SEC")
+
+    # cluster_report: `dfsadmin -report` is served from cache for the TTL (0 = no cache); an older
+    # report is still served up to MAX_STALE while a background refresh runs
+    mcp_cluster_report_ttl_sec: int = Field(default=30, ge=0, le=3600, alias="MCP_CLUSTER_REPORT_TTL_SEC")
+    mcp_cluster_report_max_stale_sec: int = Field(default=300, ge=0, le=86400,
+                                                  alias="MCP_CLUSTER_REPORT_MAX_STALE_SEC")
+
+    # Path locks for mutating tools: exclusive on changed paths (and their subtrees),
+    # shared on the ones they only read; a call waiting longer than the timeout fails
+    mcp_path_locks: bool = Field(default=True, alias="MCP_PATH_LOCKS")
+    mcp_path_lock_timeout_sec: float = Field(default=300, gt=0, le=86400, alias="MCP_PATH_LOCK_TIMEOUT_SEC")
 
     # Security knobs
     strict_confirm: bool = Field(default=True, alias="MCP_STRICT_CONFIRM")
 
-
-mcp_settings = MCPSettings()
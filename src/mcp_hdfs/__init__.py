@@ -1,3 +1,10 @@
-from .server import mcp, run
-
 __all__ = ["mcp", "run"]
+
+
+def __getattr__(name: str):
+    # Lazy: the agent imports src.mcp_hdfs.constants and must not pay for FastMCP.
+    if name in __all__:
+        from . import server
+
+        return getattr(server, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
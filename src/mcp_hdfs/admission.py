@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools import ToolResult
+
+from src.config import mcp_settings
+from src.mcp_hdfs.audit import AuditRecord, current_user, now_iso, write_audit
+from src.mcp_hdfs.constants import (
+    ADMISSION_IDLE_SEC, ADMISSION_MAX_CLIENTS, EXPENSIVE_TOOLS, RATE_EXEMPT_TOOLS, RISKY_TOOLS, SAFE_TOOLS,
+)
+from src.mcp_hdfs.listing import decode_token
+from src.mcp_hdfs.models import ToolError
+
+
+def cost_class(tool: str, args: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    "expensive" for whole-tree work (recursive calls, bulk transfers,
+    balancer), None if never limited. A list continuation is charged like
+    the listing it continues: its token records whether that was recursive.
+    """
+    if tool in RATE_EXEMPT_TOOLS:
+        return None
+    args = args or {}
+    recursive = args.get("recursive")
+    if tool == "list" and isinstance(args.get("continuation"), str) and args["continuation"]:
+        try:
+            recursive = decode_token(args["continuation"]).get("r")
+        except ValueError:
+            pass  # list rejects it before any HDFS command runs
+    if tool in EXPENSIVE_TOOLS or recursive:
+        return "expensive"
+    return "standard"
+
+
+@dataclass
+class TokenBucket:
+    rate_per_sec: float
+    burst: float
+    tokens: float = field(init=False)
+    updated: float = field(default_factory=time.monotonic)
+
+    def __post_init__(self) -> None:
+        self.tokens = self.burst
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate_per_sec)
+        self.updated = now
+
+    def take(self, now: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens; returns 0 if admitted, else seconds until they are available."""
+        self._refill(now)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate_per_sec
+
+
+class AdmissionControl:
+    """
+    Token buckets per (client, cost class), so one runaway client cannot
+    starve the others or flood the NameNode with tree walks. A class with
+    rate 0 is unlimited. Counters are kept per class and per client.
+
+    Per-client state is bounded: a client idle for ADMISSION_IDLE_SEC (its
+    buckets would be full again anyway) loses its buckets and counters, and
+    beyond ADMISSION_MAX_CLIENTS the least recently seen client is dropped.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._seen: "OrderedDict[str, float]" = OrderedDict()  # client -> last call, least recent first
+        self._next_sweep = time.monotonic() + ADMISSION_IDLE_SEC
+        self._lock = threading.Lock()
+        self.admitted: Dict[str, int] = defaultdict(int)
+        self.throttled: Dict[str, int] = defaultdict(int)
+        self.by_client: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def limits(cls: str) -> Tuple[float, float]:
+        """(tokens per minute, burst) for a cost class, from MCPSettings."""
+        if cls == "expensive":
+            return mcp_settings.mcp_rate_expensive_per_min, mcp_settings.mcp_rate_expensive_burst
+        return mcp_settings.mcp_rate_standard_per_min, mcp_settings.mcp_rate_standard_burst
+
+    def _forget(self, client: str) -> None:
+        self._seen.pop(client, None)
+        self.by_client.pop(client, None)
+        for cls in ("standard", "expensive"):
+            self._buckets.pop((client, cls), None)
+
+    def _sweep(self, now: float, room: int = 0) -> None:
+        # Drop clients idle long enough for their buckets to have refilled
+        # completely, then the least recently seen ones over the cap.
+        self._next_sweep = now + ADMISSION_IDLE_SEC
+        while self._seen:
+            client, seen = next(iter(self._seen.items()))
+            if now - seen <= ADMISSION_IDLE_SEC and len(self._seen) + room <= ADMISSION_MAX_CLIENTS:
+                break
+            self._forget(client)
+
+    def admit(self, client: str, cls: str) -> float:
+        """0 if the call may run, else the retry-after in seconds."""
+        per_min, burst = self.limits(cls)
+        now = time.monotonic()
+        with self._lock:
+            if client not in self._seen or now >= self._next_sweep:
+                self._sweep(now, room=0 if client in self._seen else 1)
+            self._seen[client] = now
+            self._seen.move_to_end(client)
+            retry_after = 0.0
+            if per_min > 0:
+                bucket = self._buckets.get((client, cls))
+                if bucket is None:
+                    bucket = self._buckets[(client, cls)] = TokenBucket(per_min / 60.0, float(burst))
+                retry_after = bucket.take(now)
+            outcome = "throttled" if retry_after else "admitted"
+            (self.throttled if retry_after else self.admitted)[cls] += 1
+            counts = self.by_client.setdefault(client, defaultdict(int))
+            counts[f"{cls}_{outcome}"] += 1
+            return retry_after
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            tokens: Dict[str, Dict[str, float]] = defaultdict(dict)
+            for (client, cls), b in self._buckets.items():
+                b._refill(now)
+                tokens[client][cls] = round(b.tokens, 2)
+            classes = {}
+            for cls in ("standard", "expensive"):
+                per_min, burst = self.limits(cls)
+                classes[cls] = {
+                    "per_min": per_min,
+                    "burst": burst,
+                    "admitted": self.admitted[cls],
+                    "throttled": self.throttled[cls],
+                }
+            clients = {
+                c: {**counts, "tokens": tokens.get(c, {})} for c, counts in sorted(self.by_client.items())
+            }
+        return {"enabled": mcp_settings.mcp_rate_limit, "classes": classes, "clients": clients}
+
+
+admission = AdmissionControl()
+
+
+class AdmissionMiddleware(Middleware):
+    """
+    Refuses tool calls over the caller's budget with a ToolError carrying
+    retry_after_sec, before any HDFS command runs. Added after
+    ClientIdentityMiddleware, which sets the caller identity.
+    """
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        if not mcp_settings.mcp_rate_limit:
+            return await call_next(context)
+        tool, args = context.message.name, context.message.arguments or {}
+        cls = cost_class(tool, args)
+        if cls is None:
+            return await call_next(context)
+
+        client = current_user.get()
+        retry_after = admission.admit(client, cls)
+        if not retry_after:
+            return await call_next(context)
+
+        per_min, burst = admission.limits(cls)
+        retry_after = round(retry_after, 1) or 0.1
+        err = ToolError(
+            error=f"Rate limited: {cls} calls for {client} are limited to {per_min:g}/min (burst {burst})",
+            hint=f"Retry after {retry_after}s; avoid repeating recursive or bulk calls in a loop",
+            retry_after_sec=retry_after,
+        )
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool=tool,
+            risk="safe" if tool in SAFE_TOOLS else "risky" if tool in RISKY_TOOLS else "unknown",
+            args={**args, "throttled": cls},
+            ok=False,
+            stderr=err.error,
+        ))
+        # is_error: the ToolError does not match the tool's ToolOk output schema
+        return ToolResult(structured_content=err.model_dump(), is_error=True)
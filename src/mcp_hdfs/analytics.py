@@ -0,0 +1,354 @@
+"""
+Offline latency analytics over the audit log.
+
+  python -m src.mcp_hdfs.analytics [--since 24h] [--until ISO] [--tool NAME] [--top 10] [--json]
+
+Streams the JSONL audit log and its rotated segments (`audit.log.jsonl.1`,
+`audit.log.jsonl.2.gz`, ...) one record at a time, so memory does not grow
+with the log: per-tool latencies go into fixed-size quantile sketches and
+only the K slowest paths are kept. Records of one tool call (batched tools
+write one per chunk) are folded by their call_id into one call.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import gzip
+import heapq
+import json
+import math
+import re
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+from src.config import mcp_settings
+
+# Relative accuracy of the quantile sketches and their bucket cap.
+SKETCH_ACCURACY = 0.01
+SKETCH_MAX_BUCKETS = 2048
+
+# Calls whose records are still being folded; beyond this the least
+# recently written one is counted as complete.
+FOLD_OPEN_CALLS = 10000
+
+# Args that name the path a call worked on, in order of preference.
+PATH_ARGS = ("path", "hdfs_path", "hdfs_dir", "source", "paths")
+
+_RELATIVE_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (DDSketch-style): values land in buckets of
+    geometrically growing width, so any quantile is returned within
+    `accuracy` relative error. When the bucket count passes `max_buckets` the
+    lowest buckets are merged, which only affects the fastest quantiles.
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY, max_buckets: int = SKETCH_MAX_BUCKETS) -> None:
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        if len(self.buckets) > self.max_buckets:
+            low = sorted(self.buckets)[:2]
+            self.buckets[low[1]] += self.buckets.pop(low[0])
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return min(2 * self.gamma ** key / (self.gamma + 1), self.max)
+        return self.max
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    errors: int = 0
+    retried: int = 0          # calls where some exec needed more than one attempt
+    timed: int = 0            # calls with timing fields (written since timing was added)
+    output_bytes: int = 0
+    duration: QuantileSketch = field(default_factory=QuantileSketch)
+    exec: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        self.calls += 1
+        if not rec.get("ok"):
+            self.errors += 1
+        if rec.get("duration_ms") is None:
+            return
+        self.timed += 1
+        self.duration.add(float(rec["duration_ms"]))
+        self.exec.add(float(rec.get("exec_ms") or 0))
+        self.output_bytes += int(rec.get("output_bytes") or 0)
+        if (rec.get("attempts") or 0) > (rec.get("exec_count") or 0):
+            self.retried += 1
+
+    def summary(self) -> Dict[str, Any]:
+        def q(sketch: QuantileSketch, p: float) -> Optional[float]:
+            v = sketch.quantile(p)
+            return None if v is None else round(v, 1)
+
+        return {
+            "calls": self.calls,
+            "error_rate": round(self.errors / self.calls, 4) if self.calls else 0.0,
+            "retry_rate": round(self.retried / self.timed, 4) if self.timed else 0.0,
+            "timed_calls": self.timed,
+            "p50_ms": q(self.duration, 0.50),
+            "p95_ms": q(self.duration, 0.95),
+            "p99_ms": q(self.duration, 0.99),
+            "exec_p50_ms": q(self.exec, 0.50),
+            "exec_p95_ms": q(self.exec, 0.95),
+            "exec_p99_ms": q(self.exec, 0.99),
+            "output_bytes": self.output_bytes,
+        }
+
+
+def parse_time(value: str, now: Optional[datetime] = None) -> datetime:
+    """'24h', '7d', '30m' relative to now, or an ISO-8601 timestamp (naive = local time)."""
+    now = now or datetime.now(timezone.utc)
+    m = _RELATIVE_RE.match(value.strip())
+    if m:
+        return now - timedelta(seconds=float(m.group(1)) * _UNITS[m.group(2)])
+    return parse_iso(value.strip())
+
+
+def parse_iso(raw: str) -> datetime:
+    """
+    ISO-8601 timestamp, naive = local time. Also takes the "+0000" offsets
+    of `ts` (now_iso), which datetime.fromisoformat() rejects before 3.11.
+    """
+    try:
+        dt = datetime.fromisoformat(raw)
+    except ValueError:
+        dt = datetime.strptime(raw, "%Y-%m-%dT%H:%M:%S%z")
+    return dt if dt.tzinfo else dt.astimezone()
+
+
+def record_time(rec: Dict[str, Any]) -> Optional[datetime]:
+    for key in ("start", "ts"):
+        raw = rec.get(key)
+        if not raw:
+            continue
+        try:
+            return parse_iso(raw)
+        except ValueError:
+            continue
+    return None
+
+
+def log_segments(log: str) -> List[str]:
+    """The live log and its rotated segments, oldest first (`.N` higher = older)."""
+    def age(path: str) -> Tuple[int, str]:
+        suffix = path[len(log):].lstrip(".").split(".")[0]
+        return (-int(suffix) if suffix.isdigit() else 0, path)
+
+    segments = [p for p in glob.glob(glob.escape(log) + "*") if not p.endswith(".tmp")]
+    return sorted(segments, key=age)
+
+
+def _open(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def iter_records(paths: List[str]) -> Iterator[Dict[str, Any]]:
+    """Audit records from each file in turn; blank, truncated or non-JSON lines are skipped."""
+    for path in paths:
+        try:
+            f = _open(path)
+        except OSError as e:
+            print(f"[analytics] skip {path}: {e}", file=sys.stderr)
+            continue
+        with f:
+            try:
+                for ln in f:
+                    ln = ln.strip()
+                    if not ln:
+                        continue
+                    try:
+                        rec = json.loads(ln)
+                    except ValueError:
+                        continue
+                    if isinstance(rec, dict) and "tool" in rec:
+                        yield rec
+            except (OSError, EOFError) as e:  # truncated gzip segment
+                print(f"[analytics] {path}: stopped early: {e}", file=sys.stderr)
+
+
+def call_path(args: Optional[Dict[str, Any]]) -> Optional[str]:
+    for key in PATH_ARGS:
+        value = (args or {}).get(key)
+        if isinstance(value, str) and value:
+            return value
+        if isinstance(value, list) and value:
+            more = f" (+{len(value) - 1})" if len(value) > 1 else ""
+            return f"{value[0]}{more}"
+    return None
+
+
+def _merge_call(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    # Timing fields are running totals of the call: the record written last
+    # (longest duration) has them all. The call failed if any record did.
+    last = b if (b.get("duration_ms") or 0) >= (a.get("duration_ms") or 0) else a
+    return {**last, "ok": bool(a.get("ok")) and bool(b.get("ok"))}
+
+
+def fold_calls(records: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    One record per tool call: records sharing a call_id are merged. Records
+    without one (written before call ids, or outside a tool call) are calls
+    of their own. At most FOLD_OPEN_CALLS calls are held open at once.
+    """
+    open_calls: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for rec in records:
+        call_id = rec.get("call_id")
+        if not call_id:
+            yield rec
+            continue
+        prev = open_calls.pop(call_id, None)
+        open_calls[call_id] = rec if prev is None else _merge_call(prev, rec)
+        if len(open_calls) > FOLD_OPEN_CALLS:
+            yield open_calls.popitem(last=False)[1]
+    yield from open_calls.values()
+
+
+def analyze(
+    records: Iterator[Dict[str, Any]],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    tool: Optional[str] = None,
+    top: int = 10,
+) -> Dict[str, Any]:
+    per_tool: Dict[str, ToolStats] = {}
+    overall = ToolStats()
+    slowest: List[Tuple[float, int, Dict[str, Any]]] = []  # min-heap of the K slowest calls
+    scanned = 0
+
+    def selected() -> Iterator[Dict[str, Any]]:
+        nonlocal scanned
+        for rec in records:
+            scanned += 1
+            if tool and rec.get("tool") != tool:
+                continue
+            if rec.get("tool") == "server_shutdown":
+                continue
+            if since or until:
+                # every record of a call has the call's start, so a call is kept or dropped whole
+                t = record_time(rec)
+                if t is None or (since and t < since) or (until and t >= until):
+                    continue
+            yield rec
+
+    for n, rec in enumerate(fold_calls(selected())):
+        per_tool.setdefault(rec["tool"], ToolStats()).add(rec)
+        overall.add(rec)
+        duration = rec.get("duration_ms")
+        if top > 0 and duration is not None:
+            item = (float(duration), n, {
+                "duration_ms": duration,
+                "exec_ms": rec.get("exec_ms"),
+                "tool": rec["tool"],
+                "path": call_path(rec.get("args")),
+                "ok": bool(rec.get("ok")),
+                "user": rec.get("user"),
+                "start": rec.get("start"),
+            })
+            if len(slowest) < top:
+                heapq.heappush(slowest, item)
+            elif item[0] > slowest[0][0]:
+                heapq.heapreplace(slowest, item)
+
+    return {
+        "window": {
+            "since": since.isoformat() if since else None,
+            "until": until.isoformat() if until else None,
+        },
+        "records_scanned": scanned,
+        "overall": overall.summary(),
+        "tools": {name: s.summary() for name, s in sorted(per_tool.items(), key=lambda kv: -kv[1].calls)},
+        "slowest": [item[2] for item in sorted(slowest, reverse=True)],
+    }
+
+
+def _fmt(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.1f}"
+
+
+def render(report: Dict[str, Any]) -> str:
+    lines = [f"records scanned: {report['records_scanned']}  "
+             f"window: {report['window']['since'] or 'start'} .. {report['window']['until'] or 'now'}"]
+    head = f"{'tool':18} {'calls':>7} {'err%':>6} {'retry%':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'exec p95':>9}"
+    lines += ["", head, "-" * len(head)]
+    rows = list(report["tools"].items()) + [("(all)", report["overall"])]
+    for name, s in rows:
+        lines.append(
+            f"{name:18} {s['calls']:>7} {100 * s['error_rate']:>6.1f} {100 * s['retry_rate']:>7.1f} "
+            f"{_fmt(s['p50_ms']):>9} {_fmt(s['p95_ms']):>9} {_fmt(s['p99_ms']):>9} {_fmt(s['exec_p95_ms']):>9}"
+        )
+    if report["slowest"]:
+        lines += ["", "slowest calls (ms):"]
+        for c in report["slowest"]:
+            mark = "" if c["ok"] else "  [error]"
+            lines.append(f"  {_fmt(c['duration_ms']):>9}  {c['tool']:14} {c['path'] or '-'}  "
+                         f"({c['user']}, {c['start']}){mark}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--log", default=None, help="audit log (default MCP_AUDIT_LOG); rotated segments are included")
+    ap.add_argument("--since", help="window start: 24h, 7d, 30m or ISO timestamp")
+    ap.add_argument("--until", help="window end: same formats as --since")
+    ap.add_argument("--tool", help="only this tool")
+    ap.add_argument("--top", type=int, default=10, help="slowest calls to list")
+    ap.add_argument("--json", action="store_true", help="print one JSON document")
+    a = ap.parse_args(argv)
+
+    log = a.log or mcp_settings.mcp_audit_log
+    segments = log_segments(log)
+    if not segments:
+        print(f"no audit log at {log}", file=sys.stderr)
+        return 1
+    try:
+        since = parse_time(a.since) if a.since else None
+        until = parse_time(a.until) if a.until else None
+    except ValueError as e:
+        print(f"bad time: {e}", file=sys.stderr)
+        return 2
+
+    t0 = time.perf_counter()
+    report = analyze(iter_records(segments), since=since, until=until, tool=a.tool, top=a.top)
+    report["segments"] = segments
+    report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    print(json.dumps(report, indent=2) if a.json else render(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
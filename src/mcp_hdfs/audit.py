@@ -1,17 +1,66 @@
 from __future__ import annotations
 
 import json
+import threading
 import time
-from dataclasses import asdict, dataclass
+import uuid
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from src.config import mcp_settings
+from src.mcp_hdfs.clusters import clusters
 from src.mcp_hdfs.constants import AUDIT_TRIM_CHARS
 from src.mcp_hdfs.models import PermDiff, PermSnapshot
 import os
 from pathlib import Path
 
 
+# Identity of the client behind the current tool call; set per call by
+# serving.ClientIdentityMiddleware and copied into every AuditRecord.
+current_user: ContextVar[str] = ContextVar("mcp_current_user", default="unknown")
+
+
+@dataclass
+class CallStats:
+    """
+    Timing of one tool call, accumulated by hdfs_exec/transfer while it runs.
+    Every audit record of the call (batched tools write one per chunk)
+    carries the same call_id and the totals so far.
+    """
+    call_id: str = field(default_factory=lambda: uuid.uuid4().hex[:16])
+    started: float = field(default_factory=time.time)
+    exec_ms: float = 0.0       # wall time inside docker exec (summed over parallel execs)
+    exec_count: int = 0
+    attempts: int = 0          # exec attempts including retries
+    queue_ms: float = 0.0      # time batches waited for a shared worker
+    lock_ms: float = 0.0       # time waited for path locks
+    output_bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, exec_ms: float = 0.0, execs: int = 0, attempts: int = 0,
+            queue_ms: float = 0.0, output_bytes: int = 0, lock_ms: float = 0.0) -> None:
+        with self.lock:
+            self.exec_ms += exec_ms
+            self.exec_count += execs
+            self.attempts += attempts
+            self.queue_ms += queue_ms
+            self.lock_ms += lock_ms
+            self.output_bytes += output_bytes
+
+
+# Set per tool call by serving.ClientIdentityMiddleware.
+call_stats: ContextVar[Optional[CallStats]] = ContextVar("mcp_call_stats", default=None)
+
+
+def record_exec(exec_ms: float = 0.0, execs: int = 0, attempts: int = 0,
+                queue_ms: float = 0.0, output_bytes: int = 0, lock_ms: float = 0.0) -> None:
+    stats = call_stats.get()
+    if stats is not None:
+        stats.add(exec_ms, execs, attempts, queue_ms, output_bytes, lock_ms)
+
+
 def init_audit_log() -> None:
     path = Path(mcp_settings.mcp_audit_log)
     if path.parent and not path.parent.exists():
@@ -23,6 +72,11 @@ def now_iso() -> str:
     return time.strftime("%Y-%m-%dT%H:%M:%S%z")
 
 
+def iso_ms(epoch: float) -> str:
+    # "+03:00" offset: datetime.fromisoformat() on Python 3.10 rejects "+0300"
+    return datetime.fromtimestamp(epoch).astimezone().isoformat(timespec="milliseconds")
+
+
 @dataclass
 class AuditRecord:
     ts: str
@@ -35,18 +89,56 @@ class AuditRecord:
     stdout: str = ""
     stderr: str = ""
     user: Optional[str] = "unknown"
+    cluster: Optional[str] = None
     before: Optional[Dict[str, Any]] = None
     after: Optional[Dict[str, Any]] = None
     diff: Optional[Dict[str, Any]] = None
+    # Timing (filled by write_audit from the call's CallStats; cumulative over
+    # the records sharing a call_id)
+    call_id: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    duration_ms: Optional[float] = None
+    exec_ms: Optional[float] = None
+    exec_count: Optional[int] = None
+    attempts: Optional[int] = None
+    queue_ms: Optional[float] = None
+    lock_wait_ms: Optional[float] = None
+    output_bytes: Optional[int] = None
 
 
 def write_audit(rec: AuditRecord) -> None:
+    if rec.user in (None, "unknown"):
+        rec.user = current_user.get()
+    rec.cluster = rec.cluster or clusters.current()
+    now = time.time()
+    rec.end = rec.end or iso_ms(now)
+    stats = call_stats.get()
+    if stats is not None:
+        with stats.lock:
+            rec.call_id = stats.call_id
+            rec.start = iso_ms(stats.started)
+            rec.duration_ms = round((now - stats.started) * 1000, 1)
+            rec.exec_ms = round(stats.exec_ms, 1)
+            rec.exec_count = stats.exec_count
+            rec.attempts = stats.attempts
+            rec.queue_ms = round(stats.queue_ms, 1)
+            rec.lock_wait_ms = round(stats.lock_ms, 1)
+            rec.output_bytes = stats.output_bytes
     rec.stdout = (rec.stdout or "")[-AUDIT_TRIM_CHARS:]
     rec.stderr = (rec.stderr or "")[-AUDIT_TRIM_CHARS:]
     with open(mcp_settings.mcp_audit_log, "a", encoding="utf-8") as f:
         f.write(json.dumps(asdict(rec), ensure_ascii=False) + "\n")
 
 
+def summarize_cmd(docker_cmd: List[str], keep: int = 12) -> List[str]:
+    """Shorten very long batch commands (many sources) for the audit log."""
+    if len(docker_cmd) <= keep:
+        return docker_cmd
+    head = docker_cmd[:keep - 1]
+    return head + [f"... (+{len(docker_cmd) - len(head) - 1} more)", docker_cmd[-1]]
+
+
 def compute_perm_diff(before: PermSnapshot, after: PermSnapshot) -> PermDiff:
     changes: Dict[str, List[str]] = {}
     if before.perm != after.perm:
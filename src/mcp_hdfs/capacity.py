@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import calendar
+import json
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import mcp_settings
+from src.mcp_hdfs.audit import AuditRecord, now_iso, write_audit
+from src.mcp_hdfs.clusters import clusters, use_cluster
+from src.mcp_hdfs.hdfs_exec import run_docker_exec
+from src.mcp_hdfs.parsers import parse_dfsadmin_report
+
+REPORT_CMD = ["hdfs", "dfsadmin", "-report"]
+
+# Decommission Status values of nodes still counted as serving capacity
+IN_SERVICE = {"Normal", None}
+
+
+def contact_age_sec(last_contact: Any, now: float) -> Optional[float]:
+    """Seconds since `Last contact: Mon Jan 12 10:00:00 UTC 2026`; None if unparseable."""
+    if not isinstance(last_contact, str):
+        return None
+    try:
+        t = time.strptime(last_contact, "%a %b %d %H:%M:%S %Z %Y")
+    except ValueError:
+        return None
+    utc = last_contact.split()[-2] in ("UTC", "GMT")
+    epoch = calendar.timegm(t) if utc else time.mktime(t)
+    return round(max(0.0, now - epoch), 1)
+
+
+def datanode_record(raw: Dict[str, Any], now: float) -> Dict[str, Any]:
+    """Typed fields of one parsed `dfsadmin -report` datanode block."""
+    def num(key: str) -> Optional[Any]:
+        v = raw.get(key)
+        return v if isinstance(v, (int, float)) else None
+
+    return {
+        "name": raw["name"],
+        "hostname": raw.get("hostname"),
+        "state": raw["state"],
+        "decommission_status": raw.get("decommission_status"),
+        "capacity": num("configured_capacity") or 0,
+        "dfs_used": num("dfs_used") or 0,
+        "non_dfs_used": num("non_dfs_used"),
+        "remaining": num("dfs_remaining") or 0,
+        "used_pct": float(num("dfs_used_pct") or 0.0),
+        "remaining_pct": num("dfs_remaining_pct"),
+        "xceivers": num("xceivers"),
+        "num_blocks": num("num_of_blocks"),
+        "last_contact": raw.get("last_contact"),
+        "last_contact_age_sec": contact_age_sec(raw.get("last_contact"), now),
+    }
+
+
+def capacity_summary(summary: Dict[str, Any], nodes: List[Dict[str, Any]], threshold: float) -> Dict[str, Any]:
+    """
+    Cluster totals and the usage spread over live, in-service datanodes.
+    Like the balancer, a node is over/under-utilized when its DFS used %
+    differs from the cluster's by more than `threshold` points.
+    """
+    for n in nodes:
+        n["in_service"] = n["state"] == "live" and n["decommission_status"] in IN_SERVICE
+    serving = [n for n in nodes if n["in_service"]]
+    capacity = sum(n["capacity"] for n in serving)
+    used = sum(n["dfs_used"] for n in serving)
+    cluster_pct = round(100.0 * used / capacity, 2) if capacity else 0.0
+    usage = [n["used_pct"] for n in serving]
+    for n in nodes:
+        n["deviation_pct"] = round(n["used_pct"] - cluster_pct, 2) if n["in_service"] else None
+    over = [n["name"] for n in serving if n["deviation_pct"] > threshold]
+    under = [n["name"] for n in serving if n["deviation_pct"] < -threshold]
+    states: Dict[str, int] = {}
+    for n in nodes:
+        states[n["state"]] = states.get(n["state"], 0) + 1
+    return {
+        "capacity": summary.get("configured_capacity") if isinstance(summary.get("configured_capacity"), int)
+        else capacity,
+        "present_capacity": summary.get("present_capacity"),
+        "dfs_used": summary.get("dfs_used") if isinstance(summary.get("dfs_used"), int) else used,
+        "remaining": summary.get("dfs_remaining"),
+        "used_pct": cluster_pct,
+        "datanodes": states,
+        "in_service": len(serving),
+        "decommissioning": sum(1 for n in nodes if (n["decommission_status"] or "").startswith("Decommission in")),
+        "under_replicated_blocks": summary.get("under_replicated_blocks"),
+        "corrupt_replica_blocks": summary.get("blocks_with_corrupt_replicas"),
+        "missing_blocks": summary.get("missing_blocks"),
+        "usage_min_pct": min(usage) if usage else None,
+        "usage_max_pct": max(usage) if usage else None,
+        "usage_mean_pct": round(statistics.fmean(usage), 2) if usage else None,
+        "usage_stddev_pct": round(statistics.pstdev(usage), 2) if usage else None,
+        "spread_pct": round(max(usage) - min(usage), 2) if usage else None,
+        "threshold_pct": threshold,
+        "over_utilized": over,
+        "under_utilized": under,
+        "balancer_recommended": bool(over or under),
+    }
+
+
+@dataclass
+class CachedReport:
+    summary: Dict[str, Any]
+    datanodes: List[Dict[str, Any]]  # parsed, untyped: records are built per call
+    fetched_at: float
+    docker_cmd: List[str]
+
+
+class ClusterReportCache:
+    """
+    `dfsadmin -report` per cluster, cached for MCP_CLUSTER_REPORT_TTL_SEC
+    (0: every call fetches).
+
+    An entry past its TTL but younger than MCP_CLUSTER_REPORT_MAX_STALE_SEC
+    is still served (stale=true) while one background thread refreshes it;
+    older entries, or none, are fetched in the calling thread. Refreshes are
+    single-flight: callers arriving during a fetch wait for it instead of
+    starting their own JVM. A failed background refresh keeps the old entry.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, CachedReport] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _fetch(self, name: str, done: threading.Event, background: bool) -> None:
+        entry, error = None, "hdfs dfsadmin -report failed"
+        try:
+            with use_cluster(name):
+                code, out, err, docker_cmd = run_docker_exec(REPORT_CMD)
+            parsed = parse_dfsadmin_report(out) if code == 0 else None
+            if parsed and (parsed["datanodes"] or parsed["summary"]):
+                entry = CachedReport(parsed["summary"], parsed["datanodes"], time.time(), docker_cmd)
+            else:
+                error = (err or out).strip()[-500:] or error
+            if background:
+                write_audit(AuditRecord(
+                    ts=now_iso(),
+                    tool="cluster_report",
+                    risk="safe",
+                    args={"refresh": "background"},
+                    docker_cmd=docker_cmd,
+                    ok=entry is not None,
+                    exit_code=code,
+                    stdout=json.dumps({"datanodes": len(entry.datanodes) if entry else 0}),
+                    stderr=err,
+                    user="server",
+                    cluster=name,
+                ))
+        except RuntimeError as e:
+            error = str(e)
+        finally:
+            with self._lock:
+                if entry is not None:
+                    self._entries[name] = entry
+                    self._errors.pop(name, None)
+                else:
+                    self._errors[name] = error
+                self._inflight.pop(name, None)
+            done.set()
+
+    def get(self, force: bool = False) -> Tuple[CachedReport, str]:
+        """
+        Report of the current cluster and where it came from: "cache",
+        "stale" (a background refresh is running) or "fetched".
+        RuntimeError if it could not be fetched.
+        """
+        name = clusters.current()
+        ttl = mcp_settings.mcp_cluster_report_ttl_sec
+        max_stale = max(ttl, mcp_settings.mcp_cluster_report_max_stale_sec) if ttl else 0
+        with self._lock:
+            entry = self._entries.get(name)
+            age = time.time() - entry.fetched_at if entry else None
+            if entry is not None and not force and age < ttl:
+                return entry, "cache"
+            done = self._inflight.get(name)
+            owner = done is None
+            if owner:
+                done = self._inflight[name] = threading.Event()
+            if entry is not None and not force and age < max_stale:
+                if owner:
+                    threading.Thread(target=self._fetch, args=(name, done, True),
+                                     name=f"report-{name}", daemon=True).start()
+                return entry, "stale"
+        if owner:
+            self._fetch(name, done, False)
+        else:
+            done.wait(mcp_settings.mcp_timeout_sec * (mcp_settings.mcp_retries + 1))
+        with self._lock:
+            fresh = self._entries.get(name)
+            if fresh is None or fresh is entry:
+                raise RuntimeError(self._errors.get(name) or "hdfs dfsadmin -report did not finish")
+            return fresh, "fetched"
+
+    def refreshing(self) -> bool:
+        with self._lock:
+            return clusters.current() in self._inflight
+
+
+capacity_reports = ClusterReportCache()
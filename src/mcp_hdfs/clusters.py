@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.config import mcp_settings
+
+# Cluster of the current tool call; set per call by serving.ClusterMiddleware
+# and read by docker_exec_prefix(). None = MCP_DEFAULT_CLUSTER.
+current_cluster: ContextVar[Optional[str]] = ContextVar("mcp_current_cluster", default=None)
+
+# stderr of `docker exec` itself (not of the command inside) when the
+# namenode container cannot be reached
+DOCKER_FAILURE_MARKERS = (
+    "Error response from daemon",
+    "No such container",
+    "is not running",
+    "Cannot connect to the Docker daemon",
+)
+
+
+def is_docker_failure(code: int, stderr: str) -> bool:
+    return code != 0 and any(m in stderr for m in DOCKER_FAILURE_MARKERS)
+
+
+@dataclass
+class ClusterHealth:
+    execs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_ok_at: Optional[float] = None
+    last_failure_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self.consecutive_failures >= mcp_settings.mcp_cluster_down_after:
+            return "down"
+        if self.consecutive_failures:
+            return "degraded"
+        return "healthy" if self.execs else "unknown"
+
+
+class ClusterRegistry:
+    """
+    Named clusters from MCP_CLUSTERS ({"name": "namenode container"}), or a
+    single "default" cluster on HDFS_NAMENODE_CONTAINER, with health built
+    from the outcome of every docker exec. A cluster with
+    MCP_CLUSTER_DOWN_AFTER consecutive failures is "down": calls to it fail
+    fast for MCP_CLUSTER_RETRY_SEC, then the next call probes it again.
+    """
+
+    def __init__(self) -> None:
+        self._containers: Optional[Dict[str, str]] = None
+        self._health: Dict[str, ClusterHealth] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def containers(self) -> Dict[str, str]:
+        if self._containers is None:
+            self._containers = dict(mcp_settings.mcp_clusters) or {
+                mcp_settings.mcp_default_cluster: mcp_settings.hdfs_namenode_container,
+            }
+        return self._containers
+
+    @property
+    def default(self) -> str:
+        if mcp_settings.mcp_default_cluster in self.containers:
+            return mcp_settings.mcp_default_cluster
+        return next(iter(self.containers))
+
+    def names(self) -> List[str]:
+        return list(self.containers)
+
+    def resolve(self, name: Optional[str]) -> str:
+        """Cluster name for a tool argument; ValueError if unknown."""
+        if not name:
+            return self.default
+        if name not in self.containers:
+            raise ValueError(f"Unknown cluster {name!r}; known: {', '.join(self.names())}")
+        return name
+
+    def container(self, name: Optional[str] = None) -> str:
+        return self.containers[name or self.current()]
+
+    def current(self) -> str:
+        return current_cluster.get() or self.default
+
+    def check_available(self) -> None:
+        """RuntimeError without running anything if the current cluster is down and not due for a probe."""
+        name = self.current()
+        with self._lock:
+            h = self._health.get(name)
+            if h is None or h.state != "down" or h.last_failure_at is None:
+                return
+            wait = mcp_settings.mcp_cluster_retry_sec - (time.time() - h.last_failure_at)
+            if wait <= 0:
+                return
+            error = h.last_error
+        raise RuntimeError(f"Cluster {name!r} is down (last error: {error}); next probe in {wait:.0f}s")
+
+    def report(self, ok: bool, error: Optional[str] = None, cluster: Optional[str] = None) -> None:
+        name = cluster or self.current()
+        now = time.time()
+        with self._lock:
+            h = self._health.setdefault(name, ClusterHealth())
+            h.execs += 1
+            if ok:
+                h.consecutive_failures = 0
+                h.last_ok_at = now
+            else:
+                h.failures += 1
+                h.consecutive_failures += 1
+                h.last_failure_at = now
+                h.last_error = (error or "").strip()[-300:] or None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = []
+            for name, container in self.containers.items():
+                h = self._health.get(name, ClusterHealth())
+                out.append({
+                    "cluster": name,
+                    "container": container,
+                    "default": name == self.default,
+                    "state": h.state,
+                    "execs": h.execs,
+                    "failures": h.failures,
+                    "consecutive_failures": h.consecutive_failures,
+                    "last_ok_at": h.last_ok_at,
+                    "last_failure_at": h.last_failure_at,
+                    "last_error": h.last_error,
+                })
+            return out
+
+
+clusters = ClusterRegistry()
+
+
+@contextmanager
+def use_cluster(name: str) -> Iterator[None]:
+    token = current_cluster.set(name)
+    try:
+        yield
+    finally:
+        current_cluster.reset(token)
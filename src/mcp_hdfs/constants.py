@@ -1,4 +1,7 @@
-SAFE_TOOLS = {"list", "stat", "get", "getquota"}
+SAFE_TOOLS = {
+    "list", "stat", "get", "getquota", "usage", "snapshot_list", "snapshot_diff", "balancer_status", "rate_limits",
+    "clusters", "locks", "head", "tail", "cat", "fsck_report", "cluster_report",
+}
 
 RISKY_TOOLS = {
     "mkdir",
@@ -11,9 +14,74 @@ RISKY_TOOLS = {
     "snapshot_create",
     "snapshot_delete",
     "balancer_trigger",
+    "balancer_stop",
+    "put_tree",
+    "sync",
 }
 
-ALLOWED_HDFS_DFS = {"ls", "stat", "mkdir", "put", "get", "chmod", "chown"}
+ALLOWED_HDFS_DFS = {
+    "ls", "stat", "mkdir", "put", "get", "chmod", "chown", "checksum", "count", "du", "cat", "tail",
+}
 
 AUDIT_TRIM_CHARS = 5000
 MAX_LIST_LIMIT = 5000
+
+# Bulk transfers: keep each `hdfs dfs -put a b c ... dst` well below ARG_MAX
+MAX_BATCH_ARGV_CHARS = 100_000
+MKDIR_BATCH_DIRS = 500
+CHECKSUM_BATCH_FILES = 200
+STAT_BATCH_FILES = 500
+SYNC_PLAN_SAMPLE = 50
+
+# Paths per `hdfs dfs -count -q` invocation
+QUOTA_PATHS_PER_CALL = 100
+
+# usage: paths per `-du -s` / `-count` invocation, children shown per path by default
+USAGE_PATHS_PER_CALL = 100
+USAGE_TOP_K_DEFAULT = 20
+
+# Background jobs (balancer)
+JOB_OUTPUT_TAIL_LINES = 200
+JOB_HISTORY = 20
+
+# Streaming listings: open cursors for continuation tokens, progress throttle
+LIST_CURSOR_MAX = 16
+LIST_CURSOR_TTL_SEC = 120
+PROGRESS_INTERVAL_SEC = 1.0
+PROGRESS_EVERY_ITEMS = 256
+
+# Admission control: tools drawing from the "expensive" budget (as do all
+# calls with recursive=true), tools never limited, client housekeeping
+# (clients tracked at once, least recently seen evicted first; idle time
+# after which a client's buckets and counters are dropped)
+EXPENSIVE_TOOLS = {"put_tree", "sync", "balancer_trigger", "fsck_report"}
+RATE_EXEMPT_TOOLS = {"rate_limits", "clusters", "locks", "balancer_status", "balancer_stop"}
+ADMISSION_MAX_CLIENTS = 2048
+ADMISSION_IDLE_SEC = 3600
+
+# head/tail/cat: bytes returned by default, read size from the stream,
+# bytes checked for NULs (binary), size of `hdfs dfs -tail` output
+READ_DEFAULT_BYTES = 65536
+READ_DEFAULT_LINES = 10
+READ_CHUNK_BYTES = 65536
+READ_BINARY_SNIFF_BYTES = 8192
+HDFS_TAIL_BYTES = 1024
+
+# fsck_report: paths / directories shown by default, directories aggregated
+# at once (later ones are counted under "(other)")
+FSCK_TOP_K_DEFAULT = 20
+FSCK_MAX_DIRS = 10000
+
+# cluster_report: default imbalance threshold (points of DFS used %, as the balancer's -threshold)
+CAPACITY_THRESHOLD_PCT = 10.0
+
+# Multi-cluster routing: read tools that accept cluster="*" (fan-out to all clusters)
+FANOUT_TOOLS = {"stat", "usage", "getquota", "snapshot_list", "cluster_report"}
+CLUSTER_ALL = "*"
+
+# Sharded listings: levels expanded with plain `ls` before fanning out `ls -R`
+LIST_SHARD_MAX_DEPTH = 3
+
+# Spilled listings: items per write to the spill files, spills kept at once
+LIST_SPILL_FLUSH_ITEMS = 4096
+LIST_SPILL_MAX = 8
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import heapq
+import posixpath
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.mcp_hdfs.constants import FSCK_MAX_DIRS
+from src.mcp_hdfs.parsers import parse_fsck_line
+
+OTHER_DIRS = "(other)"
+
+
+def fsck_cmd(path: str, detail: str) -> List[str]:
+    """`hdfs fsck`: problems only ("summary"), every file ("files"), every block ("blocks")."""
+    flags = {"summary": [], "files": ["-files"], "blocks": ["-files", "-blocks"]}[detail]
+    return ["hdfs", "fsck", path, *flags]
+
+
+@dataclass
+class FileProblems:
+    path: str
+    under_replicated: int = 0
+    missing: int = 0
+    corrupt: int = 0
+
+    @property
+    def bad(self) -> int:
+        return self.missing + self.corrupt
+
+    @property
+    def any(self) -> bool:
+        return bool(self.under_replicated or self.missing or self.corrupt)
+
+
+def _dir_stats() -> Dict[str, int]:
+    return {"files": 0, "bytes": 0, "blocks": 0, "under_replicated": 0, "missing": 0, "corrupt": 0}
+
+
+class FsckAggregator:
+    """
+    Folds `hdfs fsck` output, fed one line at a time, into a report whose
+    size does not depend on the namespace: block problem counts, the top_k
+    worst files (a bounded heap), replication histograms, per-directory
+    totals at `depth` levels below the checked path (at most FSCK_MAX_DIRS
+    directories, the rest under "(other)") and fsck's own summary. Nothing
+    is kept per file once the next file starts.
+    """
+
+    def __init__(self, root: str, top_k: int, depth: int) -> None:
+        self.root = posixpath.normpath("/" + root.strip().lstrip("/"))
+        self.top_k = top_k
+        self.depth = depth
+        self.lines = 0
+        self.files = 0
+        self.dirs = 0
+        self.bytes = 0
+        self.blocks = 0
+        self.under_replicated = 0
+        self.missing = 0
+        self.corrupt = 0
+        self.affected_files = 0
+        self.target_replication: Counter = Counter()
+        self.live_replicas: Counter = Counter()
+        self.status: Optional[str] = None
+        self.failed = False
+        self.summary: Dict[str, Dict[str, Any]] = {}
+        self._section = "overall"
+        self._cur: Optional[FileProblems] = None
+        self._top: List[Tuple[int, int, str, int, FileProblems]] = []
+        self._dirs: Dict[str, Dict[str, int]] = {}
+
+    def dir_key(self, path: str) -> str:
+        parent = posixpath.dirname(path)
+        if parent == self.root or not parent.startswith(self.root.rstrip("/") + "/"):
+            return self.root
+        rel = parent[len(self.root):].strip("/").split("/")
+        return posixpath.join(self.root, *rel[:self.depth]) if self.depth else self.root
+
+    def _dir(self, path: str) -> Dict[str, int]:
+        key = self.dir_key(path)
+        stats = self._dirs.get(key)
+        if stats is None:
+            if len(self._dirs) >= FSCK_MAX_DIRS:
+                key = OTHER_DIRS
+            stats = self._dirs.setdefault(key, _dir_stats())
+        return stats
+
+    def _flush(self) -> None:
+        cur, self._cur = self._cur, None
+        if cur is None or not cur.any:
+            return
+        self.affected_files += 1
+        stats = self._dir(cur.path)
+        stats["under_replicated"] += cur.under_replicated
+        stats["missing"] += cur.missing
+        stats["corrupt"] += cur.corrupt
+        # affected_files breaks ties: FileProblems do not compare
+        entry = (cur.bad, cur.under_replicated, cur.path, self.affected_files, cur)
+        if len(self._top) < self.top_k:
+            heapq.heappush(self._top, entry)
+        elif entry[:4] > self._top[0][:4]:
+            heapq.heapreplace(self._top, entry)
+
+    def _file(self, path: Optional[str]) -> Optional[FileProblems]:
+        """Problems of `path` (the file being reported if None)."""
+        if path is not None and (self._cur is None or self._cur.path != path):
+            self._flush()
+            self._cur = FileProblems(path)
+        return self._cur
+
+    def feed(self, ln: str) -> None:
+        self.lines += 1
+        row = parse_fsck_line(ln)
+        while row is not None:
+            row = self._apply(row)
+
+    def _apply(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        kind = row["kind"]
+        if kind == "file":
+            self._flush()
+            self._cur = FileProblems(row["path"])
+            self.files += 1
+            self.bytes += row["size"]
+            self.blocks += row["blocks"]
+            self.target_replication[row["policy"] or str(row["replication"])] += 1
+            stats = self._dir(row["path"])
+            stats["files"] += 1
+            stats["bytes"] += row["size"]
+            stats["blocks"] += row["blocks"]
+            # the first problem of the file is printed on its header line
+            return parse_fsck_line(row["rest"]) if row["rest"] else None
+        if kind == "block":
+            self.live_replicas[str(row["live"] or 0)] += 1
+        elif kind in ("under", "missing", "corrupt"):
+            f = self._file(row["path"])
+            if f is None:
+                return None
+            if kind == "under":
+                f.under_replicated += 1
+                self.under_replicated += 1
+            elif kind == "missing":
+                f.missing += row["count"]
+                self.missing += row["count"]
+            else:
+                f.corrupt += 1
+                self.corrupt += 1
+        elif kind == "dir":
+            self._flush()
+            self.dirs += 1
+        elif kind == "status":
+            self._flush()
+            self.status = row["status"]
+        elif kind == "section":
+            self._section = row["section"]
+        elif kind == "total" and self.status is not None:
+            self.summary.setdefault(self._section, {})[row["key"]] = row["value"]
+        elif kind == "failed":
+            self.failed = True
+        return None
+
+    def finish(self) -> None:
+        self._flush()
+
+    def top_paths(self) -> List[Dict[str, Any]]:
+        worst = sorted(self._top, key=lambda e: e[:4], reverse=True)
+        return [{"path": f.path, "under_replicated": f.under_replicated, "missing": f.missing,
+                 "corrupt": f.corrupt} for *_, f in worst]
+
+    def hot_dirs(self) -> List[Dict[str, Any]]:
+        ranked = sorted(
+            self._dirs.items(),
+            key=lambda kv: (kv[1]["missing"] + kv[1]["corrupt"], kv[1]["under_replicated"], kv[1]["bytes"]),
+            reverse=True,
+        )
+        return [{"path": path, **stats} for path, stats in ranked[:self.top_k]]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "lines": self.lines,
+            "files": self.files,
+            "dirs": self.dirs,
+            "bytes": self.bytes,
+            "blocks": self.blocks,
+            "under_replicated_blocks": self.under_replicated,
+            "missing_blocks": self.missing,
+            "corrupt_blocks": self.corrupt,
+            "affected_files": self.affected_files,
+            "top_paths": self.top_paths(),
+            "hot_dirs": self.hot_dirs(),
+            "dirs_tracked": len(self._dirs),
+            "replication": {
+                "target": dict(self.target_replication.most_common()),
+                "live": dict(sorted(self.live_replicas.items(), key=lambda kv: int(kv[0]))),
+            },
+            "summary": self.summary,
+        }
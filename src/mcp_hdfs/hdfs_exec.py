@@ -1,13 +1,26 @@
 from __future__ import annotations
 
+import shlex
 import subprocess
+import threading
 import time
-from typing import List, Optional, Tuple
+from collections import deque
+from typing import Iterator, List, Optional, Tuple
 
 from src.config import mcp_settings
+from src.mcp_hdfs.audit import record_exec
+from src.mcp_hdfs.clusters import clusters, is_docker_failure
 from src.mcp_hdfs.constants import ALLOWED_HDFS_DFS
 
 
+def docker_exec_prefix() -> List[str]:
+    """
+    `docker exec <namenode>` for the current tool call's cluster; MCP_DOCKER_BIN
+    may replace `docker` (e.g. a fake backend for benchmarks).
+    """
+    return shlex.split(mcp_settings.mcp_docker_bin) + ["exec", clusters.container()]
+
+
 def build_hdfs_dfs_cmd(subcommand: str, args: List[str]) -> List[str]:
     """
     Build a safe `hdfs dfs` command using allow-list of subcommands.
@@ -18,9 +31,15 @@ def build_hdfs_dfs_cmd(subcommand: str, args: List[str]) -> List[str]:
     return ["hdfs", "dfs", f"-{subcommand}", *args]
 
 
-def run_docker_exec(cmd: List[str]) -> Tuple[int, str, str, List[str]]:
-    docker_cmd = ["docker", "exec", mcp_settings.hdfs_namenode_container] + cmd
+def run_docker_exec(cmd: List[str], timeout: Optional[int] = None) -> Tuple[int, str, str, List[str]]:
+    """
+    Run `cmd` inside the namenode container with retries.
+    `timeout` overrides MCP_TIMEOUT_SEC for long-running batch commands.
+    """
+    docker_cmd = docker_exec_prefix() + cmd
+    clusters.check_available()
 
+    t0 = time.perf_counter()
     last_exc: Optional[Exception] = None
     for attempt in range(mcp_settings.mcp_retries + 1):
         try:
@@ -28,16 +47,139 @@ def run_docker_exec(cmd: List[str]) -> Tuple[int, str, str, List[str]]:
                 docker_cmd,
                 capture_output=True,
                 text=True,
-                timeout=mcp_settings.mcp_timeout_sec,
+                timeout=timeout or mcp_settings.mcp_timeout_sec,
             )
+            record_exec((time.perf_counter() - t0) * 1000, execs=1, attempts=attempt + 1,
+                        output_bytes=len(p.stdout) + len(p.stderr))
+            failed = is_docker_failure(p.returncode, p.stderr)
+            clusters.report(not failed, p.stderr if failed else None)
             return p.returncode, p.stdout, p.stderr, docker_cmd
         except (subprocess.TimeoutExpired, OSError) as e:
             last_exc = e
             if attempt < mcp_settings.mcp_retries:
                 time.sleep(0.5 * (2 ** attempt))
             else:
+                record_exec((time.perf_counter() - t0) * 1000, execs=1, attempts=attempt + 1)
+                clusters.report(False, str(e))
                 raise RuntimeError(
                     f"Command failed after retries: {docker_cmd}. Last error: {e}"
                 ) from e
 
     raise RuntimeError(f"Unexpected failure: {last_exc}")
+
+
+class DockerStream:
+    """
+    Line-by-line `docker exec` for commands whose output is too large to
+    buffer. Stops at a deadline (or when the caller stops reading), kills the
+    process and keeps only a bounded stderr tail. No retries: a partially
+    consumed stream cannot be replayed transparently.
+
+        with DockerStream(cmd) as st:
+            for line in st.lines():
+                ...
+        st.exit_code, st.stderr, st.timed_out
+
+    With binary=True, stdout is read as raw bytes through chunks() instead.
+    """
+
+    def __init__(self, cmd: List[str], timeout: Optional[float] = None, stderr_lines: int = 200,
+                 binary: bool = False) -> None:
+        self.docker_cmd = docker_exec_prefix() + cmd
+        self.binary = binary
+        self.cluster = clusters.current()  # close() may run in another call's context
+        self.timeout = timeout or mcp_settings.mcp_timeout_sec
+        self.exit_code: Optional[int] = None
+        self.timed_out = False
+        self.stopped_early = False
+        self._eof = False
+        self._stderr: deque = deque(maxlen=stderr_lines)
+        self._proc: Optional[subprocess.Popen] = None
+        self._timer: Optional[threading.Timer] = None
+        self._stderr_thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "DockerStream":
+        clusters.check_available()
+        try:
+            self._proc = subprocess.Popen(
+                self.docker_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=not self.binary,
+                bufsize=0 if self.binary else 1,
+            )
+        except OSError as e:
+            clusters.report(False, str(e), cluster=self.cluster)
+            raise RuntimeError(f"Command failed to start: {self.docker_cmd}. Error: {e}") from e
+        record_exec(execs=1, attempts=1)
+
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+        self._timer = threading.Timer(self.timeout, self._on_timeout)
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _drain_stderr(self) -> None:
+        assert self._proc is not None and self._proc.stderr is not None
+        for ln in self._proc.stderr:
+            self._stderr.append(ln.decode("utf-8", errors="replace") if isinstance(ln, bytes) else ln)
+
+    def _on_timeout(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self.timed_out = True
+            self._proc.kill()
+
+    def lines(self) -> Iterator[str]:
+        # Read time and bytes go to the call consuming the lines: a parked
+        # listing cursor is read by several tool calls.
+        assert self._proc is not None and self._proc.stdout is not None
+        t0 = time.perf_counter()
+        for ln in self._proc.stdout:
+            record_exec((time.perf_counter() - t0) * 1000, output_bytes=len(ln))
+            yield ln.rstrip("\n")
+            t0 = time.perf_counter()
+        self._eof = True
+
+    def chunks(self, size: int = 65536) -> Iterator[bytes]:
+        """Raw stdout as it arrives (binary streams), at most `size` bytes per chunk."""
+        assert self._proc is not None and self._proc.stdout is not None and self.binary
+        t0 = time.perf_counter()
+        while True:
+            chunk = self._proc.stdout.read(size)
+            if not chunk:
+                self._eof = True
+                return
+            record_exec((time.perf_counter() - t0) * 1000, output_bytes=len(chunk))
+            yield chunk
+            t0 = time.perf_counter()
+
+    def close(self) -> None:
+        if self._proc is None:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._proc.poll() is None and not self._eof:
+            # Caller stopped reading (page filled / budget exhausted).
+            self.stopped_early = not self.timed_out
+            self._proc.kill()
+        self.exit_code = self._proc.wait()
+        if self._stderr_thread is not None:
+            self._stderr_thread.join(timeout=1.0)
+        for f in (self._proc.stdout, self._proc.stderr):
+            if f is not None:
+                f.close()
+        if not self.stopped_early:
+            failed = is_docker_failure(self.exit_code, self.stderr)
+            clusters.report(not failed, self.stderr if failed else None, cluster=self.cluster)
+
+    @property
+    def stderr(self) -> str:
+        return "".join(self._stderr)
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 or self.stopped_early
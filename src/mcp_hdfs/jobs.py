@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from src.mcp_hdfs.audit import current_user
+from src.mcp_hdfs.clusters import clusters, use_cluster
+from src.mcp_hdfs.constants import JOB_HISTORY, JOB_OUTPUT_TAIL_LINES
+from src.mcp_hdfs.hdfs_exec import docker_exec_prefix, run_docker_exec
+
+
+class BackgroundJob:
+    """
+    A long-running command inside the namenode container (e.g. `hdfs balancer`)
+    that outlives the tool call which started it. Output is read incrementally
+    by a thread; `on_line` turns lines into progress fields.
+
+    The in-container PID is written to a pid file so `stop()` can kill the
+    real process, not only the local `docker exec` client.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        cmd: List[str],
+        on_line: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        on_finish: Optional[Callable[["BackgroundJob"], None]] = None,
+    ) -> None:
+        self.id = f"{kind}-{uuid.uuid4().hex[:8]}"
+        self.kind = kind
+        self.cmd = cmd
+        self.pid_file = f"/tmp/mcp-job-{self.id}.pid"
+        self.docker_cmd = docker_exec_prefix() + [
+            "bash", "-c", f"echo $$ > {self.pid_file}; exec {shlex.join(cmd)} 2>&1",
+        ]
+        self.user = current_user.get()  # the job audits its own end from the reader thread
+        self.cluster = clusters.current()
+        self.state = "pending"  # pending | running | succeeded | failed | stopped
+        self.exit_code: Optional[int] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Dict[str, Any] = {}
+        self.lines_seen = 0
+        self._tail: deque = deque(maxlen=JOB_OUTPUT_TAIL_LINES)
+        self._on_line = on_line
+        self._on_finish = on_finish
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._proc = subprocess.Popen(
+            self.docker_cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+        )
+        self.state = "running"
+        self.started_at = time.time()
+        threading.Thread(target=self._read, name=f"job-{self.id}", daemon=True).start()
+
+    def _read(self) -> None:
+        with use_cluster(self.cluster):
+            self._read_output()
+
+    def _read_output(self) -> None:
+        assert self._proc is not None and self._proc.stdout is not None
+        for ln in self._proc.stdout:
+            ln = ln.rstrip("\n")
+            with self._lock:
+                self.lines_seen += 1
+                self._tail.append(ln)
+                if self._on_line:
+                    self._on_line(ln, self.progress)
+        code = self._proc.wait()
+        with self._lock:
+            self.exit_code = code
+            self.finished_at = time.time()
+            if self.state == "running":
+                self.state = "succeeded" if code == 0 else "failed"
+        if self._on_finish:
+            self._on_finish(self)
+
+    def stop(self) -> bool:
+        """Kill the job inside the container and locally. Returns False if it was not running."""
+        with self._lock:
+            if self.state != "running":
+                return False
+            self.state = "stopped"
+        try:
+            with use_cluster(self.cluster):
+                run_docker_exec(["bash", "-c", f"kill $(cat {self.pid_file}) 2>/dev/null; rm -f {self.pid_file}"])
+        except RuntimeError:
+            pass
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+        return True
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def active(self) -> bool:
+        """Running, or registered and about to start."""
+        return self.state in ("pending", "running")
+
+    def snapshot(self, tail: int = 20) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "cluster": self.cluster,
+                "state": self.state,
+                "exit_code": self.exit_code,
+                "cmd": self.cmd,
+                "user": self.user,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_sec": round(end - self.started_at, 1) if self.started_at else 0.0,
+                "progress": dict(self.progress),
+                "output_lines": self.lines_seen,
+                "tail": list(self._tail)[-tail:] if tail else [],
+            }
+
+
+class JobRegistry:
+    """Process-wide registry of background jobs (keeps the last JOB_HISTORY finished ones)."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, BackgroundJob] = {}
+        self._lock = threading.Lock()
+
+    def add(self, job: BackgroundJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.started_at or 0)
+        for old in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self._jobs[old.id]
+
+    def start_unique(self, kind: str, job: BackgroundJob,
+                     prepare: Optional[Callable[[], None]] = None) -> Optional[BackgroundJob]:
+        """
+        Register and start `job` unless a job of `kind` is already active on
+        its cluster; returns that job instead (and `job` is not started).
+        The check and the registration are one step under the lock, so of
+        concurrent callers exactly one starts its job; the others see it as
+        pending. `prepare` runs after the registration and before start(),
+        so its side effects happen only for that one caller. If prepare() or
+        start() raises, the registration is dropped.
+        """
+        with self._lock:
+            for other in self._jobs.values():
+                if other.kind == kind and other.cluster == job.cluster and other.active:
+                    return other
+            self._jobs[job.id] = job
+            self._prune()
+        try:
+            if prepare is not None:
+                prepare()
+            job.start()
+        except Exception:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+        return None
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def latest(self, kind: str, cluster: Optional[str] = None) -> Optional[BackgroundJob]:
+        """Most recent job of `kind` on `cluster` (default: the current tool call's cluster)."""
+        cluster = cluster or clusters.current()
+        with self._lock:
+            matching = [j for j in self._jobs.values() if j.kind == kind and j.cluster == cluster]
+        return max(matching, key=lambda j: j.started_at or 0, default=None)
+
+    def running(self, kind: str, cluster: Optional[str] = None) -> Optional[BackgroundJob]:
+        job = self.latest(kind, cluster)
+        return job if job is not None and job.running else None
+
+    def all(self) -> List[BackgroundJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+
+jobs = JobRegistry()
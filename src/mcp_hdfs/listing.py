@@ -0,0 +1,714 @@
+from __future__ import annotations
+
+import base64
+import contextvars
+import glob
+import hashlib
+import json
+import mmap
+import os
+import posixpath
+import tempfile
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.config import mcp_settings
+from src.mcp_hdfs.constants import (
+    AUDIT_TRIM_CHARS, LIST_CURSOR_MAX, LIST_CURSOR_TTL_SEC, LIST_SHARD_MAX_DEPTH, LIST_SPILL_FLUSH_ITEMS,
+    LIST_SPILL_MAX, PROGRESS_EVERY_ITEMS, PROGRESS_INTERVAL_SEC,
+)
+from src.mcp_hdfs.clusters import clusters, use_cluster
+from src.mcp_hdfs.hdfs_exec import DockerStream, build_hdfs_dfs_cmd, docker_exec_prefix, run_docker_exec
+from src.mcp_hdfs.parsers import parse_hdfs_ls, parse_hdfs_ls_line
+from src.mcp_hdfs.transfer import shared_pool
+
+
+def encode_token(data: Dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str) -> Dict:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (ValueError, json.JSONDecodeError) as e:
+        raise ValueError("Malformed continuation token") from e
+    if not isinstance(data, dict) or "p" not in data or "o" not in data:
+        raise ValueError("Malformed continuation token")
+    return data
+
+
+def version_token(*parts: object) -> str:
+    raw = "|".join(str(p) for p in (clusters.current(), *parts)).encode("utf-8")
+    return "v1-" + hashlib.sha1(raw).hexdigest()[:16]
+
+
+def listing_version(path: str, offset: int, limit: int) -> Optional[str]:
+    """
+    Version of one page of a non-recursive listing, from a single
+    `-stat %Y` of the directory: its mtime (ms) changes whenever a direct
+    child is created, deleted or renamed, so it stands for the set of
+    children; changes deeper in the tree or appends to a child do not
+    alter it. None if the stat fails or `path` is not a directory.
+
+    Probe before listing: a change racing the listing then yields a token
+    older than the items, which only costs one extra full listing later.
+    """
+    code, out, _, _ = run_docker_exec(build_hdfs_dfs_cmd("stat", ["%Y|%F", path]))
+    mtime, _, ftype = out.strip().partition("|")
+    if code != 0 or not mtime.isdigit() or ftype != "directory":
+        return None
+    return version_token("ls", path.rstrip("/") or "/", offset, limit, mtime)
+
+
+class ShardedLs:
+    """
+    `hdfs dfs -ls -R <path>` split across parallel execs, with the same
+    items in the same order as the single walk.
+
+    The top levels are listed with plain `ls` (one exec per level, up to
+    LIST_SHARD_MAX_DEPTH) until there are at least two subtree roots per
+    worker. The roots are grouped, in walk order, into shards of at most
+    `shard_dirs` (fewer when that leaves a worker idle) and each shard runs
+    as one `ls -R root1 root2 ...` on the shared worker pool, at most
+    `parallelism` ahead of the reader.
+    Items are emitted depth-first with children in name order, which is the
+    order `-ls -R` itself uses. Shards are buffered exec output, so unlike a
+    DockerStream they are retried on failure.
+
+    Exposes the DockerStream attributes run_listing reads (docker_cmd,
+    exit_code, stderr, timed_out, close).
+    """
+
+    def __init__(self, path: str, shard_dirs: int, parallelism: int, timeout: float) -> None:
+        self.path = path.rstrip("/") or "/"
+        self.cluster = clusters.current()  # shards may be read by a later call
+        self.shard_dirs = shard_dirs
+        self.parallelism = parallelism
+        self.timeout = timeout
+        self.docker_cmd = docker_exec_prefix() + build_hdfs_dfs_cmd("ls", ["-R", self.path])
+        self.exit_code: Optional[int] = None
+        self.timed_out = False
+        self.stderr = ""
+        self.shards = 0
+        self._futures: Deque[Future] = deque()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "ShardedLs":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _ls(self, args: List[str]) -> List[Dict]:
+        with use_cluster(self.cluster):
+            code, out, err, _ = run_docker_exec(build_hdfs_dfs_cmd("ls", args), timeout=self.timeout)
+        if code != 0:
+            # Like -ls -R: report a vanished or unreadable path at the end, keep the rest.
+            with self._lock:
+                self.exit_code = max(self.exit_code or 0, code)
+                self.stderr = (self.stderr + err)[-AUDIT_TRIM_CHARS:]
+        return parse_hdfs_ls(out)
+
+    def _expand(self) -> Dict[str, List[Dict]]:
+        """Children of the expanded directories, by directory."""
+        children: Dict[str, List[Dict]] = {}
+        frontier = [self.path]
+        target = 2 * self.parallelism
+        for _ in range(LIST_SHARD_MAX_DEPTH):
+            for d in frontier:
+                children[d] = []
+            for item in self._ls(frontier):
+                p = item["path"].rstrip("/") or "/"
+                parent = p if p == self.path else posixpath.dirname(p)  # path is a file
+                children.setdefault(parent, []).append(item)
+            for d in frontier:
+                children.setdefault(d, []).sort(key=lambda it: it["path"])
+            frontier = [it["path"] for d in frontier for it in children[d] if it["type"] == "dir"]
+            if not frontier or len(frontier) >= target:
+                break
+        return children
+
+    def _plan(self) -> Tuple[List[Union[Dict, str]], List[List[str]]]:
+        """Walk order: items (dicts) and subtree roots (str) to fill from shards; roots grouped into shards."""
+        children = self._expand()
+        plan: List[Union[Dict, str]] = []
+
+        def walk(d: str) -> None:
+            for item in children.get(d, []):
+                plan.append(item)
+                if item["type"] == "dir":
+                    if item["path"] in children:
+                        walk(item["path"])
+                    else:
+                        plan.append(item["path"])
+
+        walk(self.path)
+        roots = [step for step in plan if isinstance(step, str)]
+        size = max(1, min(self.shard_dirs, -(-len(roots) // self.parallelism)))
+        return plan, [roots[i:i + size] for i in range(0, len(roots), size)]
+
+    def _run_shard(self, roots: List[str]) -> Dict[str, List[Dict]]:
+        """`ls -R` of several roots, split back per root (the output keeps argument order)."""
+        subtrees: Dict[str, List[Dict]] = {r: [] for r in roots}
+        i = 0
+        for item in self._ls(["-R", *roots]):
+            while i < len(roots) - 1 and not item["path"].startswith(roots[i].rstrip("/") + "/"):
+                i += 1
+            subtrees[roots[i]].append(item)
+        return subtrees
+
+    def items(self) -> Iterator[Dict]:
+        plan, shards = self._plan()
+        self.shards = len(shards)
+        pending = iter(shards)
+        current: Dict[str, List[Dict]] = {}
+
+        def submit_ahead() -> None:
+            while len(self._futures) < self.parallelism and not self._closed:
+                roots = next(pending, None)
+                if roots is None:
+                    return
+                ctx = contextvars.copy_context()
+                self._futures.append(shared_pool(self.cluster).submit(ctx.run, self._run_shard, roots))
+
+        for step in plan:
+            if isinstance(step, dict):
+                yield step
+                continue
+            if step not in current:
+                submit_ahead()
+                current = self._futures.popleft().result()
+            yield from current.pop(step)
+        if self.exit_code is None:
+            self.exit_code = 0
+
+    def close(self) -> None:
+        self._closed = True
+        while self._futures:
+            self._futures.popleft().cancel()
+
+
+class ListingCursor:
+    """
+    A live `hdfs dfs -ls [-R]` stream positioned after `position` items.
+    Kept open between calls so a continuation does not re-walk the tree.
+    With `sharded`, a recursive listing comes from a ShardedLs instead.
+    """
+
+    def __init__(self, path: str, recursive: bool, sharded: bool = False, timeout: Optional[float] = None) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.recursive = recursive
+        self.sharded = sharded and recursive
+        timeout = timeout or mcp_settings.mcp_stream_timeout_sec
+        self.stream: Union[DockerStream, ShardedLs]
+        if self.sharded:
+            self.stream = ShardedLs(
+                path, mcp_settings.mcp_list_shard_dirs, mcp_settings.mcp_list_shard_parallelism, timeout=timeout,
+            )
+        else:
+            args = (["-R"] if recursive else []) + [path]
+            self.stream = DockerStream(build_hdfs_dfs_cmd("ls", args), timeout=timeout)
+        self.position = 0
+        self.dirs_visited = 0
+        self.touched = time.monotonic()
+        self._items: Optional[Iterator[Dict]] = None
+        self._pending: Optional[Dict] = None
+        self.exhausted = False
+
+    def open(self) -> "ListingCursor":
+        self.stream.__enter__()
+        if isinstance(self.stream, ShardedLs):
+            self._items = self.stream.items()
+        else:
+            self._items = (it for it in map(parse_hdfs_ls_line, self.stream.lines()) if it is not None)
+        return self
+
+    def take(self) -> Optional[Dict]:
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            self.position += 1
+            return item
+        assert self._items is not None
+        for item in self._items:
+            self.position += 1
+            if item["type"] == "dir":
+                self.dirs_visited += 1
+            return item
+        self.exhausted = True
+        return None
+
+    def unread(self, item: Dict) -> None:
+        self._pending = item
+        self.position -= 1
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class CursorRegistry:
+    """Bounded, TTL-evicted set of open listing cursors."""
+
+    def __init__(self, max_cursors: int = LIST_CURSOR_MAX, ttl_sec: float = LIST_CURSOR_TTL_SEC) -> None:
+        self.max_cursors = max_cursors
+        self.ttl_sec = ttl_sec
+        self._cursors: Dict[str, ListingCursor] = {}
+        self._lock = threading.Lock()
+
+    def _sweep(self) -> List[ListingCursor]:
+        now = time.monotonic()
+        expired = [c for c in self._cursors.values() if now - c.touched > self.ttl_sec]
+        overflow = sorted(
+            (c for c in self._cursors.values() if c not in expired), key=lambda c: c.touched
+        )[:max(0, len(self._cursors) - len(expired) - self.max_cursors + 1)]
+        for c in expired + overflow:
+            del self._cursors[c.id]
+        return expired + overflow
+
+    def put(self, cursor: ListingCursor) -> None:
+        cursor.touched = time.monotonic()
+        with self._lock:
+            evicted = self._sweep()
+            self._cursors[cursor.id] = cursor
+        for c in evicted:
+            c.close()
+
+    def pop(self, cursor_id: str) -> Optional[ListingCursor]:
+        with self._lock:
+            evicted = self._sweep()
+            cursor = self._cursors.pop(cursor_id, None)
+        for c in evicted:
+            c.close()
+        return cursor
+
+    def close_all(self) -> int:
+        with self._lock:
+            open_cursors = list(self._cursors.values())
+            self._cursors.clear()
+        for c in open_cursors:
+            c.close()
+        return len(open_cursors)
+
+
+cursors = CursorRegistry()
+
+
+def spill_dir() -> str:
+    return mcp_settings.mcp_list_spill_dir or os.path.join(tempfile.gettempdir(), "mcp_hdfs_spill")
+
+
+class SpilledListing:
+    """
+    A whole listing drained to disk so pages can be served by random access
+    with bounded memory, however large the tree.
+
+    A background thread reads the `ls` stream (or ShardedLs) and appends one
+    JSON item per line to `<id>.jsonl`, and the byte offset of each line as a
+    uint64 to `<id>.idx`, flushing every LIST_SPILL_FLUSH_ITEMS items; only
+    that batch is held in memory. Readers mmap both files and parse just the
+    lines of their page: item i starts at index[i]. `count` items are
+    readable at any time, so pages are served while the fill is running.
+    """
+
+    def __init__(self, path: str, recursive: bool, sharded: bool = False) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.recursive = recursive
+        self.sharded = sharded and recursive
+        self.cluster = clusters.current()
+        directory = spill_dir()
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, f"{self.id}.jsonl")
+        self.index_path = os.path.join(directory, f"{self.id}.idx")
+        self.count = 0
+        self.dirs_visited = 0
+        self.done = False
+        self.exit_code: Optional[int] = None
+        self.timed_out = False
+        self.stderr = ""
+        self.touched = time.monotonic()
+        self._cursor = ListingCursor(path, recursive, sharded, timeout=mcp_settings.mcp_list_spill_timeout_sec)
+        self.docker_cmd = self._cursor.stream.docker_cmd
+        self._cond = threading.Condition()
+        self._closed = False
+        self._files: Optional[Tuple[BinaryIO, BinaryIO]] = None
+        self._maps: Optional[Tuple[mmap.mmap, mmap.mmap]] = None
+
+    def start(self) -> "SpilledListing":
+        open(self.data_path, "wb").close()
+        open(self.index_path, "wb").close()
+        self._cursor.open()
+        ctx = contextvars.copy_context()
+        threading.Thread(target=ctx.run, args=(self._fill,), name=f"spill-{self.id}", daemon=True).start()
+        return self
+
+    def _fill(self) -> None:
+        buf = bytearray()
+        offsets = array("Q")
+        pos = 0
+        with open(self.data_path, "ab") as data, open(self.index_path, "ab") as index:
+            def flush() -> None:
+                data.write(buf)
+                index.write(offsets.tobytes())
+                data.flush()
+                index.flush()
+                with self._cond:
+                    self.count += len(offsets)
+                    self.dirs_visited = self._cursor.dirs_visited
+                    self._cond.notify_all()
+                buf.clear()
+                del offsets[:]
+
+            try:
+                while not self._closed:
+                    item = self._cursor.take()
+                    if item is None:
+                        break
+                    line = json.dumps(item, separators=(",", ":")).encode("utf-8") + b"\n"
+                    offsets.append(pos)
+                    pos += len(line)
+                    buf += line
+                    if len(offsets) >= LIST_SPILL_FLUSH_ITEMS:
+                        flush()
+                flush()
+            except (OSError, ValueError, RuntimeError) as e:  # disk full, spill deleted under us, shard failed
+                self.stderr = f"spill failed: {e}"
+                self.exit_code = -1
+            finally:
+                self._cursor.close()
+                stream = self._cursor.stream
+                with self._cond:
+                    if self.exit_code is None:
+                        self.exit_code = -1 if self._closed else stream.exit_code
+                        self.stderr = stream.stderr
+                        self.timed_out = stream.timed_out
+                    self.done = True
+                    self._cond.notify_all()
+
+    def wait(self, n: int, timeout: Optional[float]) -> bool:
+        """Wait until `n` items are readable or the fill has ended; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.count >= n or self.done, timeout=timeout)
+
+    def read(self, start: int, stop: int) -> List[Dict]:
+        """Items [start, stop) of the readable ones."""
+        with self._cond:
+            stop = min(stop, self.count)
+            if start >= stop:
+                return []
+            if self._maps is None or len(self._maps[1]) < stop * 8:
+                self._remap()
+            assert self._maps is not None
+            data, index = self._maps
+            offsets = memoryview(index)[start * 8:stop * 8].cast("Q")
+            try:
+                items = []
+                for off in offsets:
+                    end = data.find(b"\n", off)
+                    items.append(json.loads(data[off:end]))
+                return items
+            finally:
+                offsets.release()
+
+    def _remap(self) -> None:
+        # The fill only appends, so remapping the whole files covers every readable item.
+        self._unmap()
+        data_f, index_f = open(self.data_path, "rb"), open(self.index_path, "rb")
+        self._files = (data_f, index_f)
+        self._maps = (
+            mmap.mmap(data_f.fileno(), 0, access=mmap.ACCESS_READ),
+            mmap.mmap(index_f.fileno(), 0, access=mmap.ACCESS_READ),
+        )
+
+    def _unmap(self) -> None:
+        for m in self._maps or ():
+            m.close()
+        for f in self._files or ():
+            f.close()
+        self._maps = self._files = None
+
+    def close(self) -> None:
+        self._closed = True
+        self._cursor.close()
+        with self._cond:
+            self._unmap()
+        for p in (self.data_path, self.index_path):
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+
+
+class SpillRegistry:
+    """
+    Spilled listings by id, deleted MCP_LIST_SPILL_TTL_SEC after their last
+    read (at most LIST_SPILL_MAX at once, oldest evicted first). Spill files
+    left behind by an earlier server process are removed on first use.
+    """
+
+    def __init__(self, max_spills: int = LIST_SPILL_MAX) -> None:
+        self.max_spills = max_spills
+        self._spills: Dict[str, SpilledListing] = {}
+        self._lock = threading.Lock()
+        self._purged = False
+
+    def _purge_orphans(self) -> None:
+        cutoff = time.time() - mcp_settings.mcp_list_spill_ttl_sec
+        for p in glob.glob(os.path.join(glob.escape(spill_dir()), "*.*")):
+            if p.endswith((".jsonl", ".idx")):
+                try:
+                    if os.path.getmtime(p) < cutoff:
+                        os.remove(p)
+                except OSError:
+                    pass
+
+    def _sweep(self, room: int = 0) -> List[SpilledListing]:
+        now = time.monotonic()
+        ttl = mcp_settings.mcp_list_spill_ttl_sec
+        expired = [s for s in self._spills.values() if now - s.touched > ttl]
+        live = sorted((s for s in self._spills.values() if s not in expired), key=lambda s: s.touched)
+        overflow = live[:max(0, len(live) + room - self.max_spills)]
+        for s in expired + overflow:
+            del self._spills[s.id]
+        return expired + overflow
+
+    def create(self, path: str, recursive: bool, sharded: bool = False) -> SpilledListing:
+        with self._lock:
+            if not self._purged:
+                self._purged = True
+                self._purge_orphans()
+            evicted = self._sweep(room=1)
+        for s in evicted:
+            s.close()
+        spill = SpilledListing(path, recursive, sharded)
+        with self._lock:
+            self._spills[spill.id] = spill
+        return spill.start()
+
+    def get(self, spill_id: str) -> Optional[SpilledListing]:
+        with self._lock:
+            evicted = self._sweep()
+            spill = self._spills.get(spill_id)
+            if spill is not None:
+                spill.touched = time.monotonic()
+        for s in evicted:
+            s.close()
+        return spill
+
+    def discard(self, spill_id: str) -> None:
+        with self._lock:
+            spill = self._spills.pop(spill_id, None)
+        if spill is not None:
+            spill.close()
+
+    def close_all(self) -> int:
+        with self._lock:
+            open_spills = list(self._spills.values())
+            self._spills.clear()
+        for s in open_spills:
+            s.close()
+        return len(open_spills)
+
+
+spills = SpillRegistry()
+
+
+@dataclass
+class ListingResult:
+    items: List[Dict] = field(default_factory=list)
+    next_offset: Optional[int] = None
+    continuation: Optional[str] = None
+    partial: bool = False
+    stop_reason: Optional[str] = None   # time_budget | item_budget | timeout
+    scanned: int = 0
+    dirs_visited: int = 0
+    elapsed_sec: float = 0.0
+    resumed: Optional[str] = None       # cursor | spill | rescan
+    total: Optional[int] = None         # items in a spilled listing, once complete
+    ok: bool = True
+    exit_code: int = 0
+    stderr: str = ""
+    docker_cmd: List[str] = field(default_factory=list)
+
+
+def run_listing(
+    path: str,
+    recursive: bool,
+    offset: int,
+    limit: int,
+    sharded: bool = False,
+    continuation: Optional[str] = None,
+    max_items: Optional[int] = None,
+    time_budget_sec: Optional[float] = None,
+    on_progress: Optional[Callable[[float, Optional[float], str], None]] = None,
+    spill: bool = False,
+) -> ListingResult:
+    """
+    Stream `hdfs dfs -ls [-R]`, skip to `offset`, collect one page and stop
+    reading. If more items remain, or a time/item budget runs out first, the
+    stream is parked in `cursors` and a continuation token is returned.
+    With `spill`, the listing is drained to a SpilledListing instead.
+    """
+    t0 = time.perf_counter()
+    res = ListingResult()
+
+    cursor: Optional[ListingCursor] = None
+    if continuation:
+        tok = decode_token(continuation)
+        if tok.get("k", clusters.default) != clusters.current():
+            # The token belongs to another cluster: continue there.
+            with use_cluster(clusters.resolve(tok.get("k"))):
+                return run_listing(path, recursive, offset, limit, sharded, continuation,
+                                   max_items, time_budget_sec, on_progress)
+        path, recursive, offset = tok["p"], bool(tok.get("r")), int(tok["o"])
+        sharded = bool(tok.get("s"))
+        if tok.get("x"):
+            return run_spilled_listing(path, recursive, offset, limit, sharded, tok["x"], time_budget_sec, on_progress)
+        cursor = cursors.pop(tok.get("c") or "")
+        if cursor is not None and cursor.position <= offset:
+            res.resumed = "cursor"
+        else:
+            if cursor is not None:
+                cursor.close()
+            cursor = None
+            res.resumed = "rescan"
+
+    elif spill:
+        return run_spilled_listing(path, recursive, offset, limit, sharded, None, time_budget_sec, on_progress)
+
+    if cursor is None:
+        cursor = ListingCursor(path, recursive, sharded).open()
+    res.docker_cmd = cursor.stream.docker_cmd
+
+    scanned = 0
+    while True:
+        if time_budget_sec is not None and time.perf_counter() - t0 > time_budget_sec:
+            res.stop_reason = "time_budget"
+            break
+        if max_items is not None and scanned >= max_items:
+            res.stop_reason = "item_budget"
+            break
+
+        item = cursor.take()
+        if item is None:
+            break
+        scanned += 1
+
+        if cursor.position <= offset:
+            pass  # still skipping to offset
+        elif len(res.items) < limit:
+            res.items.append(item)
+        else:
+            cursor.unread(item)
+            break
+
+        if on_progress is not None and scanned % PROGRESS_EVERY_ITEMS == 0:
+            on_progress(
+                cursor.position, None,
+                f"scanned {cursor.position} items, {cursor.dirs_visited} dirs, {time.perf_counter() - t0:.1f}s",
+            )
+
+    res.scanned = cursor.position
+    res.dirs_visited = cursor.dirs_visited
+    res.elapsed_sec = round(time.perf_counter() - t0, 3)
+
+    if cursor.exhausted:
+        cursor.close()
+        res.exit_code = cursor.stream.exit_code if cursor.stream.exit_code is not None else -1
+        res.stderr = cursor.stream.stderr
+        if cursor.stream.timed_out:
+            res.stop_reason = "timeout"
+        else:
+            res.ok = res.exit_code == 0
+            return res
+
+    # Budget ran out, stream timed out, or a next page exists.
+    resume_at = offset + len(res.items) if cursor.position >= offset else offset
+    res.partial = res.stop_reason is not None
+    res.next_offset = resume_at
+    token = {"p": path, "r": recursive, "o": resume_at}
+    if clusters.current() != clusters.default:
+        token["k"] = clusters.current()
+    if cursor.sharded:
+        token["s"] = 1
+    if not cursor.exhausted:
+        cursors.put(cursor)
+        token["c"] = cursor.id
+    res.continuation = encode_token(token)
+    return res
+
+
+def run_spilled_listing(
+    path: str,
+    recursive: bool,
+    offset: int,
+    limit: int,
+    sharded: bool,
+    spill_id: Optional[str],
+    time_budget_sec: Optional[float] = None,
+    on_progress: Optional[Callable[[float, Optional[float], str], None]] = None,
+) -> ListingResult:
+    """
+    One page of a spilled listing: waits until items [offset, offset+limit]
+    are on disk (or the fill ends, or the time budget runs out) and reads
+    them back. An expired spill is listed again from scratch. The item
+    budget does not apply: the background fill is not charged to a call.
+    """
+    t0 = time.perf_counter()
+    res = ListingResult()
+    spill = spills.get(spill_id) if spill_id else None
+    if spill_id:
+        res.resumed = "spill" if spill is not None else "rescan"
+    if spill is None:
+        spill = spills.create(path, recursive, sharded)
+    res.docker_cmd = spill.docker_cmd
+
+    need = offset + limit + 1  # one more than the page tells whether a next page exists
+    while not spill.wait(need, PROGRESS_INTERVAL_SEC):
+        if time_budget_sec is not None and time.perf_counter() - t0 > time_budget_sec:
+            res.stop_reason = "time_budget"
+            break
+        if on_progress is not None:
+            on_progress(
+                spill.count, None,
+                f"spilled {spill.count} items, {spill.dirs_visited} dirs, {time.perf_counter() - t0:.1f}s",
+            )
+
+    res.items = spill.read(offset, offset + limit)
+    res.scanned = spill.count
+    res.dirs_visited = spill.dirs_visited
+    res.elapsed_sec = round(time.perf_counter() - t0, 3)
+    resume_at = offset + len(res.items)
+
+    if spill.done and resume_at >= spill.count:
+        res.total = spill.count
+        res.exit_code = spill.exit_code if spill.exit_code is not None else -1
+        res.stderr = spill.stderr
+        if spill.timed_out:
+            # The token's spill is gone, so continuing lists again and resumes at resume_at.
+            spills.discard(spill.id)
+            res.stop_reason = "timeout"
+        else:
+            res.ok = res.exit_code == 0
+            return res
+
+    res.partial = res.partial or res.stop_reason is not None
+    res.next_offset = resume_at
+    if spill.done:
+        res.total = spill.count
+    token = {"p": path, "r": recursive, "o": resume_at, "x": spill.id}
+    if clusters.current() != clusters.default:
+        token["k"] = clusters.current()
+    if spill.sharded:
+        token["s"] = 1
+    res.continuation = encode_token(token)
+    return res
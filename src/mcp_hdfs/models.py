@@ -8,6 +8,7 @@ class ToolError(BaseModel):
     ok: Literal[False] = False
     error: str
     hint: Optional[str] = None
+    retry_after_sec: Optional[float] = None
 
 
 class ToolOk(BaseModel):
@@ -21,8 +22,14 @@ ToolResult = Union[ToolOk, ToolError]
 class ListRequest(BaseModel):
     path: str = Field(default="/", description="HDFS path like /data/raw")
     recursive: bool = False
+    sharded: bool = False
+    spill: bool = False
     limit: int = Field(default=200, ge=1, le=5000)
     offset: int = Field(default=0, ge=0)
+    continuation: Optional[str] = None
+    max_items: Optional[int] = Field(default=None, ge=1)
+    time_budget_sec: Optional[float] = Field(default=None, gt=0)
+    if_none_match: Optional[str] = None
 
 
 class LsItem(BaseModel):
@@ -41,10 +48,45 @@ class ListResponseData(BaseModel):
     items: List[LsItem]
     next_offset: Optional[int] = None
     total_in_page: int
+    continuation: Optional[str] = None
+    partial: bool = False
+    stop_reason: Optional[str] = None
+    scanned: int = 0
+    dirs_visited: int = 0
+    elapsed_sec: float = 0.0
+    version: Optional[str] = None
+    total: Optional[int] = None
+
+
+class NotModifiedData(BaseModel):
+    not_modified: Literal[True] = True
+    path: str
+    version: str
 
 
 class StatRequest(BaseModel):
     path: str
+    if_none_match: Optional[str] = None
+
+
+class ReadRequest(BaseModel):
+    path: str
+    lines: Optional[int] = Field(default=None, ge=1, le=100000)
+    max_bytes: Optional[int] = Field(default=None, ge=1)
+    offset: int = Field(default=0, ge=0)
+
+
+class ReadResponseData(BaseModel):
+    path: str
+    offset: int
+    bytes: int
+    file_size: Optional[int] = None
+    lines: Optional[int] = None
+    truncated: bool = False
+    binary: bool = False
+    encoding: str = "utf-8"
+    text: Optional[str] = None
+    base64: Optional[str] = None
 
 
 class StatResponseData(BaseModel):
@@ -55,8 +97,10 @@ class StatResponseData(BaseModel):
     owner: str
     group: str
     modified: str
+    modified_ms: Optional[int] = None
     type: str
     raw: str
+    version: Optional[str] = None
 
 
 class MkdirRequest(BaseModel):
@@ -79,6 +123,31 @@ class GetRequest(BaseModel):
     confirm: bool = False
 
 
+class PutTreeRequest(BaseModel):
+    local_dir: str = Field(description="Directory INSIDE namenode container (MVP)")
+    hdfs_dir: str
+    overwrite: bool = False
+    resume: bool = True
+    batch_files: int = Field(default=200, ge=1, le=5000)
+    parallelism: int = Field(default=4, ge=1, le=32)
+    confirm: bool = False
+
+
+class SyncRequest(BaseModel):
+    source: str
+    destination: str
+    direction: Literal["to_hdfs", "to_local"] = Field(
+        default="to_hdfs",
+        description="to_hdfs: container dir -> HDFS dir; to_local: HDFS dir -> container dir",
+    )
+    dry_run: bool = False
+    checksums: bool = True
+    adopt_existing: bool = False
+    batch_files: int = Field(default=200, ge=1, le=5000)
+    parallelism: int = Field(default=4, ge=1, le=32)
+    confirm: bool = False
+
+
 class ChmodRequest(BaseModel):
     path: str
     mode: str = Field(description="e.g. 755 or u+rwx,g+rx,o+rx")
@@ -94,6 +163,218 @@ class ChownRequest(BaseModel):
     confirm: bool = False
 
 
+class GetQuotaRequest(BaseModel):
+    paths: List[str] = Field(min_length=1)
+    sort_by: Optional[Literal["utilization"]] = None
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+
+class QuotaInfo(BaseModel):
+    path: str
+    quota: Optional[int] = Field(default=None, description="Namespace quota; null = none")
+    remaining_quota: Optional[int] = Field(default=None, description="null = inf")
+    space_quota: Optional[int] = Field(default=None, description="Space quota in bytes; null = none")
+    remaining_space_quota: Optional[int] = Field(default=None, description="null = inf")
+    dir_count: int
+    file_count: int
+    content_size: int
+    ns_utilization_pct: Optional[float] = None
+    space_utilization_pct: Optional[float] = None
+    utilization_pct: Optional[float] = Field(default=None, description="Max of namespace/space utilization")
+
+
+class GetQuotaResponseData(BaseModel):
+    items: List[QuotaInfo]
+    errors: List[str] = Field(default_factory=list)
+    total: int
+
+
+class UsageRequest(BaseModel):
+    paths: List[str] = Field(min_length=1)
+    breakdown: bool = False
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+
+class UsageChild(BaseModel):
+    path: str
+    bytes: int
+    bytes_with_replication: Optional[int] = None
+
+
+class UsageInfo(BaseModel):
+    path: str
+    bytes: Optional[int] = None
+    bytes_with_replication: Optional[int] = Field(default=None, description="Disk space incl. all replicas")
+    dir_count: Optional[int] = Field(default=None, description="Directories in the subtree, including the path")
+    file_count: Optional[int] = None
+    children: Optional[List[UsageChild]] = Field(default=None, description="Largest direct children first")
+    children_total: Optional[int] = None
+
+
+class UsageResponseData(BaseModel):
+    items: List[UsageInfo]
+    errors: List[str] = Field(default_factory=list)
+    total: int
+
+
+class FsckRequest(BaseModel):
+    path: str = "/"
+    detail: Literal["summary", "files", "blocks"] = "blocks"
+    top_k: Optional[int] = Field(default=None, ge=1, le=1000)
+    depth: int = Field(default=1, ge=0, le=32, description="Directory levels below path for hot spots")
+    time_budget_sec: Optional[float] = Field(default=None, gt=0, le=3600)
+
+
+class FsckPathProblems(BaseModel):
+    path: str
+    under_replicated: int
+    missing: int
+    corrupt: int
+
+
+class FsckDirStats(BaseModel):
+    path: str
+    files: int
+    bytes: int
+    blocks: int
+    under_replicated: int
+    missing: int
+    corrupt: int
+
+
+class FsckReportData(BaseModel):
+    path: str
+    status: Optional[str] = Field(default=None, description="HEALTHY / CORRUPT; null if fsck did not finish")
+    partial: bool = False
+    stop_reason: Optional[str] = None
+    elapsed_sec: float
+    lines: int
+    files: int
+    dirs: int
+    bytes: int
+    blocks: int
+    under_replicated_blocks: int
+    missing_blocks: int
+    corrupt_blocks: int
+    affected_files: int
+    top_paths: List[FsckPathProblems] = Field(description="Files with most missing/corrupt, then under-replicated blocks")
+    hot_dirs: List[FsckDirStats] = Field(description="Directories `depth` levels below path, worst first")
+    dirs_tracked: int
+    replication: Dict[str, Dict[str, int]] = Field(
+        description="target: files per replication factor (or EC policy); live: blocks per live replica count"
+    )
+    summary: Dict[str, Dict[str, Union[int, float]]] = Field(description="fsck's own totals per section")
+
+
+class ClusterReportRequest(BaseModel):
+    sort_by: Literal["used_pct", "remaining", "name", "last_contact"] = "used_pct"
+    top_k: Optional[int] = Field(default=None, ge=1)
+    state: Optional[str] = Field(default=None, description="live / dead / decommissioning ... (section of the report)")
+    threshold: Optional[float] = Field(default=None, gt=0, le=100, description="Imbalance threshold, DFS used % points")
+    refresh: bool = False
+
+
+class DataNodeInfo(BaseModel):
+    name: str
+    hostname: Optional[str] = None
+    state: str = Field(description="Report section: live, dead, decommissioning, ...")
+    decommission_status: Optional[str] = None
+    in_service: bool
+    capacity: int
+    dfs_used: int
+    non_dfs_used: Optional[int] = None
+    remaining: int
+    used_pct: float
+    remaining_pct: Optional[float] = None
+    deviation_pct: Optional[float] = Field(default=None, description="used_pct minus the cluster's used_pct")
+    xceivers: Optional[int] = None
+    num_blocks: Optional[int] = None
+    last_contact: Optional[str] = None
+    last_contact_age_sec: Optional[float] = None
+
+
+class CapacitySummary(BaseModel):
+    capacity: Optional[int] = None
+    present_capacity: Optional[int] = None
+    dfs_used: Optional[int] = None
+    remaining: Optional[int] = None
+    used_pct: float = Field(description="DFS used % over in-service datanodes")
+    datanodes: Dict[str, int] = Field(description="Datanodes per report section")
+    in_service: int
+    decommissioning: int
+    under_replicated_blocks: Optional[int] = None
+    corrupt_replica_blocks: Optional[int] = None
+    missing_blocks: Optional[int] = None
+    usage_min_pct: Optional[float] = None
+    usage_max_pct: Optional[float] = None
+    usage_mean_pct: Optional[float] = None
+    usage_stddev_pct: Optional[float] = None
+    spread_pct: Optional[float] = Field(default=None, description="usage_max_pct - usage_min_pct")
+    threshold_pct: float
+    over_utilized: List[str]
+    under_utilized: List[str]
+    balancer_recommended: bool
+
+
+class ClusterReportData(BaseModel):
+    summary: CapacitySummary
+    datanodes: List[DataNodeInfo]
+    total: int
+    fetched_at: str
+    age_sec: float
+    cached: bool
+    stale: bool = Field(default=False, description="Older than MCP_CLUSTER_REPORT_TTL_SEC; a refresh is running")
+
+
+class SnapshottableDir(BaseModel):
+    path: str
+    perm: str
+    owner: str
+    group: str
+    modified: str
+    snapshot_count: int
+    snapshot_quota: int
+
+
+class SnapshotInfo(BaseModel):
+    name: str
+    path: str
+    date: str
+    time: str
+
+
+class SnapshotDiffRequest(BaseModel):
+    path: str
+    from_snapshot: str
+    to_snapshot: str = Field(default=".", description="Snapshot name or '.' for the current state")
+    types: Optional[List[Literal["created", "deleted", "modified", "renamed"]]] = None
+    path_prefix: Optional[str] = Field(default=None, description="Relative to the snapshot root, e.g. sub/dir")
+    limit: int = Field(default=200, ge=1, le=5000)
+    offset: int = Field(default=0, ge=0)
+
+
+class SnapshotDiffEntry(BaseModel):
+    type: Literal["created", "deleted", "modified", "renamed"]
+    path: str
+    target: Optional[str] = None
+
+
+class SnapshotDiffResponseData(BaseModel):
+    items: List[SnapshotDiffEntry]
+    counts: Dict[str, int]
+    total_matched: int
+    next_offset: Optional[int] = None
+    truncated: bool = False
+
+
+class BalancerRequest(BaseModel):
+    threshold: Optional[float] = Field(default=None, gt=0, le=100, description="Percent of disk capacity")
+    bandwidth: Optional[int] = Field(default=None, ge=1, description="Bytes/sec per datanode (setBalancerBandwidth)")
+    include: Optional[List[str]] = None
+    exclude: Optional[List[str]] = None
+    confirm: bool = False
+
+
 class PermSnapshot(BaseModel):
     path: str
     perm: str
@@ -1,49 +1,56 @@
 from __future__ import annotations
 
-from typing import Dict, List
+import re
+from typing import Dict, List, Optional
 
 
-def parse_hdfs_ls(stdout: str) -> List[Dict]:
-    lines = [ln.strip() for ln in stdout.splitlines() if ln.strip()]
-    items: List[Dict] = []
+def parse_hdfs_ls_line(ln: str) -> Optional[Dict]:
+    ln = ln.strip()
+    if not ln or ln.startswith("Found "):
+        return None
+    parts = ln.split()
+    if len(parts) < 8:
+        return None
 
-    for ln in lines:
-        if ln.startswith("Found "):
-            continue
-        parts = ln.split()
-        if len(parts) < 8:
-            continue
+    perm = parts[0]
+    repl = parts[1]
+    owner = parts[2]
+    group = parts[3]
+    size = parts[4]
+    date = parts[5]
+    t = parts[6]
+    path = " ".join(parts[7:])
 
-        perm = parts[0]
-        repl = parts[1]
-        owner = parts[2]
-        group = parts[3]
-        size = parts[4]
-        date = parts[5]
-        t = parts[6]
-        path = " ".join(parts[7:])
+    return {
+        "perm": perm,
+        "replication": repl,
+        "owner": owner,
+        "group": group,
+        "size": int(size) if size.isdigit() else 0,
+        "date": date,
+        "time": t,
+        "path": path,
+        "type": "dir" if perm.startswith("d") else "file",
+    }
 
-        items.append({
-            "perm": perm,
-            "replication": repl,
-            "owner": owner,
-            "group": group,
-            "size": int(size) if size.isdigit() else 0,
-            "date": date,
-            "time": t,
-            "path": path,
-            "type": "dir" if perm.startswith("d") else "file",
-        })
 
+def parse_hdfs_ls(stdout: str) -> List[Dict]:
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        item = parse_hdfs_ls_line(ln)
+        if item is not None:
+            items.append(item)
     return items
 
 
 def parse_hdfs_stat(raw: str) -> Dict:
+    # "%n|%b|%o|%r|%u|%g|%y|%F", optionally followed by "|%Y" (mtime in ms)
     parts = raw.strip().split("|")
-    if len(parts) != 8:
+    if len(parts) not in (8, 9):
         return {"raw": raw.strip()}
 
-    name, size, block_size, repl, owner, group, modified, ftype = parts
+    name, size, block_size, repl, owner, group, modified, ftype = parts[:8]
+    modified_ms = int(parts[8]) if len(parts) == 9 and parts[8].isdigit() else None
     return {
         "name": name,
         "size": int(size) if size.isdigit() else 0,
@@ -52,6 +59,346 @@ def parse_hdfs_stat(raw: str) -> Dict:
         "owner": owner,
         "group": group,
         "modified": modified,
+        "modified_ms": modified_ms,
         "type": ftype,
         "raw": raw.strip(),
     }
+
+
+def parse_find_printf(stdout: str) -> List[Dict]:
+    """
+    Parse `find <dir> -type f -printf ...` output: one tab-separated
+    line per file with size, mtime (epoch seconds) and path relative to <dir>.
+    """
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        parts = ln.split("\t", 2)
+        if len(parts) != 3 or not parts[2]:
+            continue
+        size, mtime, rel = parts
+        try:
+            mtime_f = float(mtime)
+        except ValueError:
+            mtime_f = 0.0
+        items.append({
+            "rel_path": rel,
+            "size": int(size) if size.isdigit() else 0,
+            "mtime": mtime_f,
+        })
+    return items
+
+
+def parse_hdfs_checksum(stdout: str) -> Dict[str, str]:
+    """
+    Parse `hdfs dfs -checksum p1 p2 ...` output:
+    `<path>\t<algorithm>\t<hex>` per line -> {path: "algorithm:hex"}.
+    """
+    sums: Dict[str, str] = {}
+    for ln in stdout.splitlines():
+        parts = ln.strip().split()
+        if len(parts) < 3:
+            continue
+        path, algo, digest = " ".join(parts[:-2]), parts[-2], parts[-1]
+        sums[path] = f"{algo}:{digest}"
+    return sums
+
+
+def parse_md5sum(stdout: str) -> Dict[str, str]:
+    """Parse `md5sum f1 f2 ...` output -> {path: "md5:hex"}."""
+    sums: Dict[str, str] = {}
+    for ln in stdout.splitlines():
+        digest, _, path = ln.partition("  ")
+        if path and len(digest) == 32:
+            sums[path] = f"md5:{digest}"
+    return sums
+
+
+def _quota_value(v: str) -> int | None:
+    # `none` (no quota) and `inf` (unlimited remaining) map to None
+    return int(v) if v.lstrip("-").isdigit() else None
+
+
+def parse_hdfs_du(stdout: str) -> List[Dict]:
+    """
+    Parse `hdfs dfs -du [-s] p1 p2 ...` output: SIZE DISK_SPACE_CONSUMED PATH
+    (Hadoop 2.8+; older releases print only SIZE PATH).
+    """
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        parts = ln.split()
+        if len(parts) < 2 or not parts[0].isdigit():
+            continue
+        if len(parts) >= 3 and parts[1].isdigit():
+            size, consumed, path = int(parts[0]), int(parts[1]), " ".join(parts[2:])
+        else:
+            size, consumed, path = int(parts[0]), None, " ".join(parts[1:])
+        items.append({"path": path, "bytes": size, "bytes_with_replication": consumed})
+    return items
+
+
+def parse_hdfs_count_lines(stdout: str) -> List[Dict]:
+    """Parse `hdfs dfs -count p1 p2 ...` output: DIR_COUNT FILE_COUNT CONTENT_SIZE PATHNAME."""
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        parts = ln.split()
+        if len(parts) >= 4 and all(p.isdigit() for p in parts[:3]):
+            items.append({
+                "dir_count": int(parts[0]),
+                "file_count": int(parts[1]),
+                "content_size": int(parts[2]),
+                "path": " ".join(parts[3:]),
+            })
+    return items
+
+
+def parse_hdfs_count(stdout: str) -> Optional[Dict]:
+    """First line of `hdfs dfs -count <path>` output, see parse_hdfs_count_lines."""
+    items = parse_hdfs_count_lines(stdout)
+    return items[0] if items else None
+
+
+def parse_hdfs_count_q(stdout: str) -> List[Dict]:
+    """
+    Parse `hdfs dfs -count -q p1 p2 ...` output. Columns:
+    QUOTA REM_QUOTA SPACE_QUOTA REM_SPACE_QUOTA DIR_COUNT FILE_COUNT CONTENT_SIZE PATHNAME
+    """
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        parts = ln.split()
+        if len(parts) < 8 or not parts[4].isdigit():
+            continue
+
+        quota, rem_quota, space_quota, rem_space = (_quota_value(x) for x in parts[:4])
+        dirs, files, size = int(parts[4]), int(parts[5]), int(parts[6])
+
+        ns_util = None
+        if quota:
+            ns_util = round(100.0 * (quota - (rem_quota or 0)) / quota, 2)
+        space_util = None
+        if space_quota:
+            space_util = round(100.0 * (space_quota - (rem_space or 0)) / space_quota, 2)
+        utils = [u for u in (ns_util, space_util) if u is not None]
+
+        items.append({
+            "path": " ".join(parts[7:]),
+            "quota": quota,
+            "remaining_quota": rem_quota,
+            "space_quota": space_quota,
+            "remaining_space_quota": rem_space,
+            "dir_count": dirs,
+            "file_count": files,
+            "content_size": size,
+            "ns_utilization_pct": ns_util,
+            "space_utilization_pct": space_util,
+            "utilization_pct": max(utils) if utils else None,
+        })
+    return items
+
+
+SNAPSHOT_DIFF_TYPES = {"+": "created", "-": "deleted", "M": "modified", "R": "renamed"}
+
+
+def parse_snapshot_diff_line(ln: str) -> Optional[Dict]:
+    """
+    Parse one `hdfs snapshotDiff` report line, e.g. `M\t./dir`,
+    `+\t./dir/new.csv`, `R\t./a.csv -> ./b.csv`. Header/blank lines -> None.
+    """
+    parts = ln.strip().split(None, 1)
+    if len(parts) != 2 or parts[0] not in SNAPSHOT_DIFF_TYPES:
+        return None
+
+    kind = SNAPSHOT_DIFF_TYPES[parts[0]]
+    path, target = parts[1], None
+    if kind == "renamed" and " -> " in path:
+        path, target = path.split(" -> ", 1)
+
+    def norm(p: str) -> str:
+        p = p.strip()
+        return "." if p in (".", "./") else p[2:] if p.startswith("./") else p
+
+    return {"type": kind, "path": norm(path), "target": norm(target) if target else None}
+
+
+def parse_snapshottable_dirs(stdout: str) -> List[Dict]:
+    """
+    Parse `hdfs lsSnapshottableDir` output:
+    perm repl owner group size date time snapshot_count snapshot_quota path
+    """
+    items: List[Dict] = []
+    for ln in stdout.splitlines():
+        parts = ln.split()
+        if len(parts) < 10 or not parts[7].isdigit():
+            continue
+        items.append({
+            "path": " ".join(parts[9:]),
+            "perm": parts[0],
+            "owner": parts[2],
+            "group": parts[3],
+            "modified": f"{parts[5]} {parts[6]}",
+            "snapshot_count": int(parts[7]),
+            "snapshot_quota": int(parts[8]) if parts[8].isdigit() else 0,
+        })
+    return items
+
+
+_SIZE_UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4, "PB": 1024 ** 5, "EB": 1024 ** 6}
+
+
+def parse_size(text: str) -> int:
+    """Parse Hadoop human-readable sizes like `1.5 GB`, `512 B`, `0 B` (1024-based)."""
+    parts = text.strip().split()
+    if not parts:
+        return 0
+    try:
+        value = float(parts[0])
+    except ValueError:
+        return 0
+    unit = parts[1].upper() if len(parts) > 1 else "B"
+    return int(value * _SIZE_UNITS.get(unit, 1))
+
+
+_BALANCER_ROW = re.compile(
+    r"^(?P<ts>\w{3} \d{1,2}, \d{4} \d{1,2}:\d{2}:\d{2} [AP]M)\s+(?P<iteration>\d+)\s+"
+    r"(?P<moved>[\d.]+ [KMGTPE]?B)\s+(?P<left>[\d.]+ [KMGTPE]?B)\s+(?P<being>[\d.]+ [KMGTPE]?B)"
+)
+
+
+def parse_balancer_line(ln: str) -> Optional[Dict]:
+    """
+    Parse one progress row of `hdfs balancer` output:
+    `Jan 14, 2026 8:06:22 PM  0  0 B  1.2 GB  512 MB`
+    (time, iteration, bytes already moved, bytes left, bytes being moved).
+    """
+    m = _BALANCER_ROW.match(ln.strip())
+    if not m:
+        return None
+    return {
+        "ts": m.group("ts"),
+        "iteration": int(m.group("iteration")),
+        "bytes_moved": parse_size(m.group("moved")),
+        "bytes_left": parse_size(m.group("left")),
+        "bytes_being_moved": parse_size(m.group("being")),
+    }
+
+
+_FSCK_FILE = re.compile(
+    r"^(?P<path>/.*?) (?P<size>\d+) bytes, "
+    r"(?:replicated: replication=(?P<repl>\d+), |erasure-coded: policy=(?P<policy>\S+), )?"
+    r"(?P<blocks>\d+) block\(s\):(?P<rest>.*)$"
+)
+_FSCK_PROBLEM = re.compile(
+    r"^(?:(?P<path>/.*?):)?\s*(?:(?P<under>Under replicated)|MISSING (?P<missing>\d+) blocks"
+    r"|(?P<corrupt>CORRUPT blockpool)|CORRUPT \d+ blocks)"
+)
+_FSCK_BLOCK = re.compile(r"^\d+\. \S+ len=(?P<len>\d+) (?:Live_repl=(?P<live>\d+)|(?P<missing>MISSING!))")
+_FSCK_TOTAL = re.compile(r"^\s+(?P<key>[A-Za-z][^:]*?):\s+(?P<value>-?\d+(?:\.\d+)?)")
+_FSCK_SECTIONS = {"Replicated Blocks:": "replicated", "Erasure Coded Block Groups:": "erasure_coded"}
+
+
+def parse_fsck_line(ln: str) -> Optional[Dict]:
+    """
+    Classify one line of `hdfs fsck <path> [-files [-blocks]]` output:
+
+      file     `/d/f 1234 bytes, replicated: replication=3, 1 block(s):  OK`
+               (`rest` is what follows the colon: OK or the first problem)
+      dir      `/d <dir>`
+      block    `0. BP-1:blk_1073741825_1001 len=1234 Live_repl=3` (live None if MISSING!)
+      under    ` Under replicated BP-1:blk_...`, `/d/f:  Under replicated ...`
+      missing  ` MISSING 2 blocks of total size 100 B`, `/d/f: MISSING 2 blocks ...`
+      corrupt  `/d/f: CORRUPT blockpool BP-1 block blk_...` (one block)
+      status / section / total   the summary: `Status: HEALTHY`, `Replicated Blocks:`,
+               ` Under-replicated blocks:  1 (20.0 %)` (key, first number)
+      failed   `Fsck on path '/x' FAILED`
+
+    Problem lines carry `path` only when fsck prints it (without -files).
+    Anything else (headers, per-file CORRUPT totals) -> None.
+    """
+    m = _FSCK_FILE.match(ln)
+    if m:
+        return {
+            "kind": "file",
+            "path": m.group("path"),
+            "size": int(m.group("size")),
+            "replication": int(m.group("repl")) if m.group("repl") else None,
+            "policy": m.group("policy"),
+            "blocks": int(m.group("blocks")),
+            "rest": m.group("rest").strip(),
+        }
+    m = _FSCK_BLOCK.match(ln)
+    if m:
+        return {"kind": "block", "len": int(m.group("len")),
+                "live": None if m.group("missing") else int(m.group("live"))}
+    m = _FSCK_PROBLEM.match(ln)
+    if m:
+        path = m.group("path")
+        if m.group("under"):
+            return {"kind": "under", "path": path}
+        if m.group("missing"):
+            return {"kind": "missing", "path": path, "count": int(m.group("missing"))}
+        if m.group("corrupt"):
+            return {"kind": "corrupt", "path": path}
+        return None
+    if ln.endswith(" <dir>") and ln.startswith("/"):
+        return {"kind": "dir", "path": ln[:-len(" <dir>")]}
+    if ln.startswith("Status: "):
+        return {"kind": "status", "status": ln.split(None, 1)[1].strip()}
+    if ln.strip() in _FSCK_SECTIONS:
+        return {"kind": "section", "section": _FSCK_SECTIONS[ln.strip()]}
+    if ln.startswith("Fsck on path") and ln.rstrip().endswith("FAILED"):
+        return {"kind": "failed"}
+    m = _FSCK_TOTAL.match(ln)
+    if m:
+        key = re.sub(r"[^a-z0-9]+", "_", m.group("key").lower()).strip("_")
+        value = m.group("value")
+        return {"kind": "total", "key": key, "value": float(value) if "." in value else int(value)}
+    return None
+
+
+_REPORT_SECTION = re.compile(r"^(?P<state>[A-Za-z ]+?) datanodes \((?P<count>\d+)\):$")
+_REPORT_NUMBER = re.compile(r"^-?\d+(?:\.\d+)?(?=%?(?:\s|$))")
+
+
+def _report_key(key: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", key.lower().replace("%", " pct")).strip("_")
+
+
+def _report_value(value: str):
+    m = _REPORT_NUMBER.match(value)
+    if not m:
+        return value
+    return float(m.group()) if "." in m.group() or value.endswith("%") else int(m.group())
+
+
+def parse_dfsadmin_report(stdout: str) -> Dict:
+    """
+    Parse `hdfs dfsadmin -report`: the cluster totals before the first
+    datanode, then one record per `Name:` block, tagged with the section it
+    is listed under (`Live datanodes (3):` -> "live", "dead", ...).
+
+    Keys are snake_case with % as _pct (`DFS Used%: 10.00%` ->
+    dfs_used_pct 10.0); `1000 (1000 B)` -> 1000; other values stay strings.
+    """
+    summary: Dict = {}
+    nodes: List[Dict] = []
+    sections: Dict[str, int] = {}
+    state = None
+    node: Optional[Dict] = None
+    for ln in stdout.splitlines():
+        s = ln.strip()
+        m = _REPORT_SECTION.match(s)
+        if m:
+            state = _report_key(m.group("state"))
+            sections[state] = int(m.group("count"))
+            node = None
+            continue
+        if ":" not in s or s.startswith("---"):
+            continue
+        key, value = (p.strip() for p in s.split(":", 1))
+        if not value and not key.startswith("Name"):
+            continue  # section headings like `Replicated Blocks:`
+        if key == "Name":
+            node = {"state": state or "live", "name": value.split(" (", 1)[0]}
+            nodes.append(node)
+            continue
+        (node if node is not None else summary)[_report_key(key)] = _report_value(value)
+    return {"summary": summary, "sections": sections, "datanodes": nodes}
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import asyncio
+import posixpath
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, List, Optional, Tuple
+
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools import ToolResult
+
+from src.config import mcp_settings
+from src.mcp_hdfs.audit import AuditRecord, current_user, now_iso, record_exec, write_audit
+from src.mcp_hdfs.clusters import clusters
+from src.mcp_hdfs.constants import RISKY_TOOLS, SAFE_TOOLS
+from src.mcp_hdfs.models import ToolError
+
+SHARED = "S"
+EXCLUSIVE = "X"
+
+# RISKY_TOOLS without path locks: the balancer moves blocks between datanodes
+# and never changes the namespace
+PATHLESS_TOOLS = {"balancer_trigger", "balancer_stop"}
+
+Entry = Tuple[str, str]  # (path, mode)
+
+
+def norm_path(path: str) -> str:
+    path = path.strip()
+    if path.startswith("/"):
+        path = "/" + path.lstrip("/")  # normpath keeps a leading "//"
+    return posixpath.normpath(path)
+
+
+def overlaps(a: str, b: str) -> bool:
+    """True if one path is the other or one of its ancestors."""
+    if a == b or a == "/" or b == "/":
+        return True
+    return b.startswith(a + "/") or a.startswith(b + "/")
+
+
+def normalize(entries: Iterable[Entry]) -> Tuple[Entry, ...]:
+    """
+    Canonical lock set: normalized paths, one entry per path (exclusive wins),
+    entries already covered by an ancestor of the same or stronger mode
+    dropped, sorted by path.
+    """
+    modes: Dict[str, str] = {}
+    for path, mode in entries:
+        p = norm_path(path)
+        modes[p] = EXCLUSIVE if EXCLUSIVE in (mode, modes.get(p)) else SHARED
+    kept: List[Entry] = []
+    for p in sorted(modes, key=lambda p: (p.count("/"), p)):  # ancestors first
+        if not any(overlaps(q, p) and (m == EXCLUSIVE or modes[p] == SHARED) for q, m in kept):
+            kept.append((p, modes[p]))
+    return tuple(sorted(kept))
+
+
+def lock_plan(tool: str, args: Dict[str, Any]) -> Tuple[Entry, ...]:
+    """
+    Paths a tool call locks. SAFE tools (read-only, including get and
+    getquota) take no locks, so reads never wait behind a long chmod -R or
+    put_tree. Mutating tools lock exclusive what they change and shared the
+    HDFS paths they only read (a sync's source, a dry run's destination),
+    so those reads are consistent. PATHLESS_TOOLS act on datanodes, not on
+    paths, and take none either.
+    """
+    if tool in SAFE_TOOLS or tool in PATHLESS_TOOLS:
+        return ()
+
+    def arg(name: str) -> Optional[str]:
+        value = args.get(name)
+        return value if isinstance(value, str) and value else None
+
+    entries: List[Entry] = []
+    if tool in ("mkdir", "chmod", "chown", "setquota") and arg("path"):
+        entries.append((arg("path"), EXCLUSIVE))
+    elif tool == "put" and arg("hdfs_path"):
+        entries.append((arg("hdfs_path"), EXCLUSIVE))
+    elif tool == "put_tree" and arg("hdfs_dir"):
+        entries.append((arg("hdfs_dir"), EXCLUSIVE))
+    elif tool == "sync":
+        if args.get("direction", "to_hdfs") == "to_local":
+            if arg("source"):
+                entries.append((arg("source"), SHARED))
+        elif arg("destination"):
+            entries.append((arg("destination"), SHARED if args.get("dry_run") else EXCLUSIVE))
+    elif tool in ("snapshot_create", "snapshot_delete") and arg("path"):
+        # Concurrent writes below the directory are fine (snapshots are atomic),
+        # two snapshot changes on one directory are not.
+        entries.append((arg("path"), SHARED))
+        entries.append((posixpath.join(arg("path"), ".snapshot"), EXCLUSIVE))
+    return normalize(entries)
+
+
+@dataclass
+class LockRequest:
+    cluster: str
+    entries: Tuple[Entry, ...]
+    owner: str
+    since: float = field(default_factory=time.monotonic)
+    granted: Optional[asyncio.Future] = None  # resolved when a waiting request is granted
+
+
+def _conflicts(a: LockRequest, b: LockRequest) -> bool:
+    if a.cluster != b.cluster:
+        return False
+    return any(
+        (ma == EXCLUSIVE or mb == EXCLUSIVE) and overlaps(pa, pb)
+        for pa, ma in a.entries for pb, mb in b.entries
+    )
+
+
+class PathLockManager:
+    """
+    Hierarchical shared/exclusive locks on HDFS paths, per cluster.
+
+    An exclusive lock on a path conflicts with any lock on the path, its
+    ancestors or its descendants; shared locks only conflict with exclusive
+    ones. Calls on disjoint subtrees run concurrently.
+
+    A request names all its paths at once and is granted all of them
+    atomically, so no call ever holds some locks while waiting for others
+    and multi-path batches cannot deadlock. Waiters are served FIFO: a
+    request is granted once it conflicts with no held lock and with no
+    earlier waiter, so a stream of readers cannot starve a writer, while a
+    later request on an unrelated subtree does not wait behind it.
+    """
+
+    def __init__(self) -> None:
+        self._held: List[LockRequest] = []
+        self._queue: Deque[LockRequest] = deque()
+        self._lock = threading.Lock()
+
+    def _grantable(self, req: LockRequest) -> bool:
+        if any(_conflicts(req, h) for h in self._held):
+            return False
+        for w in self._queue:
+            if w is req:
+                return True
+            if _conflicts(req, w):
+                return False
+        return True
+
+    def _grant_waiters(self) -> None:
+        """Grant, in queue order, every waiter that has become grantable (lock held)."""
+        for w in [w for w in self._queue if self._grantable(w)]:
+            self._queue.remove(w)
+            self._held.append(w)
+            fut = w.granted
+            assert fut is not None
+            fut.get_loop().call_soon_threadsafe(lambda f=fut: f.done() or f.set_result(None))
+
+    async def acquire(self, entries: Iterable[Entry], timeout: Optional[float] = None) -> LockRequest:
+        """
+        Wait until every entry is granted. A waiting request is a future
+        resolved by release(), so it holds no thread. TimeoutError after
+        `timeout`; a cancelled wait withdraws the request.
+        """
+        req = LockRequest(cluster=clusters.current(), entries=normalize(entries), owner=current_user.get())
+        with self._lock:
+            if self._grantable(req):
+                self._held.append(req)
+                return req
+            req.granted = asyncio.get_running_loop().create_future()
+            self._queue.append(req)
+        try:
+            await asyncio.wait_for(asyncio.shield(req.granted), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if req in self._held:
+                    # granted while giving up: keep it on a timeout, hand it back on cancel
+                    if isinstance(e, asyncio.TimeoutError):
+                        return req
+                    self._held.remove(req)
+                else:
+                    self._queue.remove(req)
+                    message = self._busy_message(req)
+                self._grant_waiters()  # leaving the queue may unblock later waiters
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(message) from None
+            raise
+        return req
+
+    def release(self, req: LockRequest) -> None:
+        with self._lock:
+            self._held.remove(req)
+            self._grant_waiters()
+
+    @asynccontextmanager
+    async def hold(self, entries: Iterable[Entry], timeout: Optional[float] = None) -> AsyncIterator[LockRequest]:
+        req = await self.acquire(entries, timeout)
+        try:
+            yield req
+        finally:
+            self.release(req)
+
+    def _busy_message(self, req: LockRequest) -> str:
+        blockers = [h for h in self._held if _conflicts(req, h)]
+        held = ", ".join(f"{p} ({'exclusive' if m == EXCLUSIVE else 'shared'}, {h.owner})"
+                         for h in blockers for p, m in h.entries)
+        return f"Paths busy: {', '.join(p for p, _ in req.entries)}" + (f"; held: {held}" if held else "")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+
+        def describe(r: LockRequest) -> Dict[str, Any]:
+            return {
+                "cluster": r.cluster,
+                "locks": [{"path": p, "mode": m} for p, m in r.entries],
+                "owner": r.owner,
+                "age_sec": round(now - r.since, 1),
+            }
+
+        with self._lock:
+            return {"held": [describe(r) for r in self._held], "waiting": [describe(r) for r in self._queue]}
+
+
+path_locks = PathLockManager()
+
+
+class PathLockMiddleware(Middleware):
+    """
+    Takes the path locks of lock_plan() around each mutating tool call, so
+    its before/after snapshots and audit record are not interleaved with an
+    overlapping change. A waiting call awaits a future and holds no worker
+    thread. Added after ClusterMiddleware: locks are per cluster.
+    """
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        tool, args = context.message.name, context.message.arguments or {}
+        entries = lock_plan(tool, args) if mcp_settings.mcp_path_locks else ()
+        if not entries:
+            return await call_next(context)
+
+        t0 = time.perf_counter()
+        try:
+            req = await path_locks.acquire(entries, mcp_settings.mcp_path_lock_timeout_sec)
+        except TimeoutError as e:
+            err = ToolError(error=str(e), hint="Another call is changing an overlapping path; retry when it finishes")
+            write_audit(AuditRecord(
+                ts=now_iso(),
+                tool=tool,
+                risk="safe" if tool in SAFE_TOOLS else "risky" if tool in RISKY_TOOLS else "unknown",
+                args={**args, "lock_timeout": True},
+                ok=False,
+                stderr=err.error,
+            ))
+            # is_error: the ToolError does not match the tool's ToolOk output schema
+            return ToolResult(structured_content=err.model_dump(), is_error=True)
+        record_exec(lock_ms=(time.perf_counter() - t0) * 1000)
+        try:
+            return await call_next(context)
+        finally:
+            path_locks.release(req)
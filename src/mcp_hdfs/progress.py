@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Any, Optional
+
+from src.mcp_hdfs.constants import PROGRESS_INTERVAL_SEC
+
+
+class ProgressReporter:
+    """
+    Thread-safe, throttled bridge from blocking worker code to MCP progress
+    notifications (`ctx.report_progress`) on the server event loop.
+    A reporter without ctx is a no-op, so tools stay callable directly.
+    """
+
+    def __init__(self, ctx: Any = None, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 interval: float = PROGRESS_INTERVAL_SEC) -> None:
+        self.ctx = ctx
+        self.loop = loop
+        self.interval = interval
+        self.started = time.perf_counter()
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def __call__(self, progress: float, total: Optional[float] = None, message: str = "", force: bool = False) -> None:
+        if self.ctx is None or self.loop is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if not force and now - self._last < self.interval:
+                return
+            self._last = now
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self.ctx.report_progress(progress=progress, total=total, message=message),
+                self.loop,
+            )
+        except RuntimeError:
+            pass  # loop closed: client went away
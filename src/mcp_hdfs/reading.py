@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import base64
+import codecs
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import quote, urlencode
+
+from src.config import mcp_settings
+from src.mcp_hdfs.constants import HDFS_TAIL_BYTES, READ_BINARY_SNIFF_BYTES, READ_CHUNK_BYTES
+from src.mcp_hdfs.hdfs_exec import DockerStream, build_hdfs_dfs_cmd
+
+def cat_cmd(path: str) -> List[str]:
+    """`hdfs dfs -cat path`: the file from its first byte (no seek)."""
+    return build_hdfs_dfs_cmd("cat", [path])
+
+
+def webhdfs_enabled() -> bool:
+    return bool(mcp_settings.mcp_webhdfs_url)
+
+
+def webhdfs_open_cmd(path: str, offset: int, length: int) -> List[str]:
+    """
+    WebHDFS OPEN of `length` bytes from `offset`, fetched with curl inside
+    the namenode container: the datanode seeks to the range, so nothing
+    before it is read or streamed. Follows the redirect to the datanode.
+    """
+    query = urlencode({"op": "OPEN", "offset": offset, "length": length,
+                       "user.name": mcp_settings.mcp_webhdfs_user})
+    url = f"{mcp_settings.mcp_webhdfs_url.rstrip('/')}/webhdfs/v1{quote('/' + path.lstrip('/'))}?{query}"
+    return ["curl", "-sS", "-f", "-L", url]
+
+
+def tail_cmd(path: str) -> List[str]:
+    """`hdfs dfs -tail`: the last HDFS_TAIL_BYTES of the file, read with a seek."""
+    return build_hdfs_dfs_cmd("tail", [path])
+
+
+def _nth_newline_end(buf: bytearray, n: int) -> Optional[int]:
+    pos = -1
+    for _ in range(n):
+        pos = buf.find(b"\n", pos + 1)
+        if pos < 0:
+            return None
+    return pos + 1
+
+
+@dataclass
+class ReadResult:
+    data: bytes = b""
+    truncated: bool = False     # more output existed past what was kept
+    ok: bool = True
+    exit_code: int = 0
+    stderr: str = ""
+    timed_out: bool = False
+    docker_cmd: List[str] = field(default_factory=list)
+
+
+def read_capped(cmd: List[str], max_bytes: int, max_lines: Optional[int] = None) -> ReadResult:
+    """
+    Stream the command's stdout and stop as soon as `max_bytes` (a hard cap)
+    or `max_lines` complete lines are in hand; the process is then killed,
+    so a multi-GB file costs no more than the bytes kept.
+    """
+    res = ReadResult()
+    buf = bytearray()
+    st = DockerStream(cmd, binary=True)
+    res.docker_cmd = st.docker_cmd
+    with st:
+        for chunk in st.chunks(READ_CHUNK_BYTES):
+            buf += chunk
+            limit = max_bytes
+            if max_lines is not None:
+                end = _nth_newline_end(buf, max_lines)
+                if end is not None:
+                    limit = min(limit, end)
+            if len(buf) > limit:
+                res.truncated = True
+                del buf[limit:]
+                break
+    res.data = bytes(buf)
+    res.exit_code = st.exit_code if st.exit_code is not None else -1
+    res.stderr = st.stderr
+    res.timed_out = st.timed_out
+    res.ok = not st.timed_out and st.ok
+    return res
+
+
+def last_lines(data: bytes, n: int, starts_mid_file: bool) -> bytes:
+    """Last `n` lines of a file tail; a partial first line (tail began mid-line) is dropped."""
+    if starts_mid_file:
+        cut = data.find(b"\n")
+        if 0 <= cut < len(data) - 1:
+            data = data[cut + 1:]
+    return b"".join(data.splitlines(keepends=True)[-n:])
+
+
+def decode_preview(data: bytes, starts_mid_file: bool = False) -> Dict:
+    """
+    UTF-8 text of a byte range that may cut characters at either end: leading
+    continuation bytes (range began inside a character) and an incomplete
+    trailing sequence (byte cap hit inside one) are left out rather than
+    shown as U+FFFD. Data with NUL bytes is treated as binary and returned
+    as base64 instead.
+    """
+    if b"\x00" in data[:READ_BINARY_SNIFF_BYTES]:
+        return {"binary": True, "text": None, "base64": base64.b64encode(data).decode("ascii")}
+    start = 0
+    if starts_mid_file:
+        while start < min(3, len(data)) and 0x80 <= data[start] <= 0xBF:
+            start += 1
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text = decoder.decode(data[start:], final=False)
+    return {"binary": False, "text": text, "base64": None}
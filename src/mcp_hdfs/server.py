@@ -1,24 +1,70 @@
 from __future__ import annotations
 
-from fastmcp import FastMCP
+import asyncio
+import json
+import posixpath
+import time
+from collections import deque
+from typing import List
+
+from fastmcp import Context, FastMCP
 from src.config import mcp_settings
 
-from src.mcp_hdfs.audit import AuditRecord, compute_perm_diff, now_iso, write_audit, init_audit_log
-from src.mcp_hdfs.hdfs_exec import run_docker_exec, build_hdfs_dfs_cmd
-from src.mcp_hdfs.constants import MAX_LIST_LIMIT, SAFE_TOOLS, RISKY_TOOLS
+from src.mcp_hdfs.admission import AdmissionMiddleware, admission
+from src.mcp_hdfs.audit import (
+    AuditRecord, compute_perm_diff, iso_ms, now_iso, summarize_cmd, write_audit, init_audit_log,
+)
+from src.mcp_hdfs.capacity import capacity_reports, capacity_summary, datanode_record
+from src.mcp_hdfs.clusters import clusters as cluster_registry
+from src.mcp_hdfs.hdfs_exec import DockerStream, docker_exec_prefix, run_docker_exec, build_hdfs_dfs_cmd
+from src.mcp_hdfs.constants import (
+    CAPACITY_THRESHOLD_PCT, FSCK_TOP_K_DEFAULT, HDFS_TAIL_BYTES, JOB_OUTPUT_TAIL_LINES, MAX_LIST_LIMIT,
+    PROGRESS_EVERY_ITEMS, QUOTA_PATHS_PER_CALL, READ_DEFAULT_BYTES, READ_DEFAULT_LINES, SAFE_TOOLS, RISKY_TOOLS,
+    SYNC_PLAN_SAMPLE, USAGE_PATHS_PER_CALL, USAGE_TOP_K_DEFAULT,
+)
+from src.mcp_hdfs.fsck import FsckAggregator, fsck_cmd
+from src.mcp_hdfs.jobs import BackgroundJob, jobs
+from src.mcp_hdfs.listing import ListingResult, listing_version, run_listing, version_token
 from src.mcp_hdfs.models import (
+    BalancerRequest,
+    CapacitySummary, ClusterReportData, ClusterReportRequest, DataNodeInfo,
     ChmodRequest, ChownRequest,
+    FsckReportData, FsckRequest,
+    GetQuotaRequest, GetQuotaResponseData, QuotaInfo,
     GetRequest, ListRequest, ListResponseData, LsItem,
     MkdirRequest,
+    NotModifiedData,
     PermSnapshot,
-    PutRequest,
+    PutRequest, PutTreeRequest,
+    SnapshotDiffEntry, SnapshotDiffRequest, SnapshotDiffResponseData, SnapshotInfo, SnapshottableDir,
+    ReadRequest, ReadResponseData,
     StatRequest, StatResponseData,
+    SyncRequest,
     ToolError, ToolOk,
+    UsageChild, UsageInfo, UsageRequest, UsageResponseData,
+)
+from src.mcp_hdfs.parsers import (
+    SNAPSHOT_DIFF_TYPES,
+    parse_balancer_line, parse_hdfs_count_lines, parse_hdfs_count_q, parse_hdfs_du, parse_hdfs_ls, parse_hdfs_stat,
+    parse_snapshot_diff_line, parse_snapshottable_dirs,
+)
+from src.mcp_hdfs.pathlock import PathLockMiddleware, path_locks
+from src.mcp_hdfs.progress import ProgressReporter
+from src.mcp_hdfs.reading import (
+    ReadResult, cat_cmd, decode_preview, last_lines, read_capped, tail_cmd, webhdfs_enabled, webhdfs_open_cmd,
+)
+from src.mcp_hdfs.serving import ClientIdentityMiddleware, ClusterMiddleware, drain
+from src.mcp_hdfs.transfer import (
+    BatchResult, SyncCache, SyncSide, TransferBatch, TransferManifest,
+    classify_sync, list_local_tree, mkdir_many, plan_batches, resolve_verified, run_batches, run_sides, throughput,
 )
-from src.mcp_hdfs.parsers import parse_hdfs_ls, parse_hdfs_stat
 
 
 mcp = FastMCP("mcp-hdfs")
+mcp.add_middleware(ClientIdentityMiddleware())
+mcp.add_middleware(AdmissionMiddleware())
+mcp.add_middleware(ClusterMiddleware())
+mcp.add_middleware(PathLockMiddleware())
 
 
 def tool_risk(tool_name: str) -> str:
@@ -59,78 +105,181 @@ def _perm_snapshot(path: str) -> PermSnapshot | None:
 
 
 @mcp.tool()
-def list(path: str = "/", recursive: bool = False, limit: int = 200, offset: int = 0) -> ToolOk:
+async def list(path: str = "/",
+               recursive: bool = False,
+               sharded: bool = False,
+               spill: bool = False,
+               limit: int = 200,
+               offset: int = 0,
+               continuation: str | None = None,
+               max_items: int | None = None,
+               time_budget_sec: float | None = None,
+               if_none_match: str | None = None,
+               cluster: str | None = None,
+               ctx: Context | None = None) -> ToolOk:
     """
     List directory contents in HDFS with paging.
 
+    The listing is streamed: reading stops as soon as the page is filled,
+    and progress notifications (items scanned, dirs visited, elapsed) are
+    sent while it runs. If more items remain, the open stream is kept for a
+    short time and `continuation` resumes from it without re-listing.
+
+    With recursive=true and sharded=true, the tree is listed by several
+    parallel `ls -R` execs over its top-level subtrees (MCP_LIST_SHARD_DIRS,
+    MCP_LIST_SHARD_PARALLELISM) and merged back into the same order as a
+    single `ls -R`; use it for trees too large for one walk.
+
+    With spill=true, the whole listing is written to a temp file in the
+    background (one JSON item per line plus an offset index) and pages are
+    read back from it by offset, so memory stays flat for millions of
+    entries and pages are served while the walk goes on. The continuation
+    token points at the spill file, deleted MCP_LIST_SPILL_TTL_SEC after its
+    last use; `total` is set once the walk has finished.
+
+    Conditional listing (non-recursive only): pass `if_none_match` and the
+    directory is probed with one `-stat` first. Its mtime changes whenever
+    a direct child is created, deleted or renamed; if the token still
+    matches the answer is {not_modified: true} without running the listing,
+    otherwise the page is listed and carries the new `version`. Pass "" on
+    the first call to get a version. Changes below the direct children do
+    not change the version. No probe runs without if_none_match.
+
     Args:
         path: HDFS directory path to list.
         recursive: If True, list recursively.
+        sharded: With recursive, list subtrees in parallel.
+        spill: Spill the listing to disk and page from there (huge trees).
         limit: Max number of items to return in this page (paging).
         offset: Start index for paging.
+        continuation: Token from a previous call; overrides path/recursive/offset.
+        max_items: Item budget for this call (items scanned, including skipped ones).
+        time_budget_sec: Time budget for this call.
+        if_none_match: `version` from an earlier identical call ("" for none yet);
+            ignored with recursive or continuation.
+        cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: SAFE (read-only).
     Idempotency: Yes (repeating does not change state).
 
     Returns:
-        ToolOk with items[] and next_offset (or null if last page).
+        ToolOk with items[], next_offset (or null if last page), a
+        continuation token, and a version when if_none_match was given.
+        When a budget runs out, partial=true and the token continues where
+        the scan stopped. With a matching if_none_match: ToolOk with
+        not_modified=true and the version.
     """
     # Покажи содержимое /data/raw
     # Покажи первый 1 файл в /data/raw
     # Покажи следующие файлы (offset=1)
-    req = ListRequest(path=path, recursive=recursive, limit=min(limit, MAX_LIST_LIMIT), offset=offset)
-
-    ls_args = (["-R"] if req.recursive else []) + [req.path]
-    args = build_hdfs_dfs_cmd("ls", ls_args)
-
-    code, out, err, docker_cmd = run_docker_exec(args)
-    ok = (code == 0)
-
-    write_audit(AuditRecord(
-        ts=now_iso(),
-        tool="list",
-        risk=tool_risk("list"),
-        args=req.model_dump(),
-        docker_cmd=docker_cmd,
-        ok=ok,
-        exit_code=code,
-        stdout=out,
-        stderr=err,
-    ))
-
-    if not ok:
-        return ToolError(error=(err.strip() or "hdfs dfs -ls failed")).model_dump()
-
-    parsed = parse_hdfs_ls(out)
-    page = parsed[req.offset:req.offset + req.limit]
-    next_offset = req.offset + req.limit if (req.offset + req.limit) < len(parsed) else None
+    req = ListRequest(
+        path=path,
+        recursive=recursive,
+        sharded=sharded,
+        spill=spill,
+        limit=min(limit, MAX_LIST_LIMIT),
+        offset=offset,
+        continuation=continuation,
+        max_items=max_items,
+        time_budget_sec=time_budget_sec,
+        if_none_match=if_none_match,
+    )
+    report = ProgressReporter(ctx, asyncio.get_running_loop())
+
+    def run() -> tuple[ListingResult | None, str | None]:
+        version = None
+        if req.if_none_match is not None and not req.recursive and not req.continuation:
+            version = listing_version(req.path, req.offset, req.limit)
+            if version is not None and version == req.if_none_match:
+                write_audit(AuditRecord(
+                    ts=now_iso(),
+                    tool="list",
+                    risk=tool_risk("list"),
+                    args=req.model_dump(),
+                    ok=True,
+                    stdout=json.dumps({"not_modified": True, "version": version}),
+                ))
+                return None, version
+        res = run_listing(
+            req.path, req.recursive, req.offset, req.limit,
+            sharded=req.sharded,
+            continuation=req.continuation,
+            max_items=req.max_items,
+            time_budget_sec=req.time_budget_sec,
+            on_progress=report,
+            spill=req.spill,
+        )
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="list",
+            risk=tool_risk("list"),
+            args=req.model_dump(),
+            docker_cmd=res.docker_cmd,
+            ok=res.ok,
+            exit_code=res.exit_code,
+            stdout=json.dumps({
+                "returned": len(res.items),
+                "scanned": res.scanned,
+                "partial": res.partial,
+                "stop_reason": res.stop_reason,
+                "resumed": res.resumed,
+                "version": version,
+            }),
+            stderr=res.stderr,
+        ))
+        return res, version
 
+    try:
+        res, version = await asyncio.to_thread(run)
+    except ValueError as e:
+        return ToolError(error=str(e), hint="Start again without continuation").model_dump()
+    except RuntimeError as e:
+        return ToolError(error=str(e)).model_dump()
+
+    if res is None:
+        return ToolOk(data=NotModifiedData(path=req.path, version=version).model_dump()).model_dump()
+    if not res.ok:
+        return ToolError(error=(res.stderr.strip() or "hdfs dfs -ls failed")).model_dump()
+
+    report(res.scanned, None, f"done: {res.scanned} items, {res.dirs_visited} dirs", force=True)
     data = ListResponseData(
-        items=[LsItem(**x) for x in page],
-        next_offset=next_offset,
-        total_in_page=len(page),
+        items=[LsItem(**x) for x in res.items],
+        next_offset=res.next_offset,
+        total_in_page=len(res.items),
+        continuation=res.continuation,
+        partial=res.partial,
+        stop_reason=res.stop_reason,
+        scanned=res.scanned,
+        dirs_visited=res.dirs_visited,
+        elapsed_sec=res.elapsed_sec,
+        version=None if res.partial else version,
+        total=res.total,
     )
     return ToolOk(data=data.model_dump()).model_dump()
 
 
 @mcp.tool()
-def stat(path: str) -> ToolOk:
+def stat(path: str, if_none_match: str | None = None, cluster: str | None = None) -> ToolOk:
     """
     Get metadata for a single HDFS path (file or directory).
 
     Args:
       path: HDFS path.
+      if_none_match: `version` from an earlier stat of the same path.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER); "*" queries every cluster in parallel.
 
     Safety: SAFE (read-only).
     Idempotency: Yes.
 
     Returns:
-      ToolOk with size, owner, group, permissions, type, mtime (best-effort).
+      ToolOk with size, owner, group, permissions, type, mtime (best-effort)
+      and a version token (mtime + size + type); with a matching
+      if_none_match, ToolOk with not_modified=true instead.
     """
     # Какой размер у /data/raw/sample.csv?
     # Кто владелец /data/raw?
-    req = StatRequest(path=path)
-    fmt = "%n|%b|%o|%r|%u|%g|%y|%F"
+    req = StatRequest(path=path, if_none_match=if_none_match)
+    fmt = "%n|%b|%o|%r|%u|%g|%y|%F|%Y"
 
     args = build_hdfs_dfs_cmd("stat", [fmt, req.path])
     code, out, err, docker_cmd = run_docker_exec(args)
@@ -155,12 +304,181 @@ def stat(path: str) -> ToolOk:
     if "raw" in parsed and len(parsed) == 1:
         return ToolOk(data=parsed).model_dump()
 
+    if parsed["modified_ms"] is not None:
+        parsed["version"] = version_token("stat", req.path, parsed["modified_ms"], parsed["size"], parsed["type"])
+        if parsed["version"] == req.if_none_match:
+            return ToolOk(data=NotModifiedData(path=req.path, version=parsed["version"]).model_dump()).model_dump()
+
     data = StatResponseData(**parsed)
     return ToolOk(data=data.model_dump()).model_dump()
 
 
+def _read_tool(tool: str, req: ReadRequest, res: ReadResult, data: bytes, offset: int,
+               truncated: bool, file_size: int | None = None) -> ToolOk | ToolError:
+    """Audit a head/tail/cat read and build its response (content is not logged)."""
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool=tool,
+        risk=tool_risk(tool),
+        args=req.model_dump(),
+        docker_cmd=res.docker_cmd,
+        ok=res.ok,
+        exit_code=res.exit_code,
+        stdout=json.dumps({"offset": offset, "bytes": len(data), "truncated": truncated}),
+        stderr=res.stderr,
+    ))
+    if not res.ok:
+        error = "timed out" if res.timed_out else (res.stderr.strip() or f"hdfs dfs -{tool} failed")
+        return ToolError(error=error).model_dump()
+
+    preview = decode_preview(data, starts_mid_file=offset > 0)
+    lines = None
+    if req.lines is not None and not preview["binary"]:
+        lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+    out = ReadResponseData(
+        path=req.path, offset=offset, bytes=len(data), file_size=file_size,
+        lines=lines, truncated=truncated, **preview,
+    )
+    return ToolOk(data=out.model_dump()).model_dump()
+
+
+def _read_cap(max_bytes: int | None, default: int = READ_DEFAULT_BYTES) -> int:
+    return min(max_bytes or default, mcp_settings.mcp_read_max_bytes)
+
+
 @mcp.tool()
-def mkdir(path: str, parents: bool = True, confirm: bool = False) -> ToolOk | ToolError:
+def head(path: str,
+         lines: int | None = READ_DEFAULT_LINES,
+         max_bytes: int | None = None,
+         cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    First lines (or bytes) of an HDFS file, without copying it anywhere.
+
+    Streams `hdfs dfs -cat` and stops reading as soon as `lines` lines or
+    `max_bytes` bytes are in hand, so a multi-GB file costs only what is
+    returned.
+
+    Args:
+      path: HDFS file path.
+      lines: Number of lines; null for bytes only.
+      max_bytes: Byte cap (default 64 KiB, at most MCP_READ_MAX_BYTES).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with text (UTF-8; partial characters at the cut are dropped) or
+      base64 for binary data, bytes, lines and truncated=true if the file
+      goes on.
+    """
+    # Покажи первые 20 строк /data/raw/sample.csv
+    req = ReadRequest(path=path, lines=lines, max_bytes=max_bytes)
+    res = read_capped(cat_cmd(req.path), _read_cap(req.max_bytes), req.lines)
+    return _read_tool("head", req, res, res.data, 0, res.truncated)
+
+
+@mcp.tool()
+def tail(path: str,
+         lines: int | None = READ_DEFAULT_LINES,
+         max_bytes: int | None = None,
+         cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Last lines (or bytes) of an HDFS file.
+
+    Reads only the end of the file: up to 1 KiB with `hdfs dfs -tail`,
+    more with a WebHDFS OPEN at size - max_bytes (MCP_WEBHDFS_URL), where
+    the datanode seeks to the range. Without WebHDFS, max_bytes above 1 KiB
+    is refused unless the whole file fits.
+
+    Args:
+      path: HDFS file path.
+      lines: Number of lines (from the last max_bytes bytes); null for bytes only.
+      max_bytes: Byte cap (default 1 KiB, at most MCP_READ_MAX_BYTES).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with text or base64, the byte offset where it starts, file_size
+      and truncated=true if the file has more before it.
+    """
+    # Покажи последние строки /logs/app.log
+    req = ReadRequest(path=path, lines=lines, max_bytes=max_bytes)
+    code, out, err, docker_cmd = run_docker_exec(build_hdfs_dfs_cmd("stat", ["%b|%F", req.path]))
+    size_s, _, ftype = out.strip().partition("|")
+    if code != 0 or not size_s.isdigit():
+        res = ReadResult(ok=False, exit_code=code, stderr=err or out, docker_cmd=docker_cmd)
+        return _read_tool("tail", req, res, b"", 0, False)
+    if ftype == "directory":
+        return ToolError(error=f"{req.path} is a directory", hint="Use list for directories").model_dump()
+
+    size, cap = int(size_s), _read_cap(req.max_bytes, default=HDFS_TAIL_BYTES)
+    start = max(0, size - cap)
+    if start == 0:
+        res = read_capped(cat_cmd(req.path), cap)
+    elif cap <= HDFS_TAIL_BYTES:
+        res = read_capped(tail_cmd(req.path), HDFS_TAIL_BYTES)
+        res.data = res.data[-cap:]
+    elif webhdfs_enabled():
+        res = read_capped(webhdfs_open_cmd(req.path, start, cap), cap)
+    else:
+        return ToolError(
+            error=f"tail reads at most {HDFS_TAIL_BYTES} bytes without WebHDFS",
+            hint=f"Use max_bytes <= {HDFS_TAIL_BYTES} or set MCP_WEBHDFS_URL",
+        ).model_dump()
+    data = res.data
+    if req.lines is not None:
+        data = last_lines(data, req.lines, starts_mid_file=start > 0)
+    offset = max(0, size - len(data))
+    return _read_tool("tail", req, res, data, offset, offset > 0, file_size=size)
+
+
+@mcp.tool()
+def cat(path: str,
+        offset: int = 0,
+        length: int | None = None,
+        cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    A byte range of an HDFS file: `length` bytes from `offset`.
+
+    From offset 0 `hdfs dfs -cat` is streamed and stopped after `length`.
+    Any other offset is read with a WebHDFS OPEN (MCP_WEBHDFS_URL): the
+    datanode seeks to it, so the bytes before it are never read; without
+    WebHDFS only offset 0 is allowed.
+
+    Args:
+      path: HDFS file path.
+      offset: First byte (0-based).
+      length: Bytes to read (default 64 KiB, at most MCP_READ_MAX_BYTES).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with text or base64, bytes and truncated=true if the file goes
+      on past the range (continue with offset + bytes).
+    """
+    # Покажи байты 1000-2000 файла /data/raw/sample.csv
+    req = ReadRequest(path=path, offset=offset, max_bytes=length)
+    cap = _read_cap(req.max_bytes)
+    # one byte past the range tells whether the file goes on
+    if req.offset == 0:
+        res = read_capped(cat_cmd(req.path), cap)
+    elif webhdfs_enabled():
+        res = read_capped(webhdfs_open_cmd(req.path, req.offset, cap + 1), cap)
+    else:
+        return ToolError(
+            error="cat from a non-zero offset needs WebHDFS (MCP_WEBHDFS_URL is empty)",
+            hint="Read from offset 0, or use head/tail",
+        ).model_dump()
+    return _read_tool("cat", req, res, res.data, req.offset, res.truncated)
+
+
+@mcp.tool()
+def mkdir(path: str, parents: bool = True, confirm: bool = False, cluster: str | None = None) -> ToolOk | ToolError:
     """
     Create a directory in HDFS.
 
@@ -168,6 +486,7 @@ def mkdir(path: str, parents: bool = True, confirm: bool = False) -> ToolOk | To
       path: Directory path to create.
       parents: If True, create parent directories (like mkdir -p).
       confirm: Must be True if strict_confirm policy is enabled.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY-ish (writes to filesystem). May require confirmation by policy.
     Idempotency: Generally yes with parents=True; repeated calls should not break state.
@@ -210,7 +529,11 @@ def mkdir(path: str, parents: bool = True, confirm: bool = False) -> ToolOk | To
 
 
 @mcp.tool()
-def put(local_path: str, hdfs_path: str, overwrite: bool = False, confirm: bool = False) -> ToolOk | ToolError:
+def put(local_path: str,
+        hdfs_path: str,
+        overwrite: bool = False,
+        confirm: bool = False,
+        cluster: str | None = None) -> ToolOk | ToolError:
     """
     Upload a local file into HDFS.
 
@@ -219,6 +542,7 @@ def put(local_path: str, hdfs_path: str, overwrite: bool = False, confirm: bool
       hdfs_path: Destination path in HDFS.
       overwrite: If True, overwrite destination if exists (requires confirm=True).
       confirm: Explicit confirmation required when overwrite=True.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY (write). Overwrite is destructive.
     Idempotency: No for overwrite; for overwrite=False it is safe if file does not exist.
@@ -261,7 +585,425 @@ def put(local_path: str, hdfs_path: str, overwrite: bool = False, confirm: bool
 
 
 @mcp.tool()
-def get(hdfs_path: str, local_path: str, overwrite: bool = False, confirm: bool = False) -> ToolOk | ToolError:
+def put_tree(local_dir: str,
+             hdfs_dir: str,
+             overwrite: bool = False,
+             resume: bool = True,
+             batch_files: int | None = None,
+             parallelism: int | None = None,
+             confirm: bool = False,
+             cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Upload a local directory tree into HDFS in parallel batches.
+
+    Many files are sent per `hdfs dfs -put` invocation (multi-source put),
+    several invocations run concurrently, and destination directories are
+    created in bulk up front.
+
+    Args:
+      local_dir: Directory inside the namenode container (e.g. /tmp/dataset).
+      hdfs_dir: Destination directory in HDFS; the tree is mirrored below it.
+      overwrite: If True, overwrite existing destination files (-f).
+      resume: If True, skip files recorded as done by an interrupted run.
+      batch_files: Max files per put invocation (default MCP_TRANSFER_BATCH_FILES).
+      parallelism: Max concurrent put invocations (default MCP_TRANSFER_PARALLELISM).
+      confirm: Must be True (bulk write).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: RISKY (bulk write). Overwrite is destructive.
+    Idempotency: With resume=True, repeating an interrupted call continues where it stopped.
+
+    Audit:
+      One summarized record per batch plus a final totals record.
+
+    Returns:
+      ToolOk with file/byte counts, files/sec, bytes/sec and failed batches.
+    """
+    # Загрузи дерево /tmp/dataset в /data/dataset
+    req = PutTreeRequest(
+        local_dir=local_dir,
+        hdfs_dir=hdfs_dir,
+        overwrite=overwrite,
+        resume=resume,
+        batch_files=batch_files or mcp_settings.mcp_transfer_batch_files,
+        parallelism=parallelism or mcp_settings.mcp_transfer_parallelism,
+        confirm=confirm,
+    )
+
+    if not req.confirm:
+        return ToolError(
+            error="put_tree writes many files and requires confirm=true",
+            hint="Call put_tree with confirm=true"
+        ).model_dump()
+
+    t0 = time.perf_counter()
+    code, files, err, docker_cmd = list_local_tree(req.local_dir)
+    if code != 0:
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="put_tree",
+            risk=tool_risk("put_tree"),
+            args=req.model_dump(),
+            docker_cmd=docker_cmd,
+            ok=False,
+            exit_code=code,
+            stderr=err,
+        ))
+        return ToolError(error=(err.strip() or f"cannot list local dir {req.local_dir}")).model_dump()
+
+    manifest = TransferManifest("put_tree", req.local_dir, req.hdfs_dir)
+    if req.resume:
+        manifest.load()
+    else:
+        manifest.remove()
+
+    pending = [f for f in files if f.rel_path not in manifest.done]
+    batches = plan_batches(pending, req.hdfs_dir, req.batch_files)
+    dirs_total, dir_errors = mkdir_many(
+        [b.dest_dir for b in batches],
+        lambda chunk: build_hdfs_dfs_cmd("mkdir", ["-p", *chunk]),
+    )
+
+    def upload(batch: TransferBatch) -> BatchResult:
+        sources = [posixpath.join(req.local_dir, f.rel_path) for f in batch.files]
+        put_args = (["-f"] if req.overwrite else []) + sources + [batch.dest_dir]
+        args = build_hdfs_dfs_cmd("put", put_args)
+
+        bt0 = time.perf_counter()
+        try:
+            code, out, err, docker_cmd = run_docker_exec(args, timeout=mcp_settings.mcp_transfer_timeout_sec)
+        except RuntimeError as e:
+            code, out, err, docker_cmd = -1, "", str(e), docker_exec_prefix() + args
+        ok = (code == 0)
+        elapsed = time.perf_counter() - bt0
+
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="put_tree",
+            risk=tool_risk("put_tree"),
+            args={
+                "local_dir": req.local_dir,
+                "hdfs_dir": req.hdfs_dir,
+                "batch": batch.index,
+                "dest_dir": batch.dest_dir,
+                "files": len(batch.files),
+                "bytes": batch.bytes,
+                "overwrite": req.overwrite,
+                "elapsed_sec": round(elapsed, 3),
+            },
+            docker_cmd=summarize_cmd(docker_cmd),
+            ok=ok,
+            exit_code=code,
+            stdout=out,
+            stderr=err,
+        ))
+
+        if ok:
+            manifest.mark_done([f.rel_path for f in batch.files])
+        return BatchResult(
+            index=batch.index,
+            ok=ok,
+            files=len(batch.files),
+            bytes=batch.bytes,
+            exit_code=code,
+            error=None if ok else (err.strip()[-500:] or "hdfs dfs -put failed"),
+            elapsed_sec=round(elapsed, 3),
+        )
+
+    results = run_batches(batches, upload, req.parallelism) if not dir_errors else []
+    failed = [r for r in results if not r.ok]
+    files_done = sum(r.files for r in results if r.ok)
+    bytes_done = sum(r.bytes for r in results if r.ok)
+    stats = throughput(files_done, bytes_done, time.perf_counter() - t0)
+
+    complete = not dir_errors and not failed
+    if complete:
+        manifest.remove()
+
+    summary = {
+        "local_dir": req.local_dir,
+        "hdfs_dir": req.hdfs_dir,
+        "files_total": len(files),
+        "files_skipped_resume": len(files) - len(pending),
+        "files_uploaded": files_done,
+        "bytes_uploaded": bytes_done,
+        "batches": len(batches),
+        "dirs": dirs_total,
+        **stats,
+        "failed_batches": [
+            {"batch": r.index, "files": r.files, "exit_code": r.exit_code, "error": r.error} for r in failed
+        ],
+        "manifest": None if complete else str(manifest.path),
+    }
+
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="put_tree",
+        risk=tool_risk("put_tree"),
+        args={**req.model_dump(), "summary": True},
+        docker_cmd=[],
+        ok=complete,
+        stdout=json.dumps({k: v for k, v in summary.items() if k != "failed_batches"}),
+        stderr="\n".join(dir_errors),
+    ))
+
+    if dir_errors:
+        return ToolError(error="bulk mkdir failed: " + dir_errors[0][-500:],
+                         hint="Check permissions/quota on the destination").model_dump()
+    if failed:
+        return ToolError(
+            error=f"{len(failed)} of {len(batches)} batches failed: {failed[0].error}",
+            hint=f"Fix the cause and call put_tree again with resume=true (manifest: {manifest.path})",
+        ).model_dump()
+
+    return ToolOk(data=summary).model_dump()
+
+
+@mcp.tool()
+def sync(source: str,
+         destination: str,
+         direction: str = "to_hdfs",
+         dry_run: bool = False,
+         checksums: bool = True,
+         adopt_existing: bool = False,
+         batch_files: int | None = None,
+         parallelism: int | None = None,
+         confirm: bool = False,
+         cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Incrementally sync a directory tree, transferring only new or changed files.
+
+    Files are compared by size and mtime (milliseconds, from `-stat %Y` on
+    HDFS) against a persisted cache of the last sync; when only the mtime
+    moved, content checksums decide (`hdfs dfs -checksum` on HDFS, `md5sum`
+    in the container). Checksums of copied and adopted files are taken in
+    one batched pass at the end and cached for the next run.
+
+    Args:
+      source: Source directory (container path for to_hdfs, HDFS path for to_local).
+      destination: Destination directory on the other side.
+      direction: "to_hdfs" (container -> HDFS) or "to_local" (HDFS -> container).
+      dry_run: If True, only report what would be transferred.
+      checksums: If True, resolve mtime-only changes by checksum and record checksums of copied/adopted files.
+      adopt_existing: If True, same-size destination files missing from the cache count as unchanged
+        (their checksums are recorded).
+      batch_files: Max files per put/get invocation (default MCP_TRANSFER_BATCH_FILES).
+      parallelism: Max concurrent invocations (default MCP_TRANSFER_PARALLELISM).
+      confirm: Must be True unless dry_run (changed files are overwritten).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: RISKY (overwrites changed destination files). dry_run is read-only.
+    Idempotency: Yes; a repeated sync of an unchanged tree transfers nothing.
+
+    Returns:
+      ToolOk with planned/transferred counts and bytes, reasons and throughput.
+    """
+    # Синхронизируй /tmp/dataset в /data/dataset
+    # Сколько данных будет передано при синхронизации? (dry_run)
+    req = SyncRequest(
+        source=source,
+        destination=destination,
+        direction=direction,
+        dry_run=dry_run,
+        checksums=checksums,
+        adopt_existing=adopt_existing,
+        batch_files=batch_files or mcp_settings.mcp_transfer_batch_files,
+        parallelism=parallelism or mcp_settings.mcp_transfer_parallelism,
+        confirm=confirm,
+    )
+
+    if not req.dry_run and not req.confirm:
+        return ToolError(
+            error="sync overwrites changed files and requires confirm=true",
+            hint="Run with dry_run=true to preview, then call with confirm=true"
+        ).model_dump()
+
+    t0 = time.perf_counter()
+    if req.direction == "to_hdfs":
+        src, dst = SyncSide("local", req.source), SyncSide("hdfs", req.destination)
+    else:
+        src, dst = SyncSide("hdfs", req.source), SyncSide("local", req.destination)
+
+    # Both listings fan their stat chunks out on the shared pool, so they run outside it.
+    listed = run_sides([src, dst], lambda side: side.list_files(missing_ok=(side is dst)))
+    (s_code, src_files, s_err, s_cmd), (d_code, dst_files, d_err, d_cmd) = listed
+    if s_code != 0 or d_code != 0:
+        code, err, docker_cmd = (s_code, s_err, s_cmd) if s_code != 0 else (d_code, d_err, d_cmd)
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="sync",
+            risk=tool_risk("sync"),
+            args=req.model_dump(),
+            docker_cmd=docker_cmd,
+            ok=False,
+            exit_code=code,
+            stderr=err,
+        ))
+        return ToolError(error=(err.strip() or "cannot list sync source/destination")).model_dump()
+
+    cache = SyncCache(src, dst)
+    cache.load()
+    plan = classify_sync(src_files, dst_files, cache, req.adopt_existing)
+
+    src_sums: dict = {}
+    dst_sums: dict = {}
+    if req.checksums:
+        if plan.verify_src:
+            src_sums.update(src.checksums(plan.verify_src))
+        if plan.verify_dst:
+            dst_sums.update(dst.checksums(plan.verify_dst))
+        resolve_verified(plan, cache, src_sums, dst_sums)
+    else:
+        for rel in set(plan.verify_src) | set(plan.verify_dst):
+            plan.transfer[rel] = "mtime_changed"
+
+    reasons: dict = {}
+    for reason in plan.transfer.values():
+        reasons[reason] = reasons.get(reason, 0) + 1
+    planned = {
+        "source": req.source,
+        "destination": req.destination,
+        "direction": req.direction,
+        "files_source": len(src_files),
+        "files_unchanged": len(plan.unchanged),
+        "files_planned": len(plan.transfer),
+        "bytes_planned": sum(src_files[r].size for r in plan.transfer),
+        "reasons": reasons,
+        "checksummed": len(set(plan.verify_src) | set(plan.verify_dst)),
+    }
+
+    if req.dry_run:
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="sync",
+            risk=tool_risk("sync"),
+            args=req.model_dump(),
+            docker_cmd=[],
+            ok=True,
+            stdout=json.dumps(planned),
+        ))
+        sample = sorted(plan.transfer.items())[:SYNC_PLAN_SAMPLE]
+        return ToolOk(data={
+            **planned,
+            "dry_run": True,
+            "sample": [{"path": r, "reason": why, "size": src_files[r].size} for r, why in sample],
+        }).model_dump()
+
+    batches = plan_batches([src_files[r] for r in plan.transfer], dst.root, req.batch_files)
+    _, dir_errors = mkdir_many([b.dest_dir for b in batches], dst.mkdir_cmd)
+
+    def transfer(batch: TransferBatch) -> BatchResult:
+        sources = [src.abs_path(f.rel_path) for f in batch.files]
+        args = src.copy_to_cmd(sources, batch.dest_dir)
+
+        bt0 = time.perf_counter()
+        try:
+            code, out, err, docker_cmd = run_docker_exec(args, timeout=mcp_settings.mcp_transfer_timeout_sec)
+        except RuntimeError as e:
+            code, out, err, docker_cmd = -1, "", str(e), docker_exec_prefix() + args
+        ok = (code == 0)
+        elapsed = time.perf_counter() - bt0
+
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="sync",
+            risk=tool_risk("sync"),
+            args={
+                "source": req.source,
+                "destination": req.destination,
+                "direction": req.direction,
+                "batch": batch.index,
+                "dest_dir": batch.dest_dir,
+                "files": len(batch.files),
+                "bytes": batch.bytes,
+                "elapsed_sec": round(elapsed, 3),
+            },
+            docker_cmd=summarize_cmd(docker_cmd),
+            ok=ok,
+            exit_code=code,
+            stdout=out,
+            stderr=err,
+        ))
+
+        return BatchResult(
+            index=batch.index,
+            ok=ok,
+            files=len(batch.files),
+            bytes=batch.bytes,
+            exit_code=code,
+            error=None if ok else (err.strip()[-500:] or "transfer failed"),
+            elapsed_sec=round(elapsed, 3),
+        )
+
+    results = run_batches(batches, transfer, req.parallelism) if not dir_errors else []
+    failed = [r for r in results if not r.ok]
+    done_rels = {f.rel_path for b, r in zip(batches, results) if r.ok for f in b.files}
+
+    if req.checksums and (done_rels or plan.adopted):
+        # One checksum pass over everything copied or adopted, both sides at once.
+        rels = sorted(done_rels | plan.adopted)
+        sums = run_batches([src, dst], lambda side: side.checksums(rels), 2)
+        src_sums.update(sums[0])
+        dst_sums.update(sums[1])
+
+    # Re-read destination stats once so the next run can skip by size/mtime.
+    d_code, new_dst_files, _, _ = dst.list_files(missing_ok=True)
+    if d_code == 0:
+        for rel in plan.unchanged | done_rels:
+            d = new_dst_files.get(rel)
+            if d is None:
+                continue
+            entry = cache.entries.get(rel) or {}
+            cache.record(
+                rel, src_files[rel], d,
+                src_sums.get(rel, entry.get("src_sum") if rel not in done_rels else None),
+                dst_sums.get(rel, entry.get("dst_sum") if rel not in done_rels else None),
+            )
+        for rel in [r for r in cache.entries if r not in src_files]:
+            del cache.entries[rel]
+        cache.save()
+
+    files_done = sum(r.files for r in results if r.ok)
+    bytes_done = sum(r.bytes for r in results if r.ok)
+    summary = {
+        **planned,
+        "files_transferred": files_done,
+        "bytes_transferred": bytes_done,
+        "batches": len(batches),
+        **throughput(files_done, bytes_done, time.perf_counter() - t0),
+        "failed_batches": [
+            {"batch": r.index, "files": r.files, "exit_code": r.exit_code, "error": r.error} for r in failed
+        ],
+    }
+
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="sync",
+        risk=tool_risk("sync"),
+        args={**req.model_dump(), "summary": True},
+        docker_cmd=[],
+        ok=not dir_errors and not failed,
+        stdout=json.dumps({k: v for k, v in summary.items() if k != "failed_batches"}),
+        stderr="\n".join(dir_errors),
+    ))
+
+    if dir_errors:
+        return ToolError(error="bulk mkdir failed: " + dir_errors[0][-500:]).model_dump()
+    if failed:
+        return ToolError(
+            error=f"{len(failed)} of {len(batches)} batches failed: {failed[0].error}",
+            hint="Completed files are cached; calling sync again transfers only the rest",
+        ).model_dump()
+
+    return ToolOk(data=summary).model_dump()
+
+
+@mcp.tool()
+def get(hdfs_path: str,
+        local_path: str,
+        overwrite: bool = False,
+        confirm: bool = False,
+        cluster: str | None = None) -> ToolOk | ToolError:
     """
     Download a file from HDFS into the namenode container local filesystem.
 
@@ -270,6 +1012,7 @@ def get(hdfs_path: str, local_path: str, overwrite: bool = False, confirm: bool
       local_path: Destination path inside namenode container (e.g. /tmp/file.csv).
       overwrite: If True, overwrite local destination (requires confirm=True).
       confirm: Explicit confirmation required when overwrite=True.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: SAFE for HDFS (read-only), but can be destructive locally when overwrite=True.
     Idempotency: Yes when overwrite=False and file exists -> fails, state unchanged.
@@ -312,7 +1055,11 @@ def get(hdfs_path: str, local_path: str, overwrite: bool = False, confirm: bool
 
 
 @mcp.tool()
-def chmod(path: str, mode: str, recursive: bool = False, confirm: bool = False) -> ToolOk | ToolError:
+def chmod(path: str,
+          mode: str,
+          recursive: bool = False,
+          confirm: bool = False,
+          cluster: str | None = None) -> ToolOk | ToolError:
     """
     Change permissions for a path in HDFS.
 
@@ -321,6 +1068,7 @@ def chmod(path: str, mode: str, recursive: bool = False, confirm: bool = False)
       mode: Permission mode (e.g. 755, 777).
       recursive: Apply recursively (-R).
       confirm: Must be True (risky operation).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY (permission change).
     Idempotency: Repeating the same chmod results in no further changes.
@@ -380,7 +1128,8 @@ def chown(path: str,
           owner: str, 
           group: str | None = None, 
           recursive: bool = False, 
-          confirm: bool = False) -> ToolOk | ToolError:
+          confirm: bool = False,
+          cluster: str | None = None) -> ToolOk | ToolError:
     """
     Change owner/group for a path in HDFS.
 
@@ -390,6 +1139,7 @@ def chown(path: str,
       group: Optional new group.
       recursive: Apply recursively (-R).
       confirm: Must be True (risky operation).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY (ownership change).
     Idempotency: Repeating the same chown results in no further changes.
@@ -446,49 +1196,372 @@ def chown(path: str,
 
 
 @mcp.tool()
-def getquota(path: str) -> ToolOk | ToolError:
+def getquota(path: str | None = None,
+             paths: List[str] | None = None,
+             sort_by: str | None = None,
+             top_k: int | None = None,
+             cluster: str | None = None) -> ToolOk | ToolError:
     """
-    Get quota and usage information for an HDFS path.
+    Get quota and usage information for one or many HDFS paths.
+
+    One `hdfs dfs -count -q` runs per chunk of paths (not per path) and each
+    output line is parsed into typed fields.
 
     Args:
-      path: HDFS path.
+      path: Single HDFS path (kept for compatibility).
+      paths: Many HDFS paths checked in one call.
+      sort_by: "utilization" to sort by utilization_pct, highest first.
+      top_k: Return only the first K items (after sorting).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER); "*" queries every cluster in parallel.
 
     Safety: SAFE (read-only).
     Idempotency: Yes.
 
     Returns:
-      ToolOk with quota and usage data.
+      ToolOk with items[] (quota, remaining, space quota, remaining space,
+      dir/file count, content size, utilization %) and per-path errors.
     """
     # Покажи квоты и использование для /data
     # Какая квота на /data/raw?
-    args = ["hdfs", "dfs", "-count", "-q", path]
-    code, out, err, docker_cmd = run_docker_exec(args)
-    ok = (code == 0)
+    # Какие квоты почти заполнены? (sort_by=utilization)
+    all_paths = ([path] if path else []) + (paths or [])
+    if not all_paths:
+        return ToolError(error="Provide path or paths").model_dump()
+    req = GetQuotaRequest(paths=all_paths, sort_by=sort_by, top_k=top_k)
+
+    chunks = [req.paths[i:i + QUOTA_PATHS_PER_CALL] for i in range(0, len(req.paths), QUOTA_PATHS_PER_CALL)]
+
+    def count_q(chunk):
+        args = build_hdfs_dfs_cmd("count", ["-q", *chunk])
+        code, out, err, docker_cmd = run_docker_exec(args)
+        parsed = parse_hdfs_count_q(out)
+
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="getquota",
+            risk=tool_risk("getquota"),
+            args={**req.model_dump(), "paths": chunk},
+            docker_cmd=summarize_cmd(docker_cmd),
+            ok=(code == 0),
+            exit_code=code,
+            stdout=out,
+            stderr=err,
+        ))
+        return code, parsed, err
+
+    results = run_batches(chunks, count_q, mcp_settings.mcp_transfer_parallelism)
+
+    items = [QuotaInfo(**x) for _, parsed, _ in results for x in parsed]
+    errors = [
+        ln.strip() for code, _, err in results if code != 0
+        for ln in err.splitlines() if ln.strip() and " WARN " not in ln and " INFO " not in ln
+    ]
+    if not items:
+        return ToolError(error=(errors[0] if errors else "hdfs dfs -count -q failed")).model_dump()
+
+    if req.sort_by == "utilization":
+        items.sort(key=lambda q: q.utilization_pct if q.utilization_pct is not None else -1.0, reverse=True)
+    total = len(items)
+    if req.top_k:
+        items = items[:req.top_k]
+
+    data = GetQuotaResponseData(items=items, errors=errors, total=total)
+    return ToolOk(data=data.model_dump()).model_dump()
+
+
+def _norm_path(p: str) -> str:
+    return p.rstrip("/") or "/"
+
+
+@mcp.tool()
+def usage(path: str | None = None,
+          paths: List[str] | None = None,
+          breakdown: bool = False,
+          top_k: int | None = None,
+          cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Size and file counts for one or many HDFS paths, without listing them.
+
+    Runs `hdfs dfs -du -s` and `hdfs dfs -count` once per chunk of paths (in
+    parallel), plus one `hdfs dfs -du` per chunk for the breakdown. Use this
+    for "how big is X" / "how many files are in X" instead of paging `list`.
+
+    Args:
+      path: Single HDFS path.
+      paths: Many HDFS paths checked in one call.
+      breakdown: Also return direct children by size, largest first.
+      top_k: Children per path with breakdown (default 20).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER); "*" queries every cluster in parallel.
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with items[] (bytes, bytes_with_replication, dir_count,
+      file_count, and with breakdown children[] + children_total) and
+      per-path errors.
+    """
+    # Сколько места занимает /data?
+    # Сколько файлов в /bench/many?
+    # Какие подпапки /data самые большие? (breakdown=true, top_k=5)
+    all_paths = ([path] if path else []) + (paths or [])
+    if not all_paths:
+        return ToolError(error="Provide path or paths").model_dump()
+    req = UsageRequest(paths=all_paths, breakdown=breakdown, top_k=top_k)
+
+    chunks = [req.paths[i:i + USAGE_PATHS_PER_CALL] for i in range(0, len(req.paths), USAGE_PATHS_PER_CALL)]
+    tasks = [("du", ["-s", *c]) for c in chunks] + [("count", c) for c in chunks]
+    if req.breakdown:
+        tasks += [("du", c) for c in chunks]
+
+    def run_one(task):
+        sub, args = task
+        code, out, err, docker_cmd = run_docker_exec(build_hdfs_dfs_cmd(sub, args))
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="usage",
+            risk=tool_risk("usage"),
+            args={**req.model_dump(), "paths": [a for a in args if a != "-s"], "command": f"{sub} {args[0]}"},
+            docker_cmd=summarize_cmd(docker_cmd),
+            ok=(code == 0),
+            exit_code=code,
+            stdout=out,
+            stderr=err,
+        ))
+        return task, code, out, err
+
+    results = run_batches(tasks, run_one, mcp_settings.mcp_transfer_parallelism)
+
+    items = {_norm_path(p): UsageInfo(path=p) for p in req.paths}
+    children: dict = {}
+    for (sub, args), code, out, _ in results:
+        if sub == "count":
+            for x in parse_hdfs_count_lines(out):
+                info = items.get(_norm_path(x["path"]))
+                if info is not None:
+                    info.dir_count, info.file_count = x["dir_count"], x["file_count"]
+                    info.bytes = info.bytes if info.bytes is not None else x["content_size"]
+        elif args[0] == "-s":
+            for x in parse_hdfs_du(out):
+                info = items.get(_norm_path(x["path"]))
+                if info is not None:
+                    info.bytes, info.bytes_with_replication = x["bytes"], x["bytes_with_replication"]
+        else:
+            for x in parse_hdfs_du(out):
+                parent = posixpath.dirname(_norm_path(x["path"]))
+                children.setdefault(parent, []).append(UsageChild(**x))
+
+    errors = [
+        ln.strip() for _, code, _, err in results if code != 0
+        for ln in err.splitlines() if ln.strip() and " WARN " not in ln and " INFO " not in ln
+    ]
+    found = [i for i in items.values() if i.bytes is not None or i.file_count is not None]
+    if not found:
+        return ToolError(error=(errors[0] if errors else "hdfs dfs -du/-count failed")).model_dump()
+
+    if req.breakdown:
+        k = req.top_k or USAGE_TOP_K_DEFAULT
+        for key, info in items.items():
+            kids = sorted(children.get(key, []), key=lambda c: c.bytes, reverse=True)
+            info.children, info.children_total = kids[:k], len(kids)
+
+    data = UsageResponseData(items=found, errors=[*dict.fromkeys(errors)], total=len(found))
+    return ToolOk(data=data.model_dump()).model_dump()
+
+
+@mcp.tool()
+async def fsck_report(path: str = "/",
+                      detail: str = "blocks",
+                      top_k: int | None = None,
+                      depth: int = 1,
+                      time_budget_sec: float | None = None,
+                      cluster: str | None = None,
+                      ctx: Context | None = None) -> ToolOk | ToolError:
+    """
+    Block health of an HDFS subtree from `hdfs fsck`, as a bounded summary.
+
+    fsck output is streamed and folded line by line into counts of
+    under-replicated, missing and corrupt blocks, the worst files, the
+    replication distribution and per-directory totals; raw output is never
+    kept, so the report has the same size for any namespace. Progress
+    notifications are sent while it runs. When the time budget runs out
+    the fsck is stopped and the report so far is returned with partial=true.
+
+    Args:
+      path: HDFS path to check (default "/"); narrow it on large clusters.
+      detail: "blocks" (-files -blocks: everything, incl. live replica counts),
+              "files" (-files: no per-block lines) or "summary" (problem
+              lines and fsck totals only; cheapest).
+      top_k: Files and directories shown (default 20).
+      depth: Directory levels below path that hot spots are grouped by.
+      time_budget_sec: Stop after this long (default MCP_FSCK_TIME_BUDGET_SEC).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
 
+    Returns:
+      ToolOk with status, block problem counts, top_paths[], hot_dirs[],
+      replication {target, live} histograms and fsck's own summary totals.
+    """
+    # Есть ли битые или недореплицированные блоки в /data?
+    # Какие каталоги /data больше всего пострадали? (depth=2)
+    req = FsckRequest(path=path, detail=detail, top_k=top_k, depth=depth, time_budget_sec=time_budget_sec)
+    budget = req.time_budget_sec or mcp_settings.mcp_fsck_time_budget_sec
+    agg = FsckAggregator(req.path, req.top_k or FSCK_TOP_K_DEFAULT, req.depth)
+    recent: deque = deque(maxlen=2)  # last output lines, for the error message if fsck fails
+    report = ProgressReporter(ctx, asyncio.get_running_loop())
+
+    def run() -> DockerStream:
+        with DockerStream(fsck_cmd(req.path, req.detail), timeout=budget) as st:
+            for ln in st.lines():
+                agg.feed(ln)
+                if ln.strip():
+                    recent.append(ln.strip())
+                if agg.lines % PROGRESS_EVERY_ITEMS == 0:
+                    report(agg.files, None, f"{agg.files} files, {agg.blocks} blocks, "
+                                            f"{agg.affected_files} with problems")
+        agg.finish()
+        return st
+
+    t0 = time.perf_counter()
+    try:
+        st = await asyncio.to_thread(run)
+    except RuntimeError as e:
+        return ToolError(error=str(e)).model_dump()
+    elapsed = round(time.perf_counter() - t0, 3)
+
+    # fsck exits non-zero for a CORRUPT namespace: a parsed status is success
+    ok = st.timed_out or (agg.status is not None and not agg.failed)
+    snap = agg.snapshot()
     write_audit(AuditRecord(
         ts=now_iso(),
-        tool="getquota",
-        risk=tool_risk("getquota"),
-        args={"path": path},
-        docker_cmd=docker_cmd,
+        tool="fsck_report",
+        risk=tool_risk("fsck_report"),
+        args=req.model_dump(),
+        docker_cmd=st.docker_cmd,
         ok=ok,
-        exit_code=code,
-        stdout=out,
-        stderr=err,
+        exit_code=st.exit_code if st.exit_code is not None else -1,
+        stdout=json.dumps({
+            k: snap[k] for k in ("status", "lines", "files", "blocks", "under_replicated_blocks",
+                                 "missing_blocks", "corrupt_blocks", "affected_files")
+        } | {"partial": st.timed_out}),
+        stderr=st.stderr,
     ))
 
+    if st.timed_out and not agg.lines:
+        return ToolError(error=f"fsck produced no output within {budget:g}s",
+                         hint="Narrow path or raise time_budget_sec").model_dump()
     if not ok:
-        return ToolError(error=(err.strip() or "hdfs dfs -count -q failed")).model_dump()
+        error = st.stderr.strip()[-500:] or " / ".join(recent) or "hdfs fsck failed"
+        return ToolError(error=error).model_dump()
+
+    report(agg.files, None, f"done: {agg.files} files, {agg.affected_files} with problems", force=True)
+    data = FsckReportData(
+        path=req.path,
+        partial=st.timed_out,
+        stop_reason="time_budget" if st.timed_out else None,
+        elapsed_sec=elapsed,
+        **snap,
+    )
+    return ToolOk(data=data.model_dump()).model_dump()
+
+
+_REPORT_SORT = {
+    "used_pct": (lambda n: n["used_pct"], True),
+    "remaining": (lambda n: n["remaining"], False),
+    "name": (lambda n: n["name"], False),
+    "last_contact": (lambda n: n["last_contact_age_sec"] or 0.0, True),
+}
+
+
+@mcp.tool()
+def cluster_report(sort_by: str = "used_pct",
+                   top_k: int | None = None,
+                   state: str | None = None,
+                   threshold: float | None = None,
+                   refresh: bool = False,
+                   cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    DataNode capacity and health from `hdfs dfsadmin -report`.
+
+    One typed record per datanode (capacity, used, remaining, usage %, last
+    contact, decommission state) plus cluster totals and the usage spread
+    across in-service nodes, with the nodes the balancer would move data
+    off or onto at `threshold`. The report is cached per cluster for
+    MCP_CLUSTER_REPORT_TTL_SEC; a somewhat older one is returned at once
+    (stale=true) while a background refresh runs, so repeated questions do
+    not each start a JVM.
+
+    Args:
+      sort_by: used_pct (fullest first), remaining (least free first),
+               name, or last_contact (longest silent first).
+      top_k: Return only the first top_k datanodes (summary covers all).
+      state: Only datanodes listed under this section: live, dead,
+             decommissioning, ...
+      threshold: Imbalance threshold in points of DFS used % (default 10,
+                 like `hdfs balancer -threshold`).
+      refresh: Bypass the cache and run the report now.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER); "*" for all.
 
-    lines = [ln.strip() for ln in out.splitlines() if ln.strip()]
-    return ToolOk(data={"path": path, "raw": out, "line": (lines[-1] if lines else "")}).model_dump()
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with summary (totals, usage spread, over/under-utilized nodes,
+      balancer_recommended), datanodes[], fetched_at, age_sec, cached and stale.
+    """
+    # Какие датаноды заполнены сильнее всего?
+    # Нужно ли запускать балансировщик?
+    req = ClusterReportRequest(sort_by=sort_by, top_k=top_k, state=state, threshold=threshold, refresh=refresh)
+    try:
+        entry, source = capacity_reports.get(force=req.refresh)
+    except RuntimeError as e:
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="cluster_report",
+            risk=tool_risk("cluster_report"),
+            args=req.model_dump(),
+            ok=False,
+            stderr=str(e),
+        ))
+        return ToolError(error=str(e), hint="`dfsadmin -report` needs HDFS superuser rights").model_dump()
+
+    now = time.time()
+    nodes = [datanode_record(raw, now) for raw in entry.datanodes]
+    summary = capacity_summary(entry.summary, nodes, req.threshold or CAPACITY_THRESHOLD_PCT)
+    if req.state:
+        nodes = [n for n in nodes if n["state"] == req.state]
+    key, reverse = _REPORT_SORT[req.sort_by]
+    nodes.sort(key=key, reverse=reverse)
+
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="cluster_report",
+        risk=tool_risk("cluster_report"),
+        args=req.model_dump(),
+        docker_cmd=entry.docker_cmd if source == "fetched" else None,
+        ok=True,
+        stdout=json.dumps({"source": source, "datanodes": len(nodes), "age_sec": round(now - entry.fetched_at, 1)}),
+    ))
+    data = ClusterReportData(
+        summary=CapacitySummary(**summary),
+        datanodes=[DataNodeInfo(**n) for n in nodes[:req.top_k]],
+        total=len(nodes),
+        fetched_at=iso_ms(entry.fetched_at),
+        age_sec=round(now - entry.fetched_at, 1),
+        cached=source != "fetched",
+        stale=source == "stale",
+    )
+    return ToolOk(data=data.model_dump()).model_dump()
 
 
 @mcp.tool()
 def setquota(path: str, 
              namespace_quota: int | None = None, 
              space_quota: str | None = None, 
-             confirm: bool = False) -> ToolOk | ToolError:
+             confirm: bool = False,
+             cluster: str | None = None) -> ToolOk | ToolError:
     """
     Set quota limits for an HDFS path.
 
@@ -497,6 +1570,7 @@ def setquota(path: str,
       namespace_quota: Max number of files/directories (optional).
       space_quota: Space quota value (optional).
       confirm: Must be True to apply changes.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY (can block writes). Requires explicit confirmation.
     Idempotency: Reapplying the same quota is idempotent.
@@ -552,7 +1626,10 @@ def setquota(path: str,
 
 
 @mcp.tool()
-def snapshot_create(path: str, name: str | None = None, confirm: bool = False) -> ToolOk | ToolError:
+def snapshot_create(path: str,
+                    name: str | None = None,
+                    confirm: bool = False,
+                    cluster: str | None = None) -> ToolOk | ToolError:
     """
     Create a snapshot for an HDFS directory.
 
@@ -560,6 +1637,7 @@ def snapshot_create(path: str, name: str | None = None, confirm: bool = False) -
       path: HDFS directory path.
       name: Snapshot name (optional).
       confirm: Must be True to create snapshot.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: RISKY (creates snapshot metadata). Requires confirmation.
     Idempotency: Creating the same snapshot twice will fail.
@@ -595,7 +1673,7 @@ def snapshot_create(path: str, name: str | None = None, confirm: bool = False) -
 
 
 @mcp.tool()
-def snapshot_delete(path: str, name: str, confirm: bool = False) -> ToolOk | ToolError:
+def snapshot_delete(path: str, name: str, confirm: bool = False, cluster: str | None = None) -> ToolOk | ToolError:
     """
     Delete an existing snapshot for an HDFS directory.
 
@@ -603,6 +1681,7 @@ def snapshot_delete(path: str, name: str, confirm: bool = False) -> ToolOk | Too
       path: HDFS directory path.
       name: Snapshot name.
       confirm: Must be True to delete snapshot.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
 
     Safety: DESTRUCTIVE. Requires explicit confirmation.
     Idempotency: No (deletes state).
@@ -637,32 +1716,36 @@ def snapshot_delete(path: str, name: str, confirm: bool = False) -> ToolOk | Too
 
 
 @mcp.tool()
-def balancer_trigger(confirm: bool = False) -> ToolOk | ToolError:
+def snapshot_list(path: str | None = None, cluster: str | None = None) -> ToolOk | ToolError:
     """
-    Trigger the HDFS balancer process.
+    List snapshottable directories, or the snapshots of one directory.
 
     Args:
-      confirm: Must be True to start balancing.
+      path: If omitted, list snapshottable directories (`hdfs lsSnapshottableDir`).
+            If set, list snapshots under <path>/.snapshot.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER); "*" queries every cluster in parallel.
 
-    Safety: RISKY / HEAVY operation. Requires confirmation.
-    Idempotency: Re-running may have no effect if balancer is already active.
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
 
     Returns:
-      ToolOk with balancer output.
+      ToolOk with dirs[] (path, snapshot_count, snapshot_quota, ...) or
+      snapshots[] (name, date, time).
     """
-    # Запусти балансировщик
-    if not confirm:
-        return ToolError(error="balancer_trigger requires confirm=true").model_dump()
-
-    cmd = ["hdfs", "balancer"]
+    # Какие директории поддерживают snapshot?
+    # Какие snapshot есть у /data/raw?
+    if path:
+        cmd = build_hdfs_dfs_cmd("ls", [posixpath.join(path, ".snapshot")])
+    else:
+        cmd = ["hdfs", "lsSnapshottableDir"]
     code, out, err, docker_cmd = run_docker_exec(cmd)
     ok = (code == 0)
 
     write_audit(AuditRecord(
         ts=now_iso(),
-        tool="balancer_trigger",
-        risk=tool_risk("balancer_trigger"),
-        args={"confirm": confirm},
+        tool="snapshot_list",
+        risk=tool_risk("snapshot_list"),
+        args={"path": path},
         docker_cmd=docker_cmd,
         ok=ok,
         exit_code=code,
@@ -671,16 +1754,374 @@ def balancer_trigger(confirm: bool = False) -> ToolOk | ToolError:
     ))
 
     if not ok:
-        return ToolError(error=(err.strip() or "balancer trigger failed"),
-                         hint="Balancer may be unavailable/irrelevant on single-node demo").model_dump()
+        return ToolError(error=(err.strip() or "snapshot listing failed"),
+                         hint=("Is the directory snapshottable? (hdfs dfsadmin -allowSnapshot <path>)"
+                               if path else None)).model_dump()
+
+    if not path:
+        dirs = [SnapshottableDir(**x) for x in parse_snapshottable_dirs(out)]
+        return ToolOk(data={"dirs": [d.model_dump() for d in dirs]}).model_dump()
+
+    snaps = [
+        SnapshotInfo(name=posixpath.basename(x["path"]), path=x["path"], date=x["date"], time=x["time"])
+        for x in parse_hdfs_ls(out) if x["type"] == "dir"
+    ]
+    return ToolOk(data={"path": path, "snapshots": [s.model_dump() for s in snaps]}).model_dump()
+
+
+@mcp.tool()
+def snapshot_diff(path: str,
+                  from_snapshot: str,
+                  to_snapshot: str = ".",
+                  types: List[str] | None = None,
+                  path_prefix: str | None = None,
+                  limit: int = 200,
+                  offset: int = 0,
+                  with_counts: bool = True,
+                  cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Show what changed in a snapshottable directory between two snapshots.
+
+    Wraps `hdfs snapshotDiff`; output is parsed line by line and only the
+    requested page is kept in memory, so large change sets stay cheap.
+
+    Args:
+      path: Snapshottable HDFS directory.
+      from_snapshot: Older snapshot name.
+      to_snapshot: Newer snapshot name, or "." for the current state.
+      types: Filter by entry type: created, deleted, modified, renamed.
+      path_prefix: Only entries under this path (relative to `path`).
+      limit: Max entries in this page.
+      offset: Start index among matching entries.
+      with_counts: If True, scan the whole diff for per-type counts;
+                   if False, stop reading once the page is filled (faster).
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with items[], counts per type, total_matched and next_offset.
+    """
+    # Что изменилось в /data/raw между s1 и s2?
+    # Какие файлы удалены в /data/raw с момента s1?
+    req = SnapshotDiffRequest(
+        path=path,
+        from_snapshot=from_snapshot,
+        to_snapshot=to_snapshot,
+        types=types,
+        path_prefix=path_prefix,
+        limit=min(limit, MAX_LIST_LIMIT),
+        offset=offset,
+    )
+    wanted = set(req.types or SNAPSHOT_DIFF_TYPES.values())
+    prefix = (req.path_prefix or "").strip("/")
+
+    counts = {t: 0 for t in SNAPSHOT_DIFF_TYPES.values()}
+    page: List[SnapshotDiffEntry] = []
+    matched = 0
+    cmd = ["hdfs", "snapshotDiff", req.path, req.from_snapshot, req.to_snapshot]
+
+    try:
+        with DockerStream(cmd, timeout=mcp_settings.mcp_stream_timeout_sec) as st:
+            for ln in st.lines():
+                entry = parse_snapshot_diff_line(ln)
+                if entry is None:
+                    continue
+                if prefix and not (entry["path"] == prefix or entry["path"].startswith(prefix + "/")):
+                    continue
+                counts[entry["type"]] += 1
+                if entry["type"] not in wanted:
+                    continue
+                if req.offset <= matched < req.offset + req.limit:
+                    page.append(SnapshotDiffEntry(**entry))
+                matched += 1
+                if not with_counts and matched > req.offset + req.limit:
+                    break
+    except RuntimeError as e:
+        return ToolError(error=str(e)).model_dump()
+
+    ok = st.ok and not st.timed_out
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="snapshot_diff",
+        risk=tool_risk("snapshot_diff"),
+        args={**req.model_dump(), "with_counts": with_counts},
+        docker_cmd=st.docker_cmd,
+        ok=ok,
+        exit_code=st.exit_code if st.exit_code is not None else -1,
+        stdout=json.dumps({"counts": counts, "matched": matched}),
+        stderr=st.stderr,
+    ))
+
+    if st.timed_out and not page:
+        return ToolError(error="snapshotDiff timed out",
+                         hint="Narrow with path_prefix or call with with_counts=false").model_dump()
+    if not ok and not st.timed_out:
+        return ToolError(error=(st.stderr.strip()[-500:] or "snapshotDiff failed")).model_dump()
+
+    data = SnapshotDiffResponseData(
+        items=page,
+        counts=counts if with_counts else {},
+        total_matched=matched,
+        next_offset=req.offset + req.limit if matched > req.offset + req.limit else None,
+        truncated=st.timed_out or not with_counts,
+    )
+    return ToolOk(data=data.model_dump()).model_dump()
+
+
+def _balancer_progress(ln: str, progress: dict) -> None:
+    row = parse_balancer_line(ln)
+    if row:
+        progress.update(row)
+        progress["iterations"] = row["iteration"] + 1
+    elif "The cluster is balanced" in ln:
+        progress["balanced"] = True
+    elif "Balancing took" in ln:
+        progress["took"] = ln.split("Balancing took", 1)[1].strip()
+    elif "Exiting" in ln or "No block has been moved" in ln:
+        progress["exit_reason"] = ln.strip()
+
+
+def _balancer_finished(job: BackgroundJob) -> None:
+    snap = job.snapshot(tail=0)
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="balancer_trigger",
+        risk=tool_risk("balancer_trigger"),
+        args={"job_id": job.id, "finished": True},
+        docker_cmd=job.docker_cmd,
+        ok=(job.state == "succeeded"),
+        exit_code=job.exit_code if job.exit_code is not None else -1,
+        stdout=json.dumps({"state": snap["state"], "elapsed_sec": snap["elapsed_sec"], **snap["progress"]}),
+        user=job.user,
+    ))
+
 
-    return ToolOk(data={"raw": out.strip()}).model_dump()
+@mcp.tool()
+def balancer_trigger(threshold: float | None = None,
+                     bandwidth: int | None = None,
+                     include: List[str] | None = None,
+                     exclude: List[str] | None = None,
+                     confirm: bool = False,
+                     cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Start the HDFS balancer as a background job.
+
+    Returns immediately with a job_id; poll balancer_status for progress and
+    call balancer_stop to cancel. Only one balancer runs at a time: if one is
+    already running, its job_id is returned instead of starting another.
+
+    Args:
+      threshold: Allowed deviation of datanode usage from cluster average, in % (-threshold).
+      bandwidth: Max balancing bandwidth per datanode in bytes/sec (dfsadmin -setBalancerBandwidth);
+                 only set when this call starts the balancer.
+      include: Only balance these datanodes (hostnames).
+      exclude: Never balance these datanodes (hostnames).
+      confirm: Must be True to start balancing.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: RISKY / HEAVY operation. Requires confirmation.
+    Idempotency: Yes while running (returns the running job).
+
+    Returns:
+      ToolOk with job_id and state.
+    """
+    # Запусти балансировщик
+    # Запусти балансировщик с порогом 5% и полосой 100 МБ/с
+    req = BalancerRequest(threshold=threshold, bandwidth=bandwidth, include=include, exclude=exclude, confirm=confirm)
+    if not req.confirm:
+        return ToolError(error="balancer_trigger requires confirm=true").model_dump()
+
+    running = jobs.running("balancer")
+    if running is not None:
+        return ToolOk(data={**running.snapshot(tail=0), "already_running": True}).model_dump()
+
+    def set_bandwidth() -> None:
+        # Cluster-wide: only once this call has claimed the balancer slot.
+        bw_cmd = ["hdfs", "dfsadmin", "-setBalancerBandwidth", str(req.bandwidth)]
+        code, out, err, docker_cmd = run_docker_exec(bw_cmd)
+        write_audit(AuditRecord(
+            ts=now_iso(),
+            tool="balancer_trigger",
+            risk=tool_risk("balancer_trigger"),
+            args={"bandwidth": req.bandwidth},
+            docker_cmd=docker_cmd,
+            ok=(code == 0),
+            exit_code=code,
+            stdout=out,
+            stderr=err,
+        ))
+        if code != 0:
+            raise RuntimeError(err.strip() or "setBalancerBandwidth failed")
+
+    cmd = ["hdfs", "balancer"]
+    if req.threshold is not None:
+        cmd += ["-threshold", str(req.threshold)]
+    if req.include:
+        cmd += ["-include", ",".join(req.include)]
+    if req.exclude:
+        cmd += ["-exclude", ",".join(req.exclude)]
+
+    job = BackgroundJob("balancer", cmd, on_line=_balancer_progress, on_finish=_balancer_finished)
+    try:
+        running = jobs.start_unique("balancer", job,
+                                    prepare=set_bandwidth if req.bandwidth is not None else None)
+    except RuntimeError as e:
+        return ToolError(error=str(e)).model_dump()
+    except OSError as e:
+        return ToolError(error=f"cannot start balancer: {e}").model_dump()
+    if running is not None:
+        # another call started one since the check above
+        return ToolOk(data={**running.snapshot(tail=0), "already_running": True}).model_dump()
+
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="balancer_trigger",
+        risk=tool_risk("balancer_trigger"),
+        args={**req.model_dump(), "job_id": job.id},
+        docker_cmd=job.docker_cmd,
+        ok=True,
+    ))
+
+    return ToolOk(data={"job_id": job.id, "state": job.state, "cmd": cmd}).model_dump()
 
 
+@mcp.tool()
+def balancer_status(job_id: str | None = None, tail: int = 10, cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Progress of a balancer job started by balancer_trigger.
+
+    Args:
+      job_id: Job to inspect; defaults to the most recent balancer job.
+      tail: Number of last output lines to include.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+
+    Returns:
+      ToolOk with state (running/succeeded/failed/stopped), iterations,
+      bytes moved, bytes left, bytes being moved and elapsed time.
+    """
+    # Как идёт балансировка?
+    job = jobs.get(job_id) if job_id else jobs.latest("balancer")
+    if job is None or job.kind != "balancer":
+        return ToolError(error="No such balancer job",
+                         hint="Start one with balancer_trigger(confirm=true)").model_dump()
+    return ToolOk(data=job.snapshot(tail=max(0, min(tail, JOB_OUTPUT_TAIL_LINES)))).model_dump()
+
+
+@mcp.tool()
+def balancer_stop(job_id: str | None = None, confirm: bool = False, cluster: str | None = None) -> ToolOk | ToolError:
+    """
+    Stop a running balancer job.
+
+    Args:
+      job_id: Job to stop; defaults to the running balancer job.
+      confirm: Must be True.
+      cluster: Cluster from `clusters` (default MCP_DEFAULT_CLUSTER).
+
+    Safety: RISKY (interrupts data movement; already moved blocks stay moved).
+    Idempotency: Yes (stopping a finished job is a no-op).
+
+    Returns:
+      ToolOk with the final job state.
+    """
+    # Останови балансировщик
+    if not confirm:
+        return ToolError(error="balancer_stop requires confirm=true").model_dump()
+
+    job = jobs.get(job_id) if job_id else jobs.running("balancer")
+    if job is None or job.kind != "balancer":
+        return ToolError(error="No running balancer job").model_dump()
+
+    stopped = job.stop()
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="balancer_stop",
+        risk=tool_risk("balancer_stop"),
+        args={"job_id": job.id, "confirm": confirm},
+        docker_cmd=job.docker_cmd,
+        ok=True,
+        stdout=json.dumps({"stopped": stopped, "state": job.state}),
+    ))
+    return ToolOk(data={**job.snapshot(tail=0), "stopped": stopped}).model_dump()
+
+
+@mcp.tool()
+def rate_limits() -> ToolOk:
+    """
+    Admission control state: limits per cost class, admitted vs throttled
+    calls per class and per client, and tokens left in each client's bucket.
+
+    Calls with recursive=true, put_tree, sync and balancer_trigger draw from
+    the "expensive" budget; other tools from "standard". Throttled calls
+    return ToolError with retry_after_sec. This tool is never throttled.
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+    """
+    # Почему меня ограничивают?
+    return ToolOk(data=admission.snapshot()).model_dump()
+
+
+@mcp.tool()
+def clusters() -> ToolOk:
+    """
+    Configured clusters (MCP_CLUSTERS) and their health, built from the
+    outcome of recent commands: unknown, healthy, degraded (recent
+    failures) or down (calls fail fast until the next probe).
+
+    Every other tool takes `cluster` to pick one; stat, usage, getquota and
+    snapshot_list also take cluster="*" to query all of them in parallel.
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+    """
+    # Какие кластеры доступны?
+    return ToolOk(data={"default": cluster_registry.default, "clusters": cluster_registry.snapshot()}).model_dump()
+
+
+@mcp.tool()
+def locks() -> ToolOk:
+    """
+    Path locks held and waited for by running tool calls.
+
+    Mutating tools lock the paths they change (exclusive, covering the
+    subtree) and the HDFS paths they only read (shared); read-only tools
+    and the balancer take no locks. Calls on disjoint subtrees run in
+    parallel, overlapping ones wait in arrival order.
+
+    Safety: SAFE (read-only).
+    Idempotency: Yes.
+    """
+    # Почему chmod ждёт?
+    return ToolOk(data=path_locks.snapshot()).model_dump()
+
 
 def run() -> None:
+    """
+    Serve over stdio (default, one server per agent process) or, with
+    MCP_TRANSPORT=http|sse, as one long-running server shared by many agents:
+    listing cursors, background jobs and the worker pool are then shared too.
+    On shutdown, uvicorn stops accepting connections and the server drains.
+    """
     init_audit_log()
-    mcp.run()
+    try:
+        if mcp_settings.mcp_transport == "stdio":
+            mcp.run()
+        else:
+            mcp.run(
+                transport=mcp_settings.mcp_transport,
+                host=mcp_settings.mcp_host,
+                port=mcp_settings.mcp_port,
+                uvicorn_config={"timeout_graceful_shutdown": mcp_settings.mcp_drain_timeout_sec},
+            )
+    except KeyboardInterrupt:
+        pass  # uvicorn re-raises Ctrl+C after its own graceful shutdown
+    finally:
+        drain(mcp_settings.mcp_drain_timeout_sec)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import getpass
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List
+
+from fastmcp.exceptions import ToolError as MCPToolError
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+from fastmcp.tools import ToolResult
+
+from src.config import mcp_settings
+from src.mcp_hdfs.audit import AuditRecord, CallStats, call_stats, current_user, now_iso, write_audit
+from src.mcp_hdfs.clusters import clusters, use_cluster
+from src.mcp_hdfs.constants import CLUSTER_ALL, FANOUT_TOOLS
+from src.mcp_hdfs.jobs import jobs
+from src.mcp_hdfs.listing import cursors, spills
+from src.mcp_hdfs.models import ToolError
+from src.mcp_hdfs.transfer import shutdown_pool
+
+_USER_UNSAFE = re.compile(r"[^A-Za-z0-9._@+-]")
+
+
+def _local_user() -> str:
+    try:
+        return getpass.getuser()
+    except (KeyError, OSError):
+        return "unknown"
+
+
+def resolve_user() -> str:
+    """
+    Identity of the client behind the current tool call, for the audit log.
+
+    Over HTTP/SSE it comes from the MCP_USER_HEADER request header (set by the
+    agent, or by an authenticating proxy in front of the server); it is an
+    audit label, not authentication. Over stdio it is the OS user that
+    launched the server.
+    """
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        return _local_user()
+    name = request.headers.get(mcp_settings.mcp_user_header, "").strip()
+    if not name:
+        host = request.client.host if request.client else "?"
+        return f"anonymous@{host}"
+    return _USER_UNSAFE.sub("_", name)[:64]
+
+
+class InFlight:
+    """Counter of running tool calls that can be waited on at shutdown."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._cond = threading.Condition()
+
+    def enter(self) -> None:
+        with self._cond:
+            self.count += 1
+
+    def exit(self) -> None:
+        with self._cond:
+            self.count -= 1
+            if self.count == 0:
+                self._cond.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.count == 0, timeout=timeout)
+
+
+in_flight = InFlight()
+draining = threading.Event()
+
+
+class ClientIdentityMiddleware(Middleware):
+    """Tags each tool call with the caller's identity and timing stats, and tracks it for drain."""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        if draining.is_set():
+            raise MCPToolError("Server is shutting down; retry against the restarted server")
+        token = current_user.set(resolve_user())
+        stats_token = call_stats.set(CallStats())
+        in_flight.enter()
+        try:
+            return await call_next(context)
+        finally:
+            in_flight.exit()
+            call_stats.reset(stats_token)
+            current_user.reset(token)
+
+
+def _error_result(error: str, hint: str | None = None) -> ToolResult:
+    # is_error: the ToolError does not match the tool's ToolOk output schema
+    return ToolResult(structured_content=ToolError(error=error, hint=hint).model_dump(), is_error=True)
+
+
+def _is_wrapped(result: ToolResult) -> bool:
+    # tools returning a union (ToolOk | ToolError) have their output under "result"
+    return bool(((result.meta or {}).get("fastmcp") or {}).get("wrap_result"))
+
+
+def _unwrap(result: ToolResult) -> Dict[str, Any]:
+    body = result.structured_content or {}
+    return body.get("result") or {} if _is_wrapped(result) else body
+
+
+def merge_fanout(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Per-cluster results of one fan-out call, as {cluster, ok, data | error}
+    entries. When every successful answer has items[], they are moved into
+    one items[] tagged with their cluster, and the entries keep the rest.
+    """
+    ok = [r for r in results if r["ok"]]
+    merged: Dict[str, Any] = {
+        "clusters": results,
+        "failed": [r["cluster"] for r in results if not r["ok"]],
+        "partial": 0 < len(ok) < len(results),
+    }
+    if ok and all(isinstance(r["data"], dict) and "items" in r["data"] for r in ok):
+        merged["items"] = [{"cluster": r["cluster"], **it} for r in ok for it in r["data"]["items"]]
+        for r in ok:
+            r["data"] = {k: v for k, v in r["data"].items() if k != "items"}
+    return merged
+
+
+class ClusterMiddleware(Middleware):
+    """
+    Routes each tool call to the cluster named by its `cluster` argument
+    (tools only declare it; docker_exec_prefix() reads current_cluster).
+    For FANOUT_TOOLS, cluster="*" runs the call once per cluster
+    concurrently and returns the merged, cluster-tagged answers; it fails
+    only if every cluster fails. Added after ClientIdentityMiddleware and
+    AdmissionMiddleware, so a fan-out is one call for the rate limit.
+    """
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: Any) -> Any:
+        tool, args = context.message.name, context.message.arguments or {}
+        name = args.get("cluster")
+        if name == CLUSTER_ALL:
+            if tool not in FANOUT_TOOLS:
+                return _error_result(f'{tool} does not accept cluster="{CLUSTER_ALL}"',
+                                     hint=f"Fan-out works with: {', '.join(sorted(FANOUT_TOOLS))}")
+            return await self._fanout(context, call_next, args)
+        try:
+            name = clusters.resolve(name)
+        except ValueError as e:
+            return _error_result(str(e), hint="Call `clusters` for the configured names")
+        with use_cluster(name):
+            try:
+                clusters.check_available()
+            except RuntimeError as e:
+                return _error_result(str(e), hint="Try another cluster, or check `clusters` for its health")
+            return await call_next(context)
+
+    async def _fanout(self, context: MiddlewareContext, call_next: Any, args: Dict[str, Any]) -> ToolResult:
+        async def one(name: str) -> Dict[str, Any]:
+            message = context.message.model_copy(update={"arguments": {**args, "cluster": name}})
+            call_stats.set(CallStats())  # one call per cluster in the audit log and its timing
+            try:
+                with use_cluster(name):
+                    clusters.check_available()
+                    result = await call_next(context.copy(message=message))
+                body = _unwrap(result)
+                wrapped.append(_is_wrapped(result))
+            except Exception as e:  # one cluster failing must not sink the others
+                body = {"ok": False, "error": str(e)}
+            if body.get("ok"):
+                return {"cluster": name, "ok": True, "data": body.get("data")}
+            return {"cluster": name, "ok": False, "error": body.get("error") or "unknown error"}
+
+        wrapped: List[bool] = []
+        # each task runs in its own copy of the context, so use_cluster does not leak
+        results = await asyncio.gather(*(one(n) for n in clusters.names()))
+        merged = merge_fanout(results)
+        if not any(r["ok"] for r in results):
+            errors = "; ".join(f"{r['cluster']}: {r['error']}" for r in results)
+            return _error_result(f"All clusters failed: {errors}")
+        body = {"ok": True, "data": merged}
+        if any(wrapped):  # keep the shape of the tool's output schema
+            return ToolResult(content=json.dumps(body), structured_content={"result": body},
+                              meta={"fastmcp": {"wrap_result": True}})
+        return ToolResult(structured_content=body)
+
+
+def drain(timeout: float) -> Dict[str, Any]:
+    """
+    Graceful shutdown: refuse new tool calls, wait up to `timeout` for running
+    ones, then stop background jobs (they cannot be tracked after exit) and
+    close parked listing streams, spilled listings and the shared worker pool.
+    """
+    draining.set()
+    t0 = time.perf_counter()
+    idle = in_flight.wait_idle(timeout)
+    stopped = [j.id for j in jobs.all() if j.running and j.stop()]
+    closed = cursors.close_all()
+    spilled = spills.close_all()
+    shutdown_pool()
+    summary = {
+        "idle": idle,
+        "in_flight": in_flight.count,
+        "waited_sec": round(time.perf_counter() - t0, 3),
+        "jobs_stopped": stopped,
+        "cursors_closed": closed,
+        "spills_deleted": spilled,
+    }
+    write_audit(AuditRecord(
+        ts=now_iso(),
+        tool="server_shutdown",
+        args={"transport": mcp_settings.mcp_transport},
+        ok=idle,
+        user="server",
+        stdout=json.dumps(summary),
+    ))
+    return summary
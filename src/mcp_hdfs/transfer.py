@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+import calendar
+import contextvars
+import hashlib
+import json
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Literal, Optional, Set, Tuple, TypeVar
+
+from src.config import mcp_settings
+from src.mcp_hdfs.audit import record_exec
+from src.mcp_hdfs.clusters import clusters
+from src.mcp_hdfs.constants import CHECKSUM_BATCH_FILES, MAX_BATCH_ARGV_CHARS, MKDIR_BATCH_DIRS, STAT_BATCH_FILES
+from src.mcp_hdfs.hdfs_exec import build_hdfs_dfs_cmd, run_docker_exec
+from src.mcp_hdfs.parsers import parse_find_printf, parse_hdfs_checksum, parse_hdfs_ls, parse_md5sum
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class TransferFile:
+    rel_path: str
+    size: int
+    mtime: float = 0.0
+
+
+@dataclass
+class TransferBatch:
+    index: int
+    dest_dir: str
+    files: List[TransferFile] = field(default_factory=list)
+
+    @property
+    def bytes(self) -> int:
+        return sum(f.size for f in self.files)
+
+
+@dataclass
+class BatchResult:
+    index: int
+    ok: bool
+    files: int
+    bytes: int
+    exit_code: int = 0
+    error: Optional[str] = None
+    elapsed_sec: float = 0.0
+
+
+def list_local_tree(local_dir: str) -> Tuple[int, List[TransferFile], str, List[str]]:
+    """
+    Enumerate regular files under `local_dir` (inside the namenode container)
+    with a single `find` call instead of one exec per file.
+    """
+    cmd = ["find", local_dir, "-type", "f", "-printf", "%s\\t%T@\\t%P\\n"]
+    code, out, err, docker_cmd = run_docker_exec(cmd)
+    files = [TransferFile(**x) for x in parse_find_printf(out)] if code == 0 else []
+    return code, files, err, docker_cmd
+
+
+def plan_batches(files: List[TransferFile], dest_root: str, batch_files: int) -> List[TransferBatch]:
+    """
+    Group files by destination directory and split each group into batches
+    that fit into one multi-source `-put`/`-get` invocation.
+    """
+    by_dir: Dict[str, List[TransferFile]] = {}
+    for f in sorted(files, key=lambda x: x.rel_path):
+        rel_dir = posixpath.dirname(f.rel_path)
+        dest_dir = posixpath.normpath(posixpath.join(dest_root, rel_dir)) if rel_dir else dest_root
+        by_dir.setdefault(dest_dir, []).append(f)
+
+    batches: List[TransferBatch] = []
+    for dest_dir, group in by_dir.items():
+        cur = TransferBatch(index=len(batches), dest_dir=dest_dir)
+        chars = 0
+        for f in group:
+            if cur.files and (len(cur.files) >= batch_files or chars + len(f.rel_path) > MAX_BATCH_ARGV_CHARS):
+                batches.append(cur)
+                cur = TransferBatch(index=len(batches), dest_dir=dest_dir)
+                chars = 0
+            cur.files.append(f)
+            chars += len(f.rel_path) + 1
+        if cur.files:
+            batches.append(cur)
+    return batches
+
+
+def mkdir_many(dirs: List[str], build_cmd: Callable[[List[str]], List[str]]) -> Tuple[int, List[str]]:
+    """
+    Create destination directories in bulk (many paths per `mkdir -p`).
+    Returns (number of directories requested, error messages).
+    """
+    unique = sorted(set(dirs))
+    errors: List[str] = []
+    for i in range(0, len(unique), MKDIR_BATCH_DIRS):
+        chunk = unique[i:i + MKDIR_BATCH_DIRS]
+        try:
+            code, _, err, _ = run_docker_exec(build_cmd(chunk))
+        except RuntimeError as e:
+            code, err = -1, str(e)
+        if code != 0:
+            errors.append(err.strip() or f"mkdir failed for {len(chunk)} directories")
+    return len(unique), errors
+
+
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_pool_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _mark_worker() -> None:
+    _worker.active = True
+
+
+def shared_pool(cluster: Optional[str] = None) -> ThreadPoolExecutor:
+    """
+    Process-wide pool for docker exec fan-out to the current cluster. When
+    the server is shared over HTTP, all clients draw from it, so
+    MCP_WORKER_THREADS caps the concurrent exec load on each namenode no
+    matter how many operators are connected; a slow cluster does not take
+    workers from the others.
+    """
+    name = cluster or clusters.current()
+    with _pool_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = ThreadPoolExecutor(
+                max_workers=mcp_settings.mcp_worker_threads,
+                thread_name_prefix=f"hdfs-{name}",
+                initializer=_mark_worker,
+            )
+        return pool
+
+
+def shutdown_pool() -> None:
+    with _pool_lock:
+        pools = [_pools.pop(name) for name in [*_pools]]
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batches(batches: List[T], run_one: Callable[[T], R], parallelism: int) -> List[R]:
+    """Run batches on the shared pool, at most `parallelism` at a time; results keep batch order."""
+    if not batches:
+        return []
+    if parallelism <= 1 or len(batches) == 1 or getattr(_worker, "active", False):
+        # Called from a pool worker: run inline, waiting on the pool could deadlock it.
+        return [run_one(b) for b in batches]
+
+    gate = threading.Semaphore(parallelism)
+
+    def one(batch: T, submitted: float) -> R:
+        record_exec(queue_ms=(time.perf_counter() - submitted) * 1000)
+        try:
+            return run_one(batch)
+        finally:
+            gate.release()
+
+    pool = shared_pool()
+    futures = []
+    for batch in batches:
+        gate.acquire()
+        # Each worker runs in a copy of the caller's context so exec stats
+        # and the client identity follow the batch.
+        ctx = contextvars.copy_context()
+        futures.append(pool.submit(ctx.run, one, batch, time.perf_counter()))
+    return [f.result() for f in futures]
+
+
+def run_sides(sides: List[T], run_one: Callable[[T], R]) -> List[R]:
+    """
+    Run each side of a sync in its own plain thread, not on the shared pool:
+    work a side fans out with run_batches then still reaches the pool instead
+    of running inline as it would on a pool worker.
+    """
+    results: List[Optional[R]] = [None] * len(sides)
+    errors: List[BaseException] = []
+
+    def one(i: int) -> None:
+        try:
+            results[i] = run_one(sides[i])
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=contextvars.copy_context().run, args=(one, i), daemon=True)
+        for i in range(1, len(sides))
+    ]
+    for t in threads:
+        t.start()
+    if sides:
+        one(0)  # the first side in the calling thread
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results  # type: ignore[return-value]
+
+
+def throughput(files: int, nbytes: int, elapsed_sec: float) -> Dict[str, float]:
+    elapsed = max(elapsed_sec, 1e-6)
+    return {
+        "elapsed_sec": round(elapsed_sec, 3),
+        "files_per_sec": round(files / elapsed, 2),
+        "bytes_per_sec": round(nbytes / elapsed, 2),
+    }
+
+
+def _cluster_suffix() -> str:
+    # Manifests and sync caches are per cluster; the default cluster keeps
+    # the keys it had before clusters existed.
+    name = clusters.current()
+    return "" if name == clusters.default else f"|{name}"
+
+
+class TransferManifest:
+    """
+    Append-only JSONL record of finished batches, so an interrupted bulk
+    transfer can be resumed without re-sending completed files.
+    """
+
+    def __init__(self, kind: str, src: str, dst: str) -> None:
+        key = hashlib.sha1(f"{kind}|{src}|{dst}{_cluster_suffix()}".encode("utf-8")).hexdigest()[:16]
+        self.path = Path(mcp_settings.mcp_manifest_dir) / f"{kind}-{key}.jsonl"
+        self.header = {"kind": kind, "src": src, "dst": dst}
+        self.done: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    entry = json.loads(ln)
+                except json.JSONDecodeError:
+                    continue  # torn last line after a crash
+                self.done.update(entry.get("done") or [])
+
+    def mark_done(self, rel_paths: List[str]) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            new_file = not self.path.exists()
+            with open(self.path, "a", encoding="utf-8") as f:
+                if new_file:
+                    f.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+                f.write(json.dumps({"ts": time.time(), "done": rel_paths}, ensure_ascii=False) + "\n")
+            self.done.update(rel_paths)
+
+    def remove(self) -> None:
+        with self._lock:
+            self.path.unlink(missing_ok=True)
+            self.done.clear()
+
+
+def _rel(root: str, path: str) -> str:
+    root = root.rstrip("/") or "/"
+    return posixpath.relpath(path, root)
+
+
+@dataclass
+class SyncSide:
+    """One end of a sync: a directory in HDFS or inside the namenode container."""
+    kind: Literal["local", "hdfs"]
+    root: str
+
+    def abs_path(self, rel_path: str) -> str:
+        return posixpath.join(self.root, rel_path)
+
+    def list_files(self, missing_ok: bool = False) -> Tuple[int, Dict[str, TransferFile], str, List[str]]:
+        """List files under root; with missing_ok a nonexistent root is an empty tree."""
+        if self.kind == "local":
+            code, files, err, docker_cmd = list_local_tree(self.root)
+            out = ""
+        else:
+            code, out, err, docker_cmd = run_docker_exec(build_hdfs_dfs_cmd("ls", ["-R", self.root]))
+        if code != 0:
+            if missing_ok and "No such file or directory" in err:
+                return 0, {}, err, docker_cmd
+            return code, {}, err, docker_cmd
+        if self.kind == "local":
+            return code, {f.rel_path: f for f in files}, err, docker_cmd
+
+        items = [item for item in parse_hdfs_ls(out) if item["type"] == "file"]
+        # `-ls` has minute resolution, so an edit within the minute of the last
+        # sync would keep the cached mtime; take milliseconds from `-stat %Y`.
+        mtimes = self._mtimes([item["path"] for item in items])
+        files: Dict[str, TransferFile] = {}
+        for item in items:
+            mtime = mtimes.get(item["path"])
+            if mtime is None:
+                try:
+                    mtime = float(calendar.timegm(time.strptime(f"{item['date']} {item['time']}", "%Y-%m-%d %H:%M")))
+                except ValueError:
+                    mtime = 0.0
+            rel = _rel(self.root, item["path"])
+            files[rel] = TransferFile(rel_path=rel, size=item["size"], mtime=mtime)
+        return code, files, err, docker_cmd
+
+    def _mtimes(self, paths: List[str]) -> Dict[str, float]:
+        """
+        Millisecond mtimes (as seconds) of HDFS files, many per `-stat %Y`
+        invocation. Lines follow argument order, so a chunk in which a file
+        vanished is skipped and keeps the `-ls` minute.
+        """
+        chunks = [paths[i:i + STAT_BATCH_FILES] for i in range(0, len(paths), STAT_BATCH_FILES)]
+
+        def stat(chunk: List[str]) -> Dict[str, float]:
+            try:
+                code, out, _, _ = run_docker_exec(build_hdfs_dfs_cmd("stat", ["%Y", *chunk]))
+            except RuntimeError:
+                return {}
+            values = out.split()
+            if code != 0 or len(values) != len(chunk) or not all(v.isdigit() for v in values):
+                return {}
+            return {p: int(v) / 1000 for p, v in zip(chunk, values)}
+
+        mtimes: Dict[str, float] = {}
+        for part in run_batches(chunks, stat, mcp_settings.mcp_transfer_parallelism):
+            mtimes.update(part)
+        return mtimes
+
+    def checksums(self, rel_paths: List[str]) -> Dict[str, str]:
+        """Content checksums for `rel_paths`, many files per invocation."""
+        sums: Dict[str, str] = {}
+        for i in range(0, len(rel_paths), CHECKSUM_BATCH_FILES):
+            chunk = [self.abs_path(r) for r in rel_paths[i:i + CHECKSUM_BATCH_FILES]]
+            if self.kind == "local":
+                cmd, parse = ["md5sum", *chunk], parse_md5sum
+            else:
+                cmd, parse = build_hdfs_dfs_cmd("checksum", chunk), parse_hdfs_checksum
+            try:
+                _, out, _, _ = run_docker_exec(cmd, timeout=mcp_settings.mcp_transfer_timeout_sec)
+            except RuntimeError:
+                continue  # unknown checksum -> file is treated as changed
+            for path, digest in parse(out).items():
+                sums[_rel(self.root, path)] = digest
+        return sums
+
+    def mkdir_cmd(self, dirs: List[str]) -> List[str]:
+        if self.kind == "local":
+            return ["mkdir", "-p", *dirs]
+        return build_hdfs_dfs_cmd("mkdir", ["-p", *dirs])
+
+    def copy_to_cmd(self, sources: List[str], dest_dir: str) -> List[str]:
+        """Multi-source copy from this side into `dest_dir` on the other side."""
+        sub = "put" if self.kind == "local" else "get"
+        return build_hdfs_dfs_cmd(sub, ["-f", *sources, dest_dir])
+
+
+class SyncCache:
+    """
+    Persisted per-(src, dst) state of the last successful sync:
+    size/mtime of both ends and content checksums when known.
+    """
+
+    def __init__(self, src: SyncSide, dst: SyncSide) -> None:
+        key = hashlib.sha1(
+            f"{src.kind}:{src.root}|{dst.kind}:{dst.root}{_cluster_suffix()}".encode("utf-8")
+        ).hexdigest()[:16]
+        self.path = Path(mcp_settings.mcp_manifest_dir) / f"sync-{key}.json"
+        self.header = {"src": f"{src.kind}:{src.root}", "dst": f"{dst.kind}:{dst.root}"}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("files", {})
+        except (OSError, json.JSONDecodeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**self.header, "files": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def record(self, rel_path: str, src: TransferFile, dst: TransferFile,
+               src_sum: Optional[str], dst_sum: Optional[str]) -> None:
+        self.entries[rel_path] = {
+            "src": [src.size, src.mtime],
+            "dst": [dst.size, dst.mtime],
+            "src_sum": src_sum,
+            "dst_sum": dst_sum,
+        }
+
+
+@dataclass
+class SyncPlan:
+    transfer: Dict[str, str] = field(default_factory=dict)        # rel_path -> reason
+    unchanged: Set[str] = field(default_factory=set)
+    adopted: Set[str] = field(default_factory=set)                # unchanged by adopt_existing, no checksums yet
+    verify_src: List[str] = field(default_factory=list)
+    verify_dst: List[str] = field(default_factory=list)
+
+
+def classify_sync(
+    src_files: Dict[str, TransferFile],
+    dst_files: Dict[str, TransferFile],
+    cache: SyncCache,
+    adopt_existing: bool,
+) -> SyncPlan:
+    """
+    First pass: decide from size/mtime and the cache alone. Files whose
+    size is unchanged but whose mtime moved since the last sync go to
+    verify_* lists and are resolved by `resolve_verified` via checksums.
+    Files taken as unchanged by `adopt_existing` are also listed in
+    `adopted`, so their checksums get recorded.
+    """
+    plan = SyncPlan()
+    for rel, s in src_files.items():
+        d = dst_files.get(rel)
+        if d is None:
+            plan.transfer[rel] = "new"
+            continue
+        if s.size != d.size:
+            plan.transfer[rel] = "size_changed"
+            continue
+
+        entry = cache.entries.get(rel)
+        if entry is None:
+            if adopt_existing:
+                plan.unchanged.add(rel)
+                plan.adopted.add(rel)
+            else:
+                plan.transfer[rel] = "not_in_cache"
+            continue
+
+        src_same = entry["src"] == [s.size, s.mtime]
+        dst_same = entry["dst"] == [d.size, d.mtime]
+        if src_same and dst_same:
+            plan.unchanged.add(rel)
+            continue
+        if not src_same:
+            plan.verify_src.append(rel)
+        if not dst_same:
+            plan.verify_dst.append(rel)
+    return plan
+
+
+def resolve_verified(plan: SyncPlan, cache: SyncCache,
+                     src_sums: Dict[str, str], dst_sums: Dict[str, str]) -> None:
+    """Second pass: a file is unchanged only if every re-checked side matches its cached checksum."""
+    for rel in set(plan.verify_src) | set(plan.verify_dst):
+        entry = cache.entries[rel]
+        ok = True
+        if rel in plan.verify_src:
+            ok = ok and entry.get("src_sum") is not None and src_sums.get(rel) == entry["src_sum"]
+        if rel in plan.verify_dst:
+            ok = ok and entry.get("dst_sum") is not None and dst_sums.get(rel) == entry["dst_sum"]
+        if ok:
+            plan.unchanged.add(rel)
+        else:
+            plan.transfer[rel] = "content_changed"